@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Throughput suite for run_backtest: synthetic bars, representative strategies
+and post-run extras, recording per-stage time, bars per second and peak RSS.
+
+Usage:
+  python benchmarks/bench_backtest.py run [--sizes 1000 10000 100000 1000000]
+      [--strategies buy_and_hold sma_cross heavy] [--extras base]
+      [--repeat 3] [--output results.json]
+  python benchmarks/bench_backtest.py compare baseline.json results.json [--threshold 0.10]
+
+Each case runs in a fresh forked process, so peak RSS is per case and
+caches start cold; stage times are the median over --repeat runs (caches
+are cleared between repeats so compile is measured every time). `compare`
+exits 1 when any case is slower or larger than the baseline by more than
+--threshold; keep a baseline per machine, e.g. `run --output benchmarks/baseline.json`.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+STRATEGIES = {
+    "buy_and_hold": """
+import backtrader as bt
+class BuyAndHold(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy()
+""",
+    "sma_cross": """
+import backtrader as bt
+class SmaCross(bt.Strategy):
+    params = (("fast", 10), ("slow", 30))
+    def __init__(self):
+        self.cross = bt.ind.CrossOver(bt.ind.SMA(period=self.p.fast), bt.ind.SMA(period=self.p.slow))
+    def next(self):
+        if self.cross[0] > 0:
+            self.buy()
+        elif self.cross[0] < 0 and self.position:
+            self.close()
+""",
+    "heavy": """
+import backtrader as bt
+class Heavy(bt.Strategy):
+    def __init__(self):
+        self.sma_fast = bt.ind.SMA(period=10)
+        self.sma_slow = bt.ind.SMA(period=50)
+        self.ema = bt.ind.EMA(period=20)
+        self.rsi = bt.ind.RSI(period=14)
+        self.macd = bt.ind.MACD()
+        self.bbands = bt.ind.BollingerBands(period=20)
+        self.atr = bt.ind.ATR(period=14)
+        self.stoch = bt.ind.Stochastic()
+        self.cross = bt.ind.CrossOver(self.sma_fast, self.sma_slow)
+    def next(self):
+        trend = self.cross[0] > 0 and self.macd.macd[0] > self.macd.signal[0]
+        if not self.position and trend and self.rsi[0] < 70 and self.data.close[0] < self.bbands.top[0]:
+            self.buy()
+        elif self.position and (self.rsi[0] > 80 or self.data.close[0] < self.ema[0] - 2 * self.atr[0]
+                                or self.stoch.percK[0] > 90):
+            self.close()
+""",
+}
+
+# Post-run work requested alongside the backtest
+EXTRAS = {
+    "base": {},
+    "downsample": {"equity_points": 500, "downsample": "lttb"},
+    "monte_carlo": {"monte_carlo": {"iterations": 1000, "method": "bootstrap", "seed": 0}},
+}
+
+def make_bars(n: int, seed: int = 0) -> dict:
+    """Daily columnar bars from a seeded geometric random walk, as the API receives them."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, n)))
+    open_ = close * (1 + rng.normal(0, 0.002, n))
+    spread = close * np.abs(rng.normal(0, 0.005, n))
+    days = np.datetime64("1970-01-01", "D") + np.arange(n)
+    return {
+        "time": np.datetime_as_string(days, unit="D").tolist(), "open": open_.tolist(),
+        "high": (np.maximum(open_, close) + spread).tolist(), "low": (np.minimum(open_, close) - spread).tolist(),
+        "close": close.tolist(), "volume": rng.integers(100, 10_000, n).astype(float).tolist()
+    }
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def _case(strategy: str, n: int, extras: str, repeat: int) -> dict:
+    """One benchmark case; runs inside a fresh worker process."""
+    from src.metrics import StageTimer
+    from src.runner import STRATEGY_CACHE, run_backtest
+    bars = make_bars(n)
+    rss_before = _rss_mb()
+    payload = {"code": STRATEGIES[strategy], "bars": bars, "include_ohlcv": False, **EXTRAS[extras]}
+    runs, trades = [], 0
+    for _ in range(repeat):
+        STRATEGY_CACHE.clear()
+        timer = StageTimer()
+        start = time.perf_counter()
+        trades = len(run_backtest(payload, timer=timer)["trades"])
+        timer.add("total", time.perf_counter() - start)
+        runs.append(timer.stages)
+    stages = {name: statistics.median(r[name] for r in runs) for name in runs[0]}
+    return {
+        "strategy": strategy, "bars": n, "extras": extras, "repeat": repeat, "trades": trades,
+        "stages": {name: round(seconds, 6) for name, seconds in stages.items()},
+        "bars_per_second": round(n / stages["total"], 1),
+        "peak_rss_mb": round(_rss_mb(), 1), "rss_before_mb": round(rss_before, 1),
+    }
+
+def _metadata() -> dict:
+    import backtrader as bt
+    import numpy as np
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+        "numpy": np.__version__, "backtrader": bt.__version__, "platform": platform.platform(),
+        "machine": platform.machine(), "cpus": os.cpu_count(),
+    }
+
+def run(args: argparse.Namespace) -> None:
+    ctx = multiprocessing.get_context("fork")
+    results = []
+    for n in args.sizes:
+        for strategy in args.strategies:
+            for extras in args.extras:
+                with ctx.Pool(1) as pool:
+                    result = pool.apply(_case, (strategy, n, extras, args.repeat))
+                results.append(result)
+                stages = " ".join(f"{k}={v * 1000:.1f}ms" for k, v in result["stages"].items())
+                print(f"{strategy:<13} {extras:<11} {n:>9,} bars {result['bars_per_second']:>11,.0f} bars/s "
+                      f"rss={result['peak_rss_mb']:>7.1f}MB  {stages}", flush=True)
+    report = {"meta": _metadata(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"wrote {args.output}")
+
+def compare_reports(baseline: dict, current: dict, threshold: float, min_seconds: float) -> list:
+    """
+    (case, metric, baseline, current, change, regressed) rows for every case
+    present in both reports. Throughput, peak RSS and stage times are
+    compared; stages shorter than min_seconds in both reports are skipped as noise.
+    """
+    def key(r):
+        return r["strategy"], r["bars"], r["extras"]
+    base = {key(r): r for r in baseline["results"]}
+    rows = []
+    for cur in current["results"]:
+        old = base.get(key(cur))
+        if old is None:
+            continue
+        case = "{} {} {:,}".format(cur["strategy"], cur["extras"], cur["bars"])
+        # bars_per_second: lower is worse; everything else: higher is worse
+        change = old["bars_per_second"] / cur["bars_per_second"] - 1
+        rows.append((case, "bars_per_second", old["bars_per_second"], cur["bars_per_second"], change, change > threshold))
+        change = cur["peak_rss_mb"] / old["peak_rss_mb"] - 1
+        rows.append((case, "peak_rss_mb", old["peak_rss_mb"], cur["peak_rss_mb"], change, change > threshold))
+        for stage, seconds in cur["stages"].items():
+            before = old["stages"].get(stage)
+            if before is None or max(before, seconds) < min_seconds:
+                continue
+            change = seconds / before - 1 if before else float("inf")
+            rows.append((case, f"{stage}_seconds", before, seconds, change, change > threshold))
+    return rows
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare_reports(baseline, current, args.threshold, args.min_seconds)
+    if not rows:
+        print("no common cases between the two reports")
+        return 1
+    regressions = 0
+    for case, metric, before, after, change, regressed in rows:
+        regressions += regressed
+        if regressed or args.verbose:
+            flag = "REGRESSION" if regressed else "ok"
+            print(f"{flag:<10} {case:<32} {metric:<22} {before:>14,.4f} -> {after:>14,.4f} ({change:+.1%} worse)")
+    print(f"{regressions} regression(s) above {args.threshold:.0%} across {len(rows)} comparisons")
+    return 1 if regressions else 0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="run the suite and write a JSON report")
+    p_run.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    p_run.add_argument("--strategies", nargs="+", choices=sorted(STRATEGIES), default=list(STRATEGIES))
+    p_run.add_argument("--extras", nargs="+", choices=sorted(EXTRAS), default=["base"])
+    p_run.add_argument("--repeat", type=int, default=3)
+    p_run.add_argument("--output", help="JSON report path")
+    p_cmp = sub.add_parser("compare", help="flag regressions of a report against a baseline")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown/growth")
+    p_cmp.add_argument("--min-seconds", type=float, default=0.005, help="ignore stages shorter than this")
+    p_cmp.add_argument("--verbose", action="store_true", help="print every comparison, not only regressions")
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+if __name__ == "__main__":
+    main()
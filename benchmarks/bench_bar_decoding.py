@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Compare parse time and peak memory of the JSON bar inputs (rows, columns)
+against the binary formats accepted by /run/binary, at 10k, 100k and 1M bars.
+
+Usage: python benchmarks/bench_bar_decoding.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.schemas import RunRequest
+from src.utils.binary_bars import decode_npy, decode_arrow, decode_msgpack, pa, msgpack
+from src.utils.datafeed import bars_to_columns
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+def make_columns(n: int) -> dict:
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return {
+        "time": np.datetime64("1970-01-01", "D") + np.arange(n),
+        "open": close + rng.normal(0, 0.2, n), "high": close + 1, "low": close - 1,
+        "close": close, "volume": rng.integers(100, 10000, n).astype(float)
+    }
+
+def encodings(cols: dict) -> dict:
+    times = np.datetime_as_string(cols["time"], unit="D").tolist()
+    rows = [{"time": t, **{k: float(cols[k][i]) for k in FIELDS}} for i, t in enumerate(times)]
+    out = {
+        "json rows": json.dumps({"code": "x", "bars": rows}).encode(),
+        "json columns": json.dumps({"code": "x", "bars": {"time": times, **{k: cols[k].tolist() for k in FIELDS}}}).encode(),
+    }
+    arr = np.empty(len(times), dtype=[("time", "datetime64[s]")] + [(k, "f8") for k in FIELDS])
+    arr["time"] = cols["time"]
+    for k in FIELDS:
+        arr[k] = cols[k]
+    buf = io.BytesIO()
+    np.save(buf, arr)
+    out["npy"] = buf.getvalue()
+    if pa is not None:
+        table = pa.table({"time": arr["time"], **{k: cols[k] for k in FIELDS}})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        out["arrow"] = sink.getvalue().to_pybytes()
+    if msgpack is not None:
+        out["msgpack"] = msgpack.packb({"time": arr["time"].astype("<i8").tobytes(),
+                                        **{k: cols[k].astype("<f8").tobytes() for k in FIELDS}})
+    return out
+
+def decode_json(body: bytes) -> dict:
+    return bars_to_columns(RunRequest.model_validate_json(body).model_dump()["bars"])
+
+DECODE = {"json rows": decode_json, "json columns": decode_json,
+          "npy": decode_npy, "arrow": decode_arrow, "msgpack": decode_msgpack}
+
+def measure(fn, body: bytes):
+    # Timed and traced separately: tracemalloc slows allocation-heavy paths
+    start = time.perf_counter()
+    fn(body)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    print(f"{'bars':>9} {'format':<13} {'payload MB':>10} {'parse s':>9} {'peak MB':>9}")
+    for n in args.sizes:
+        for name, body in encodings(make_columns(n)).items():
+            elapsed, peak = measure(DECODE[name], body)
+            print(f"{n:>9} {name:<13} {len(body) / 1e6:>10.2f} {elapsed:>9.4f} {peak / 1e6:>9.1f}")
+
+if __name__ == "__main__":
+    main()
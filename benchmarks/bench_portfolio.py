@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Wall time of multi-symbol portfolio runs (one Cerebro, one data per symbol)
+for 10, 100 and 500 symbols of synthetic daily bars.
+
+Usage: python benchmarks/bench_portfolio.py [--symbols 10 100 500] [--bars 252] [--ragged]
+
+--ragged gives every symbol a different start and random missing days, so
+the up-front alignment has gaps to fill; the default uses one shared calendar.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+CODE = """
+import backtrader as bt
+class Rotate(bt.Strategy):
+    def next(self):
+        if len(self) % 20:
+            return
+        for d in self.datas:
+            if self.getposition(d).size:
+                self.close(data=d)
+            elif d.close[0] > d.open[0]:
+                self.buy(data=d, size=1)
+"""
+
+def _portfolio(symbols: int, n: int, ragged: bool):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    days = np.datetime64("2000-01-03", "D") + np.arange(n)
+    out = {}
+    for s in range(symbols):
+        keep = np.ones(n, dtype=bool)
+        if ragged:
+            keep[:rng.integers(0, n // 10)] = False
+            keep &= rng.random(n) > 0.02
+        close = 50 + np.cumsum(rng.normal(0, 0.5, n))[keep]
+        open_ = close + rng.normal(0, 0.2, len(close))
+        out[f"S{s:04d}"] = {
+            "time": np.datetime_as_string(days[keep], unit="D").tolist(), "open": open_.tolist(),
+            "high": (np.maximum(open_, close) + 0.5).tolist(), "low": (np.minimum(open_, close) - 0.5).tolist(),
+            "close": close.tolist(), "volume": [1000.0] * len(close)
+        }
+    return out
+
+def main() -> None:
+    from src.runner import run_backtest
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--bars", type=int, default=252)
+    parser.add_argument("--ragged", action="store_true")
+    args = parser.parse_args()
+    for symbols in args.symbols:
+        portfolio = _portfolio(symbols, args.bars, args.ragged)
+        start = time.perf_counter()
+        result = run_backtest({"code": CODE, "portfolio": portfolio, "capital": 1_000_000, "include_ohlcv": False})
+        elapsed = time.perf_counter() - start
+        bars = sum(len(b["time"]) for b in portfolio.values())
+        print(f"symbols={symbols:<4} bars/symbol={args.bars} time={elapsed:.2f}s "
+              f"symbol_bars/s={bars / elapsed:,.0f} trades={len(result['trades'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Peak RSS of run_backtest on a synthetic columnar series (default 1M bars),
+measured in a fresh child process so runs do not share allocator state.
+
+Usage: python benchmarks/bench_recording_memory.py [--bars 1000000] [--equity-points 1000]
+
+--equity-points downsamples the returned curve, which isolates the memory
+used while recording from the size of the full response.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+CODE = """
+import backtrader as bt
+class Flip(bt.Strategy):
+    def next(self):
+        if len(self.data) % 20 == 0:
+            self.close() if self.position else self.buy(size=1)
+"""
+
+def _run(n: int, equity_points, out) -> None:
+    import numpy as np
+    from src.runner import run_backtest
+    from src.utils.datafeed import columns_to_lists
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 0.1, n))
+    cols = {"time": np.datetime64("1900-01-01", "D") + np.arange(n), "open": close, "high": close + 1,
+            "low": close - 1, "close": close, "volume": np.full(n, 1000.0), "openinterest": np.zeros(n)}
+    bars = columns_to_lists(cols)
+    del cols, close
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    result = run_backtest({"code": CODE, "bars": bars, "capital": 100000,
+                           "include_ohlcv": False, "equity_points": equity_points})
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    out.put((elapsed, base / 1024, peak / 1024, len(result["equity_curve"]), len(result["trades"])))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    parser.add_argument("--equity-points", type=int, default=None)
+    args = parser.parse_args()
+    out = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_run, args=(args.bars, args.equity_points, out))
+    proc.start()
+    elapsed, base, peak, points, trades = out.get()
+    proc.join()
+    print(f"bars={args.bars} time={elapsed:.1f}s rss_before_run={base:.0f}MB peak_rss={peak:.0f}MB "
+          f"run_delta={peak - base:.0f}MB equity_points={points} trades={trades}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Latency of a tiny backtest run three ways: inline in this process, in the
+pre-forked warm pool (src.pool.WarmPool), and in a fresh worker process per
+request (cold start: spawned interpreter importing backtrader each time).
+
+Usage: python benchmarks/bench_warm_pool.py [--requests 50] [--bars 50]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.pool import WARMUP_CODE, WarmPool
+from src.runner import run_backtest
+
+def _bars(n: int):
+    import datetime
+    start = datetime.date(2020, 1, 1)
+    return [{"time": (start + datetime.timedelta(days=i)).isoformat(), "open": 100.0 + i % 5,
+             "high": 102.0 + i % 5, "low": 98.0 + i % 5, "close": 100.5 + i % 7, "volume": 1000.0}
+            for i in range(n)]
+
+def _cold(payload):
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+        return pool.submit(run_backtest, payload).result()
+
+def _measure(label: str, fn, payload, requests: int) -> None:
+    times = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn(payload)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"{label:<8} p50={statistics.median(times):8.1f}ms p95={p95:8.1f}ms max={times[-1]:8.1f}ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--bars", type=int, default=50)
+    args = parser.parse_args()
+    payload = {"code": WARMUP_CODE, "bars": _bars(args.bars), "include_ohlcv": False}
+
+    _measure("inline", run_backtest, payload, args.requests)
+    pool = WarmPool(size=1, max_tasks=None)
+    pool.start()
+    while not pool.status()["ready"]:
+        time.sleep(0.01)
+    _measure("warm", pool.run, payload, args.requests)
+    pool.shutdown()
+    _measure("cold", _cold, payload, max(3, args.requests // 10))
+
+if __name__ == "__main__":
+    main()
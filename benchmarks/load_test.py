@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for /run: starts src.main:app under uvicorn (or targets
+--url), drives it with a weighted mix of payload sizes at each concurrency
+level, and reports throughput, p50/p95/p99 latency and error rate.
+
+Usage:
+  python benchmarks/load_test.py [--workers 1 2 4] [--concurrency 1 4 16]
+      [--mix 250:0.7 2500:0.25 25000:0.05] [--duration 20] [--output load.json]
+  python benchmarks/load_test.py --url http://127.0.0.1:8080 --concurrency 8
+
+Each --workers value starts a fresh `uvicorn --workers N` on a free port
+(server environment such as BACKTRADER_POOL_SIZE is inherited), waits for
+/health to report healthy, then runs every concurrency level as a closed
+loop: C clients each send the next request as soon as the previous one
+returns. Requests carry `Cache-Control: no-cache` unless --cache is given,
+so the result cache does not hide the backtest cost. The load generator
+shares the machine with the server; on small hosts keep that in mind.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+CODE = """
+import backtrader as bt
+class SmaCross(bt.Strategy):
+    def __init__(self):
+        self.cross = bt.ind.CrossOver(bt.ind.SMA(period=10), bt.ind.SMA(period=30))
+    def next(self):
+        if self.cross[0] > 0:
+            self.buy()
+        elif self.cross[0] < 0 and self.position:
+            self.close()
+"""
+
+def _parse_mix(items: List[str]) -> List[Tuple[int, float]]:
+    mix = []
+    for item in items:
+        bars, _, weight = item.partition(":")
+        mix.append((int(bars), float(weight or 1)))
+    return mix
+
+def _body(n: int) -> bytes:
+    from benchmarks.bench_backtest import make_bars
+    return json.dumps({"code": CODE, "bars": make_bars(n), "include_ohlcv": False, "equity_points": 500}).encode()
+
+def _percentile(sorted_ms: List[float], q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(q / 100 * (len(sorted_ms) - 1))))]
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workers: int, port: int, timeout: float = 120) -> subprocess.Popen:
+    """Start uvicorn with `workers` processes and wait until /health reports healthy."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).json().get("status") == "healthy":
+                return proc
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError(f"server not healthy after {timeout:g}s")
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+async def _drive(url: str, bodies: Dict[int, bytes], mix: List[Tuple[int, float]], concurrency: int,
+                 duration: float, requests: Optional[int], cache: bool, seed: int) -> Dict[str, object]:
+    """Closed-loop load at one concurrency level; returns the latency and error summary."""
+    headers = {"Content-Type": "application/json"}
+    if not cache:
+        headers["Cache-Control"] = "no-cache"
+    sizes, weights = zip(*mix)
+    rng = random.Random(seed)
+    latencies: Dict[int, List[float]] = {n: [] for n in sizes}
+    errors: Dict[str, int] = {}
+    sent = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(http: httpx.AsyncClient) -> None:
+        nonlocal sent
+        while (sent < requests) if requests else (time.perf_counter() < deadline):
+            sent += 1
+            n = rng.choices(sizes, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await http.post(f"{url}/run", content=bodies[n], headers=headers)
+                failure = None if response.status_code == 200 else str(response.status_code)
+            except httpx.HTTPError as e:
+                failure = type(e).__name__
+            if failure:
+                errors[failure] = errors.get(failure, 0) + 1
+            else:
+                latencies[n].append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    def summary(ms: List[float]) -> Dict[str, float]:
+        ms = sorted(ms)
+        return {"ok": len(ms), "p50_ms": round(_percentile(ms, 50), 1), "p95_ms": round(_percentile(ms, 95), 1),
+                "p99_ms": round(_percentile(ms, 99), 1), "max_ms": round(ms[-1] if ms else 0.0, 1)}
+
+    ok = sum(len(v) for v in latencies.values())
+    failed = sum(errors.values())
+    return {
+        "concurrency": concurrency, "requests": ok + failed, "seconds": round(elapsed, 2),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(failed / (ok + failed), 4) if ok + failed else 0.0, "errors": errors,
+        **summary([x for v in latencies.values() for x in v]),
+        "by_bars": {str(n): summary(v) for n, v in latencies.items()},
+    }
+
+def _print_row(workers: object, row: Dict[str, object]) -> None:
+    print(f"workers={workers!s:<3} c={row['concurrency']:<4} req={row['requests']:<6} "
+          f"rps={row['throughput_rps']:>8.2f} p50={row['p50_ms']:>8.1f}ms p95={row['p95_ms']:>8.1f}ms "
+          f"p99={row['p99_ms']:>8.1f}ms err={row['error_rate']:.2%}", flush=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting uvicorn")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="uvicorn worker counts to sweep")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--mix", nargs="+", default=["250:0.7", "2500:0.25", "25000:0.05"],
+                        help="bars:weight payload sizes")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--requests", type=int, help="requests per concurrency level instead of --duration")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests per size before measuring")
+    parser.add_argument("--cache", action="store_true", help="allow result cache hits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON report path")
+    args = parser.parse_args()
+
+    mix = _parse_mix(args.mix)
+    bodies = {n: _body(n) for n, _ in mix}
+    report = []
+    for workers in ([None] if args.url else args.workers):
+        proc, url = None, args.url
+        if url is None:
+            port = _free_port()
+            proc = start_server(workers, port)
+            url = f"http://127.0.0.1:{port}"
+        try:
+            for n, body in bodies.items():
+                for _ in range(args.warmup):
+                    httpx.post(f"{url}/run", content=body, headers={"Content-Type": "application/json"}, timeout=None)
+            for concurrency in args.concurrency:
+                row = asyncio.run(_drive(url, bodies, mix, concurrency, args.duration, args.requests,
+                                         args.cache, args.seed))
+                row["workers"] = workers
+                report.append(row)
+                _print_row(workers if workers else "ext", row)
+        finally:
+            if proc is not None:
+                stop_server(proc)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mix": mix, "cache": args.cache, "cpus": os.cpu_count(), "results": report}, f, indent=1)
+        print(f"wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from typing import Any, Dict, List
+
+from src.parallel import run_tasks
+from src.utils.datafeed import bars_to_columns
+from src.utils.resample import resample_columns
+
+def run_batch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run many strategies against one shared bar set.
+    Inputs:
+      payload['bars']: list of OHLCV dicts (validated and converted once)
+      payload['entries']: list of {code, params, capital}
+      payload['timeframe']: optional timeframe the bars are aggregated to first
+      payload['max_workers']: optional worker count (capped by MAX_WORKERS)
+      payload['indicator_cache']: False disables the shared indicator cache
+    Returns:
+      dict with key results: one {index, summary, error} row per entry;
+      a failing entry reports its error without failing the batch
+    """
+    entries: List[Dict[str, Any]] = payload.get("entries") or []
+    if not entries:
+        raise ValueError("entries must contain at least one strategy")
+    tasks = [
+        {"code": e["code"], "params": e.get("params") or {}, "capital": e.get("capital", 10000)}
+        for e in entries
+    ]
+    columns = resample_columns(bars_to_columns(payload["bars"]), payload.get("timeframe"))
+    rows = run_tasks(columns, tasks, payload.get("max_workers"), payload.get("symbol"),
+                     payload.get("indicator_cache", True))
+    return {"results": [{"index": i, **row} for i, row in enumerate(rows)]}
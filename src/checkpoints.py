@@ -0,0 +1,287 @@
+"""
+Incremental backtests: a run started with `checkpoint` is kept suspended
+after its last bar instead of finishing, and bars appended later continue
+that same run.
+
+The checkpoint is the live run itself. Cerebro runs bar by bar (no preload)
+on a background thread over a ResumableData feed that blocks once it has
+handed out every bar, so the strategy and its indicators, the broker's cash,
+positions and pending orders, and the recorded equity and trades all stay
+exactly as a run ending on that bar left them. Resuming pushes only the new
+bars into the feed and waits until they have been processed; the result is
+what a full run over all the bars returns, at the cost of the new bars only.
+
+Checkpoints live in this process (compiled strategy classes and backtrader's
+generated line classes do not pickle), bounded by count and idle time; an
+evicted or deleted checkpoint lets its run finish normally.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.metrics import StageTimer
+from src.runner import _build_cerebro, _load_strategy_class, _results
+from src.utils.datafeed import Bars, TIME_DTYPE, bars_to_columns, columns_to_lists, is_daily, InMemoryData
+
+# Suspended runs kept at once (0 disables checkpoints) and seconds one may sit unused
+CHECKPOINT_MAX = int(os.environ.get("BACKTRADER_CHECKPOINT_MAX", 16))
+CHECKPOINT_TTL = float(os.environ.get("BACKTRADER_CHECKPOINT_TTL", 3600))
+
+class CheckpointNotFound(KeyError):
+    """No live checkpoint with the requested id (never created, deleted or evicted)."""
+
+class ResumableData(InMemoryData):
+    """
+    InMemoryData that waits for more bars instead of ending: when every bar
+    has been delivered, next() marks the feed idle and blocks until push()
+    adds bars or release() ends the run.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._idle = False
+        self._closed = False
+        self._finished = False
+
+    def next(self, datamaster=None, ticks=True):
+        # Block before the base class forwards the lines, so a suspended run
+        # reads exactly as one that ended on its last bar (e.g. broker value)
+        with self._cond:
+            while self._idx >= len(self._columns["datetime"]) and not self._closed:
+                self._idle = True
+                self._cond.notify_all()
+                self._cond.wait()
+        return super().next(datamaster, ticks)
+
+    def push(self, cols: Dict[str, np.ndarray]) -> None:
+        """Queue appended bars; only valid while idle (every earlier bar delivered)."""
+        with self._cond:
+            self._columns, self._idx = self._line_columns(cols), 0
+            self._idle = False
+            self._cond.notify_all()
+
+    def release(self) -> None:
+        """Let the run end at its last delivered bar."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def finish(self) -> None:
+        """Called once the run has returned (or raised)."""
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def ended(self) -> bool:
+        """True once the run was released or has returned; it can take no more bars."""
+        with self._cond:
+            return self._closed or self._finished
+
+    def wait_idle(self) -> bool:
+        """Wait until every queued bar has been processed; False if the run ended instead."""
+        with self._cond:
+            while not (self._idle or self._finished):
+                self._cond.wait()
+            return not self._finished
+
+def _bar_width(times: np.ndarray) -> int:
+    secs = times.astype(TIME_DTYPE).astype(np.int64)
+    return int(np.diff(secs).min()) if len(secs) > 1 else 60
+
+class Checkpoint:
+    """One suspended run: its Cerebro, feed and thread plus what resume needs to validate bars."""
+    def __init__(self, payload: Dict[str, Any], user_cls: type, columns: Dict[str, np.ndarray]):
+        self.id = uuid.uuid4().hex
+        self.payload = {k: v for k, v in payload.items() if k != "bars"}
+        self.capital = float(payload.get("capital", 10000))
+        self.feed = ResumableData(dataname=columns)
+        self.cerebro = _build_cerebro(user_cls, self.feed, self.capital, payload.get("params", {}),
+                                      payload.get("symbol"), indicator_cache=payload.get("indicator_cache", True))
+        self.cerebro.p.preload = self.cerebro.p.runonce = False
+        self.daily = is_daily(columns["time"])
+        self.width = _bar_width(columns["time"])
+        self.last = columns["time"][-1]
+        self.bars = len(columns["time"])
+        self.ohlcv = columns if payload.get("include_ohlcv", True) else None
+        self.error: Optional[BaseException] = None
+        self.lock = threading.Lock()
+        self.used = time.monotonic()
+        self.thread = threading.Thread(target=self._work, name="backtest-checkpoint", daemon=True)
+
+    def _work(self) -> None:
+        try:
+            self.cerebro.run()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.feed.finish()
+
+    def advance(self) -> bool:
+        """Run until the queued bars are processed; False when the run ended (re-raising its error)."""
+        if self.thread.ident is None:
+            self.thread.start()
+        resumable = self.feed.wait_idle()
+        if self.error is not None:
+            raise self.error
+        return resumable
+
+    def append(self, bars: Bars) -> None:
+        """Validate appended bars against the checkpoint and queue them on the feed."""
+        cols = bars_to_columns(bars)
+        times = cols["time"]
+        if not len(times):
+            raise ValueError("bars must contain at least one bar")
+        if np.any(np.diff(times) <= np.timedelta64(0)):
+            raise ValueError("bars.time must be strictly increasing")
+        if times[0] <= self.last:
+            raise ValueError(f"bars must start after the checkpoint's last bar ({self.last})")
+        if self.daily and not is_daily(times):
+            raise ValueError("the checkpoint has daily bars; appended bars must be dates too")
+        if not self.daily and _bar_width(np.concatenate(([self.last], times))) < self.width:
+            # A narrower spacing would change the bar width the run reports to the strategy
+            raise ValueError(f"appended bars are closer together than the checkpoint's {self.width}s bars")
+        self.feed.push(cols)
+        self.last = times[-1]
+        self.bars += len(times)
+        if self.ohlcv is not None:
+            self.ohlcv = {name: np.concatenate((values, cols[name])) for name, values in self.ohlcv.items()}
+
+    def result(self) -> Dict[str, Any]:
+        """The /run result over every bar processed so far."""
+        strat = self.cerebro.runningstrats[0]
+        ohlcv = columns_to_lists(self.ohlcv) if self.ohlcv is not None else None
+        return _results(strat, self.cerebro, self.payload, self.capital, ohlcv)
+
+    def close(self) -> None:
+        self.feed.release()
+
+class CheckpointStore:
+    """
+    Live checkpoints by id, least recently used first. Entries over `maxsize`
+    or unused for `ttl` seconds are closed and dropped; a reaper thread,
+    running while the store holds any, expires idle ones without waiting
+    for the next request.
+    """
+    def __init__(self, maxsize: int = CHECKPOINT_MAX, ttl: float = CHECKPOINT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Checkpoint]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def start(self, payload: Dict[str, Any], timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+        """
+        Run payload['bars'] as a checkpointed backtest and return its result
+        with `checkpoint_id` (None when the run stopped itself and cannot resume).
+        Portfolio, timeframe and profiled runs are not supported (ValueError).
+        """
+        for option in ("portfolio", "timeframe", "profile"):
+            if payload.get(option):
+                raise ValueError(f"checkpointed runs do not support {option}")
+        if not payload.get("bars"):
+            raise ValueError("checkpointed runs require bars")
+        timer = timer or StageTimer()
+        with timer.stage("compile"):
+            user_cls = _load_strategy_class(payload["code"], payload.get("indicator_cache", True))
+        with timer.stage("feed"):
+            checkpoint = Checkpoint(payload, user_cls, bars_to_columns(payload["bars"]))
+        return self._advance(checkpoint, timer)
+
+    def resume(self, checkpoint_id: str, bars: Bars, timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+        """Append `bars` to a checkpointed run and return its result over all bars so far."""
+        checkpoint = self.get(checkpoint_id)
+        timer = timer or StageTimer()
+        with checkpoint.lock:
+            if checkpoint.feed.ended():
+                # Closed while this request waited for the lock
+                raise CheckpointNotFound(f"checkpoint {checkpoint_id} not found")
+            checkpoint.used = time.monotonic()
+            with timer.stage("feed"):
+                checkpoint.append(bars)
+            return self._advance(checkpoint, timer)
+
+    def _advance(self, checkpoint: Checkpoint, timer: StageTimer) -> Dict[str, Any]:
+        try:
+            with timer.stage("run"):
+                resumable = checkpoint.advance()
+        except BaseException:
+            self.delete(checkpoint.id)
+            raise
+        with timer.stage("results"):
+            result = checkpoint.result()
+        if resumable:
+            checkpoint.used = time.monotonic()
+            self._add(checkpoint)
+        else:
+            self.delete(checkpoint.id)
+        result["checkpoint_id"] = checkpoint.id if resumable else None
+        return result
+
+    def _add(self, checkpoint: Checkpoint) -> None:
+        with self._lock:
+            self._items[checkpoint.id] = checkpoint
+            self._items.move_to_end(checkpoint.id)
+            dropped = self._expire()
+            while len(self._items) > self.maxsize:
+                dropped.append(self._items.popitem(last=False)[1])
+            if self._reaper is None and self._items:
+                self._reaper = threading.Thread(target=self._reap, name="checkpoint-reaper", daemon=True)
+                self._reaper.start()
+        for old in dropped:
+            old.close()
+
+    def _expire(self) -> list:
+        # Checkpoints being resumed (lock held) are in use, however long that takes
+        now = time.monotonic()
+        expired = [cid for cid, c in self._items.items() if now - c.used > self.ttl and not c.lock.locked()]
+        return [self._items.pop(cid) for cid in expired]
+
+    def _reap(self) -> None:
+        """Close expired checkpoints every ttl/2 seconds (at most a minute) until the store is empty."""
+        while True:
+            time.sleep(min(max(self.ttl / 2, 0.01), 60.0))
+            with self._lock:
+                dropped = self._expire()
+                if not self._items:
+                    self._reaper = None
+            for old in dropped:
+                old.close()
+            if self._reaper is not threading.current_thread():
+                return
+
+    def get(self, checkpoint_id: str) -> Checkpoint:
+        """The live checkpoint with this id; raises CheckpointNotFound."""
+        with self._lock:
+            dropped = self._expire()
+            checkpoint = self._items.get(checkpoint_id)
+            if checkpoint is not None:
+                self._items.move_to_end(checkpoint_id)
+        for old in dropped:
+            old.close()
+        if checkpoint is None:
+            raise CheckpointNotFound(f"checkpoint {checkpoint_id} not found")
+        return checkpoint
+
+    def delete(self, checkpoint_id: str) -> bool:
+        """Close and drop a checkpoint; False if it was not live."""
+        with self._lock:
+            checkpoint = self._items.pop(checkpoint_id, None)
+        if checkpoint is None:
+            return False
+        checkpoint.close()
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            items, self._items = list(self._items.values()), OrderedDict()
+        for checkpoint in items:
+            checkpoint.close()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+CHECKPOINTS = CheckpointStore()
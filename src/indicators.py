@@ -0,0 +1,321 @@
+"""
+Shared indicator cache: SMA, EMA and RSI outputs computed once per input
+series with vectorized NumPy and reused by every later run in the process
+on the same data (parameter sweeps, batches, repeated /run calls).
+
+While the cache is on, strategies are compiled against CACHED_BT (see
+runner._compile_strategy), a stand-in for the backtrader module whose
+`ind`/`indicators` namespaces hold subclasses of SMA/EMA/RSI that build a
+cached variant when created. Existing `bt.ind.SMA(period=20)` code picks
+them up unchanged, and subclassing or isinstance checks work as on the
+originals. Calls the cache cannot serve exactly (other inputs such as
+indicators or delayed lines, non-default movav/lookback, feeds that are
+not preloaded or shorter than the period) build the regular indicator.
+"""
+import array
+import builtins
+import hashlib
+import os
+import types
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import backtrader as bt
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.utils.cache import LRUCache
+
+# "off" makes every cached wrapper build the regular backtrader indicator
+INDICATOR_CACHE_MODE = os.environ.get("BACKTRADER_INDICATOR_CACHE", "on")
+
+# Output arrays keyed by (input series digest, indicator, params); bounded by count and bytes
+INDICATOR_CACHE = LRUCache(
+    maxsize=int(os.environ.get("BACKTRADER_INDICATOR_CACHE_SIZE", 512)),
+    maxbytes=int(os.environ.get("BACKTRADER_INDICATOR_CACHE_MB", 256)) * 1024 * 1024
+)
+
+# Recurrences are evaluated in blocks of this many bars with one matrix product per pass
+_BLOCK = 256
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average; the first period-1 outputs are NaN."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        out[period - 1:] = sliding_window_view(values, period).sum(axis=1) / period
+    return out
+
+def _recurrence(values: np.ndarray, seed: float, alpha: float) -> np.ndarray:
+    """y[i] = y[i-1] * (1 - alpha) + values[i] * alpha with y[-1] = seed, vectorized per block."""
+    n = len(values)
+    if not n:
+        return values.copy()
+    decay = 1.0 - alpha
+    if not np.isfinite(values).all():
+        # NaN/inf would leak into earlier outputs of a block through the matrix product
+        out, prev = np.empty(n), seed
+        for i, v in enumerate(values):
+            out[i] = prev = prev * decay + v * alpha
+        return out
+    blocks = -(-n // _BLOCK)
+    padded = np.zeros(blocks * _BLOCK)
+    padded[:n] = values
+    lag = np.arange(_BLOCK)[:, None] - np.arange(_BLOCK)
+    kernel = np.where(lag >= 0, alpha * decay ** np.maximum(lag, 0), 0.0)
+    # Each block's response to its own inputs, from a zero starting value
+    partial = padded.reshape(blocks, _BLOCK) @ kernel.T
+    powers = decay ** np.arange(1, _BLOCK + 1)
+    carries = np.empty(blocks)
+    carry = seed
+    for b in range(blocks):
+        carries[b] = carry
+        carry = partial[b, -1] + powers[-1] * carry
+    return (partial + carries[:, None] * powers).ravel()[:n]
+
+def exp_smooth(values: np.ndarray, period: int, alpha: float, first: int = 0) -> np.ndarray:
+    """
+    backtrader's ExponentialSmoothing over values[first:]: seeded with the
+    mean of the first `period` inputs, NaN before that.
+    """
+    out = np.full(len(values), np.nan)
+    seed_at = first + period - 1
+    if len(values) > seed_at:
+        seed = values[first:seed_at + 1].mean()
+        out[seed_at] = seed
+        out[seed_at + 1:] = _recurrence(values[seed_at + 1:], seed, alpha)
+    return out
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """Exponential moving average with alpha = 2 / (1 + period)."""
+    return exp_smooth(values, period, 2.0 / (1.0 + period))
+
+def _safe_rs(rsi: float) -> float:
+    # RelativeStrengthIndex._rscalc: the rs that yields a given RSI
+    try:
+        return (-100.0 / (rsi - 100.0)) - 1.0
+    except ZeroDivisionError:
+        return float("inf")
+
+def rsi(values: np.ndarray, period: int, safediv: bool = False,
+        safehigh: float = 100.0, safelow: float = 50.0) -> np.ndarray:
+    """
+    Wilder's RSI (one-bar up/down moves smoothed with alpha = 1 / period).
+    Without safediv a zero average loss raises ZeroDivisionError, as in backtrader.
+    """
+    up = np.full(len(values), np.nan)
+    down = np.full(len(values), np.nan)
+    up[1:] = np.maximum(values[1:] - values[:-1], 0.0)
+    down[1:] = np.maximum(values[:-1] - values[1:], 0.0)
+    maup = exp_smooth(up, period, 1.0 / period, first=1)
+    madown = exp_smooth(down, period, 1.0 / period, first=1)
+    zero = madown == 0.0
+    if zero.any() and not safediv:
+        raise ZeroDivisionError("float division by zero")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = maup / madown
+    rs[zero] = np.where(maup[zero] == 0.0, _safe_rs(safelow), _safe_rs(safehigh))
+    return 100.0 - 100.0 / (1.0 + rs)
+
+def _digest(line: Any) -> str:
+    """Content hash of a preloaded data line, computed once per line object."""
+    digest = getattr(line, "_cache_digest", None)
+    if digest is None:
+        digest = line._cache_digest = hashlib.blake2b(line.array, digest_size=16).hexdigest()
+    return digest
+
+def cached_values(line: Any, key: Tuple, compute: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """Output array for `key` on this line from INDICATOR_CACHE, computing it on a miss."""
+    full_key = (_digest(line),) + key
+    values = INDICATOR_CACHE.get(full_key)
+    if values is None:
+        values = compute(np.frombuffer(line.array, dtype=np.float64))
+        values.setflags(write=False)
+        INDICATOR_CACHE.set(full_key, values)
+    return values
+
+class _CachedIndicator:
+    """
+    Mixin for a bt indicator whose output comes from a precomputed array:
+    copied into the line in one slice (runonce) or read bar by bar (next).
+    Subclasses give the cache key and the vectorized computation; the output
+    starts `_lookback` bars after the first full period.
+    """
+    _values: np.ndarray
+    _lookback = 0
+
+    def __init__(self):
+        self._values = cached_values(self.data.lines[0], self._key(), self._compute)
+        self.addminperiod(self.p.period + self._lookback)
+
+    def _key(self) -> Tuple:
+        raise NotImplementedError
+
+    def _compute(self, values: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def prenext(self):
+        pass
+
+    def nextstart(self):
+        self.next()
+
+    def next(self):
+        self.lines[0][0] = self._values[len(self) - 1]
+
+    def preonce(self, start, end):
+        pass
+
+    def oncestart(self, start, end):
+        self.once(start, end)
+
+    def once(self, start, end):
+        self.lines[0].array[start:end] = array.array("d", self._values[start:end].tobytes())
+
+class _SMAValues(_CachedIndicator):
+    def _key(self) -> Tuple:
+        return ("sma", self.p.period)
+
+    def _compute(self, values: np.ndarray) -> np.ndarray:
+        return sma(values, self.p.period)
+
+class _EMAValues(_CachedIndicator):
+    def _key(self) -> Tuple:
+        return ("ema", self.p.period)
+
+    def _compute(self, values: np.ndarray) -> np.ndarray:
+        return ema(values, self.p.period)
+
+class _RSIValues(_CachedIndicator):
+    # One bar of lookback for the up/down moves plus the smoothing period
+    _lookback = 1
+
+    def _key(self) -> Tuple:
+        p = self.p
+        return ("rsi", p.period, bool(p.safediv), p.safehigh, p.safelow)
+
+    def _compute(self, values: np.ndarray) -> np.ndarray:
+        p = self.p
+        return rsi(values, p.period, p.safediv, p.safehigh, p.safelow)
+
+def _data_line(owner: Any, args: Tuple, minperiod: int) -> Optional[Any]:
+    """
+    The preloaded data-feed line an indicator call reads, or None when the
+    cache cannot serve it (including feeds shorter than `minperiod`, which
+    backtrader's own indicators reject in runonce mode).
+    """
+    if len(args) > 1:
+        return None
+    source = args[0] if args else owner.datas[0]
+    if isinstance(source, bt.AbstractDataBase):
+        feed, line = source, source.lines[0]
+    elif type(source) is bt.linebuffer.LineBuffer and isinstance(source._owner, bt.AbstractDataBase):
+        feed, line = source._owner, source
+    else:
+        return None
+    n = len(line.array)
+    return line if n >= minperiod and n == feed.buflen() else None
+
+def _supported(standin: type, kwargs: Dict[str, Any]) -> bool:
+    names = set(standin.params._getkeys())
+    for name, value in kwargs.items():
+        if name not in names:
+            return False
+        if name in standin._allowed and value != standin._allowed[name]:
+            return False
+    period = kwargs.get("period", standin.params.period)
+    return isinstance(period, (int, np.integer)) and not isinstance(period, bool) and period >= 1
+
+def _use_cache(standin: type, args: Tuple, kwargs: Dict[str, Any]) -> bool:
+    """Whether a call to `standin` can be served exactly by its cached subclass."""
+    owner = bt.metabase.findowner(None, bt.LineIterator)
+    if (INDICATOR_CACHE_MODE == "off" or not isinstance(owner, bt.Strategy)
+            or not getattr(owner, "_indicator_cache", True) or not _supported(standin, kwargs)):
+        return False
+    period = kwargs.get("period", standin.params.period)
+    return _data_line(owner, args, period + standin._cached._lookback) is not None
+
+_DISPATCH: Dict[type, type] = {}
+
+def _dispatch_meta(meta: type) -> type:
+    """
+    Metaclass derived from an indicator's own: creating a stand-in builds its
+    cached subclass instead when _use_cache allows. Subclasses of a stand-in
+    (user indicators) are created as written and register with backtrader
+    like any indicator.
+    """
+    if meta not in _DISPATCH:
+        def __new__(mcs, name, bases, dct):
+            dct.setdefault("_notregister", False)
+            return meta.__new__(mcs, name, bases, dct)
+
+        def doprenew(cls, *args, **kwargs):
+            cached = cls.__dict__.get("_cached")
+            if cached is not None and _use_cache(cls, args, kwargs):
+                cls = cached
+            return meta.doprenew(cls, *args, **kwargs)
+
+        _DISPATCH[meta] = type("Dispatch" + meta.__name__, (meta,), {"__new__": __new__, "doprenew": doprenew})
+    return _DISPATCH[meta]
+
+def _standin(name: str, values: type, allowed: Optional[Dict[str, Any]] = None) -> type:
+    """
+    Subclass of bt.indicators.<name> that builds its cached variant when it
+    can, so subclassing, isinstance and params behave as on the original.
+    Both are marked as aliases so backtrader's indicator registries are untouched.
+    """
+    original = getattr(bt.indicators, name)
+    meta = _dispatch_meta(type(original))
+    common = {"__module__": __name__, "__doc__": original.__doc__, "aliased": name, "_notregister": True}
+    standin = meta(name, (original,), dict(common, _allowed=allowed or {}))
+    standin._cached = meta("Cached" + name, (values, standin),
+                           dict(common, plotinfo=dict(plotname=original.plotinfo.plotname or name)))
+    return standin
+
+class _Namespace(types.ModuleType):
+    """Module stand-in: explicit attributes first, the wrapped module for everything else."""
+    def __init__(self, name: str, wrapped: types.ModuleType):
+        super().__init__(name)
+        self._wrapped = wrapped
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._wrapped, name)
+
+CACHED_INDICATORS = _Namespace("backtrader.indicators", bt.indicators)
+for _names, _values, _allowed in (
+    (("SMA", "SimpleMovingAverage", "MovingAverageSimple"), _SMAValues, None),
+    (("EMA", "ExponentialMovingAverage", "MovingAverageExponential"), _EMAValues, None),
+    (("RSI", "RelativeStrengthIndex", "RSI_SMMA", "RSI_Wilder"), _RSIValues,
+     {"movav": bt.ind.RSI.params.movav, "lookback": 1}),
+):
+    for _name in _names:
+        setattr(CACHED_INDICATORS, _name, _standin(_name, _values, _allowed))
+
+# Cached variants of the short names
+CachedSMA = CACHED_INDICATORS.SMA._cached
+CachedEMA = CACHED_INDICATORS.EMA._cached
+CachedRSI = CACHED_INDICATORS.RSI._cached
+
+CACHED_BT = _Namespace("backtrader", bt)
+CACHED_BT.ind = CACHED_BT.indicators = CACHED_INDICATORS
+
+def _import(name, globals=None, locals=None, fromlist=(), level=0):
+    module = builtins.__import__(name, globals, locals, fromlist, level)
+    if level == 0 and name == "backtrader":
+        return CACHED_BT
+    if level == 0 and name == "backtrader.indicators" and fromlist:
+        return CACHED_INDICATORS
+    if level == 0 and name.startswith("backtrader.") and not fromlist:
+        # `import backtrader.indicators as btind` resolves attributes on the top-level package
+        return CACHED_BT
+    return module
+
+# Builtins for compiled strategies: imports of backtrader resolve to CACHED_BT
+STRATEGY_BUILTINS = dict(builtins.__dict__, __import__=_import)
+
+def strategy_globals(cached: bool = True) -> Dict[str, Any]:
+    """
+    Globals to exec strategy code in: backtrader resolves to CACHED_BT, or to
+    the plain module when `cached` is False or the cache is switched off.
+    """
+    if cached and INDICATOR_CACHE_MODE != "off":
+        return {"__builtins__": STRATEGY_BUILTINS, "backtrader": CACHED_BT, "bt": CACHED_BT}
+    return {"__builtins__": builtins.__dict__, "backtrader": bt, "bt": bt}
@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from src.runner import run_backtest
+from src.sandbox import call_isolated
+
+JOB_WORKERS = int(os.environ.get("BACKTRADER_JOB_WORKERS", os.cpu_count() or 1))
+# Finished jobs kept for polling before the oldest are dropped
+JOB_HISTORY = int(os.environ.get("BACKTRADER_JOB_HISTORY", 1000))
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled."""
+
+def _run_job(job_id: str, payload: Dict[str, Any], progress: Any, cancelled: Any,
+             limits: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Worker entry point: run one backtest, publishing progress and honouring
+    cancellation. With `limits` it runs in a resource-limited child of the worker.
+    """
+    if job_id in cancelled:
+        raise JobCancelled(job_id)
+    progress[job_id] = 0.0
+
+    def report(fraction: float) -> None:
+        if job_id in cancelled:
+            raise JobCancelled(job_id)
+        progress[job_id] = fraction
+
+    if limits is not None:
+        return call_isolated(lambda: run_backtest(payload, progress=report), limits, reraise=(JobCancelled,))
+    return run_backtest(payload, progress=report)
+
+class Job:
+    """Bookkeeping for one submitted backtest."""
+    def __init__(self, job_id: str, future: Future):
+        self.id = job_id
+        self.future = future
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+class JobManager:
+    """
+    Runs backtests in a bounded process pool, decoupled from request lifetimes.
+    Progress and cancellation flags are shared with workers through a
+    multiprocessing manager; cancellation of a running job is cooperative
+    (checked each time the job reports progress).
+    """
+    def __init__(self, max_workers: int = JOB_WORKERS, history: int = JOB_HISTORY):
+        self.max_workers = max_workers
+        self.history = history
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress: Any = None
+        self._cancelled: Any = None
+
+    def _ensure_started(self) -> None:
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._cancelled = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def submit(self, payload: Dict[str, Any], limits: Optional[Dict[str, float]] = None) -> Job:
+        """Queue a backtest and return its Job immediately; `limits` isolates it (see sandbox)."""
+        with self._lock:
+            self._ensure_started()
+            self._prune()
+            job_id = uuid.uuid4().hex
+            future = self._executor.submit(_run_job, job_id, payload, self._progress, self._cancelled, limits)
+            job = Job(job_id, future)
+            self._jobs[job_id] = job
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job outright, or flag a running one to stop at its next progress check."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status in ("done", "failed", "cancelled"):
+            return job
+        self._cancelled[job_id] = True
+        if job.future.cancel():
+            self._finish(job, job.future)
+        return job
+
+    def progress(self, job: Job) -> float:
+        if job.status == "done":
+            return 1.0
+        if self._progress is None:
+            return 0.0
+        return float(self._progress.get(job.id, 0.0))
+
+    def describe(self, job: Job) -> Dict[str, Any]:
+        """JobOut-shaped view of a job."""
+        status = job.status
+        if status == "queued" and self._progress is not None and job.id in self._progress:
+            status = "running"
+        return {
+            "job_id": job.id, "status": status, "progress": round(self.progress(job), 4),
+            "created": job.created, "finished": job.finished,
+            "result": job.result, "error": job.error
+        }
+
+    def _finish(self, job: Job, future: Future) -> None:
+        if job.finished is not None:
+            return
+        try:
+            job.result = future.result()
+            job.status = "done"
+        except (CancelledError, JobCancelled):
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        job.finished = time.time()
+        if self._progress is not None:
+            self._progress.pop(job.id, None)
+            self._cancelled.pop(job.id, None)
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.finished is not None]
+        if len(finished) >= self.history:
+            finished.sort(key=lambda j: j.finished)
+            for job in finished[:len(finished) - self.history + 1]:
+                del self._jobs[job.id]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor = None
+
+JOB_MANAGER = JobManager()
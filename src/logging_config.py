@@ -1,7 +1,8 @@
 import logging
-import hashlib
 from typing import Any
 
+from src.utils.hashing import code_hash as _code_hash
+
 def setup_logging():
     """Setup basic logging configuration for the service."""
     logging.basicConfig(
@@ -14,7 +15,7 @@ def log_code_hash(code: str) -> str:
     Generate and log a hash of the strategy code for debugging purposes.
     Returns the hash for reference.
     """
-    code_hash = hashlib.sha256(code.encode()).hexdigest()[:8]
+    code_hash = _code_hash(code)[:8]
     logger = logging.getLogger(__name__)
     logger.info(f"Processing strategy with code hash: {code_hash}")
     return code_hash
@@ -1,36 +1,430 @@
-from fastapi import FastAPI, HTTPException
-from src.schemas import RunRequest, RunResponse
-from src.runner import run_backtest
+import json
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import List
+from fastapi import FastAPI, HTTPException, Request, File, Form, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from src.schemas import (
+    RunRequest, RunResponse, CheckpointRequest, OptimizeRequest, OptimizeResponse, JobOut, BatchRequest, BatchResponse,
+    StoreRequest, StoreEntry, StoreAppendOut, WalkForwardRequest, WalkForwardResponse
+)
+from src.runner import run_backtest, iter_backtest, STRATEGY_CACHE
+from src.optimizer import run_optimization
+from src.batch import run_batch
+from src.checkpoints import CHECKPOINT_MAX, CHECKPOINTS, CheckpointNotFound
+from src.walkforward import run_walkforward
+from src.result_cache import RESULT_CACHE
+from src.jobs import JOB_MANAGER
+from src import metrics
+from src.metrics import BARS_PER_SECOND, BARS_TOTAL, COLLECTORS, RUNS_IN_FLIGHT, RUNS_TOTAL, StageTimer
+from src.pool import WARM_POOL
+from src.profiling import PROFILING, ProfilerBusy, profile_slot
+from src.sandbox import ISOLATION, RunLimitExceeded, call_isolated, effective_limits, run_isolated
+from src.store import STORE, SymbolNotFound
+from src.utils.binary_bars import decode_bars, UnsupportedFormat
+from src.utils.datafeed import columns_to_lists
+from src.indicators import INDICATOR_CACHE
+from src.utils.resample import RESAMPLE_CACHE, resample_columns
+from src.utils.responses import FastJSONResponse
 from datetime import datetime
 
-app = FastAPI(title="Backtrader Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    WARM_POOL.start()
+    yield
+    WARM_POOL.shutdown()
+    JOB_MANAGER.shutdown()
+    CHECKPOINTS.clear()
+
+app = FastAPI(title="Backtrader Service", lifespan=lifespan)
+
+class RequestStart:
+    """
+    Plain ASGI middleware stamping each HTTP request's start time into
+    scope["state"] (read back as request.state.started). It runs before body
+    parsing, so /run can time request validation, and unlike
+    @app.middleware("http") adds no extra task or response buffering.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["started"] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+app.add_middleware(RequestStart)
 
 @app.get("/health", tags=["health"])
 def health_check():
     """
     Health check endpoint to verify service status.
-    Returns basic service information and status.
+    Returns basic service information and status; `status` is "warming"
+    until every worker of the warm pool (when enabled) has initialized.
     """
+    pool = WARM_POOL.status()
     return {
-        "status": "healthy",
+        "status": "warming" if pool["enabled"] and not pool["ready"] else "healthy",
         "service": "Backtrader Service",
         "timestamp": datetime.utcnow().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "pool": pool
     }
 
+@app.get("/cache/stats", tags=["health"])
+def cache_stats():
+    """Hit/miss counters and sizes of the in-process caches."""
+    return {"strategies": STRATEGY_CACHE.stats(), "results": RESULT_CACHE.stats(), "resampled": RESAMPLE_CACHE.stats(),
+            "indicators": INDICATOR_CACHE.stats()}
+
+def _cache_metrics():
+    """Cache counters for /metrics, read from the caches at scrape time."""
+    caches = {"strategies": STRATEGY_CACHE, "results": RESULT_CACHE, "resampled": RESAMPLE_CACHE,
+              "indicators": INDICATOR_CACHE}
+    lines = []
+    for name, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+        metric = f"backtrader_cache_{name}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {metric} Cache {name} by cache", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{cache="{cache}"}} {c.stats()[name]}' for cache, c in caches.items()]
+    return lines
+
+COLLECTORS.append(_cache_metrics)
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Prometheus metrics: /run stage latency histograms, bars per second,
+    run outcomes (including result cache hits), in-flight runs and cache counters.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.delete("/cache/results/{code_hash}", tags=["backtest"])
+def invalidate_results(code_hash: str):
+    """Drop every cached /run result produced by the strategy with this SHA-256 code hash."""
+    return {"code_hash": code_hash, "invalidated": RESULT_CACHE.invalidate_code(code_hash)}
+
 @app.post("/run", response_model=RunResponse, tags=["backtest"])
-def run(req: RunRequest):
+def run(req: RunRequest, request: Request):
     """
-    Execute a backtest. MVP requires `bars` in request.
-    If only symbol+dates are provided, return 501 (future extension).
+    Execute a backtest on `bars`, or on symbol+start_date+end_date read from
+    the local bar store (404 when nothing is stored for that range).
+    Identical requests are served from the result cache (X-Cache / X-Cache-Age
+    headers); send `Cache-Control: no-cache` to force a fresh run.
+    With `Accept: application/x-ndjson` the run is streamed instead: one JSON
+    record per line for each equity point and closed trade, then the summary.
+    Send `X-Timing: 1` to get per-stage durations (ms) back in an X-Timing header.
+    With `profile` set the run is profiled (bypassing the result cache) and
+    its hot spots are returned under `profile`; 429 while the profiler is busy.
+    With `checkpoint` set the run is kept resumable (bypassing the result
+    cache): the response carries a `checkpoint_id` for POST /checkpoints/{checkpoint_id}.
     """
+    timer = StageTimer()
+    timer.add("validate", time.perf_counter() - request.state.started)
     if not req.code:
         raise HTTPException(400, "code is required")
-    if not req.bars and not (req.symbol and req.start_date and req.end_date):
-        raise HTTPException(400, "Provide bars or symbol with start_date and end_date")
-    if not req.bars:
-        raise HTTPException(501, "symbol-based data loading not implemented in MVP")
+    if not req.bars and not req.portfolio and not (req.symbol and req.start_date and req.end_date):
+        raise HTTPException(400, "Provide bars, portfolio or symbol with start_date and end_date")
+    payload = req.model_dump()
+    key_payload = payload
+    stored = None
+    if not req.bars and not req.portfolio:
+        with timer.stage("store"):
+            stored, source = _load_stored(req)
+            # Appending bars changes the store row count and so the cache key
+            key_payload = {**payload, "store_rows": STORE.count(req.symbol, source)}
+        payload["bars"] = stored
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        if ISOLATION == "process":
+            # Streaming runs on a thread of this process, outside any resource limits
+            raise HTTPException(403, "streaming runs are unavailable with process isolation")
+        payload["profile"] = None
+        payload["checkpoint"] = False
+        return StreamingResponse(_ndjson(iter_backtest(payload)), media_type="application/x-ndjson")
+    if payload["checkpoint"]:
+        result = _checkpointed(CHECKPOINTS.start, (payload,), _bar_count(payload), timer)
+        with timer.stage("serialize"):
+            response = FastJSONResponse(result)
+        return _timed(response, timer, request)
+    profiling = payload["profile"] is not None
+    with timer.stage("cache"):
+        key = RESULT_CACHE.key(key_payload)
+        skip = profiling or "no-cache" in request.headers.get("cache-control", "")
+        cached = None if skip else RESULT_CACHE.get(key)
+    if cached is not None:
+        result, age = cached
+        RUNS_TOTAL.inc(1, "cache_hit")
+        with timer.stage("serialize"):
+            response = FastJSONResponse(result, headers={"X-Cache": "HIT", "X-Cache-Age": str(int(age))})
+        return _timed(response, timer, request)
+    RUNS_IN_FLIGHT.inc()
+    try:
+        with _profile_guard(payload):
+            result = _execute(payload, timer)
+    except HTTPException:
+        RUNS_TOTAL.inc(1, "error")
+        raise
+    except RunLimitExceeded as e:
+        RUNS_TOTAL.inc(1, "limit_exceeded")
+        raise HTTPException(e.status, e.as_dict())
+    except Exception as e:
+        RUNS_TOTAL.inc(1, "error")
+        raise HTTPException(500, str(e))
+    finally:
+        RUNS_IN_FLIGHT.dec()
+    RUNS_TOTAL.inc(1, "ok")
+    bars = _bar_count(payload)
+    BARS_TOTAL.inc(bars)
+    seconds = timer.stages.get("run") or timer.stages.get("execute")
+    if seconds:
+        BARS_PER_SECOND.observe(bars / seconds)
+    if stored is not None and req.include_ohlcv:
+        result["ohlcv"] = columns_to_lists(stored)
+    if not profiling:
+        RESULT_CACHE.set(key, req.code, result)
+    with timer.stage("serialize"):
+        response = FastJSONResponse(result, headers={"X-Cache": "MISS", "X-Cache-Age": "0"})
+    return _timed(response, timer, request)
+
+def _timed(response, timer: StageTimer, request: Request):
+    """Record the request's stage timings and attach X-Timing when the client asked for it."""
+    timer.add("total", time.perf_counter() - request.state.started)
+    timer.observe()
+    if request.headers.get("x-timing", "").lower() in ("1", "true", "yes"):
+        response.headers["X-Timing"] = timer.header()
+    return response
+
+def _bar_count(payload) -> int:
+    """Bars fed to a run: rows or columnar bars, summed over a portfolio's symbols."""
+    def count(bars):
+        return len(bars["time"]) if isinstance(bars, dict) else len(bars or ())
+    if payload.get("portfolio"):
+        return sum(count(b) for b in payload["portfolio"].values())
+    return count(payload.get("bars"))
+
+@contextmanager
+def _profile_guard(payload):
+    """Admit a profiled run only when profiling is on and a profiler slot is free."""
+    if payload.get("profile") is None:
+        yield
+        return
+    if PROFILING == "off":
+        raise HTTPException(403, "profiling is disabled on this server")
+    try:
+        with profile_slot():
+            yield
+    except ProfilerBusy as e:
+        raise HTTPException(429, str(e))
+
+def _execute(payload, timer=None):
+    """
+    Run a backtest in a resource-limited child process (BACKTRADER_ISOLATION=process),
+    else in the warm worker pool when enabled, else in this thread. Inline runs
+    report their compile/feed/run/results stages to `timer`; the others are
+    timed as a single "execute" stage.
+    """
+    if ISOLATION != "process" and not WARM_POOL.enabled:
+        return run_backtest(payload, timer=timer)
+    with (timer or StageTimer()).stage("execute"):
+        if ISOLATION == "process":
+            return run_isolated(payload, payload.get("limits"))
+        return WARM_POOL.run(payload)
+
+def _sweep(fn, payload):
+    """
+    Run a fan-out endpoint's fn(payload) here, or under BACKTRADER_ISOLATION=process
+    in a resource-limited child process (its worker pool inherits the limits).
+    ValueError maps to 400, limit errors to their structured status, others to 500.
+    """
     try:
-        return run_backtest(req.model_dump())
+        if ISOLATION == "process":
+            return call_isolated(lambda: fn(payload), reraise=(ValueError,))
+        return fn(payload)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except RunLimitExceeded as e:
+        raise HTTPException(e.status, e.as_dict())
     except Exception as e:
-        raise HTTPException(500, str(e))
\ No newline at end of file
+        raise HTTPException(500, str(e))
+
+def _checkpointed(call, args, bars: int, timer: StageTimer):
+    """
+    Start or resume a checkpointed run. It always runs in this process (the
+    suspended run lives here), so it is refused under process isolation.
+    """
+    if CHECKPOINT_MAX <= 0:
+        raise HTTPException(403, "checkpoints are disabled on this server")
+    if ISOLATION == "process":
+        raise HTTPException(403, "checkpoints are unavailable with process isolation")
+    RUNS_IN_FLIGHT.inc()
+    try:
+        result = call(*args, timer=timer)
+    except CheckpointNotFound as e:
+        RUNS_TOTAL.inc(1, "error")
+        raise HTTPException(404, e.args[0])
+    except ValueError as e:
+        RUNS_TOTAL.inc(1, "error")
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        RUNS_TOTAL.inc(1, "error")
+        raise HTTPException(500, str(e))
+    finally:
+        RUNS_IN_FLIGHT.dec()
+    RUNS_TOTAL.inc(1, "ok")
+    BARS_TOTAL.inc(bars)
+    if timer.stages.get("run"):
+        BARS_PER_SECOND.observe(bars / timer.stages["run"])
+    return result
+
+def _load_stored(req: RunRequest):
+    """
+    Columns for req.symbol between start_date and end_date from the bar store
+    at req.timeframe (default 1d), resampled from a finer stored series when
+    that timeframe is not stored itself. Returns (columns, stored timeframe).
+    """
+    timeframe = req.timeframe or "1d"
+    try:
+        source = STORE.source(req.symbol, timeframe)
+        columns = STORE.load(req.symbol, source, req.start_date, req.end_date)
+        if not len(columns["time"]):
+            raise HTTPException(404, f"no stored bars for {req.symbol} between {req.start_date} and {req.end_date}")
+        return resample_columns(columns, timeframe), source
+    except SymbolNotFound as e:
+        raise HTTPException(404, e.args[0])
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+def _ndjson(batches):
+    """Encode batches of stream records as newline-delimited JSON chunks."""
+    for batch in batches:
+        yield "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in batch)
+
+@app.post("/run/binary", response_model=RunResponse, tags=["backtest"])
+def run_binary(request: str = Form(..., description="RunRequest JSON without bars"),
+               bars: UploadFile = File(..., description="Columnar bars: .npy, Arrow IPC or MessagePack")):
+    """
+    Execute a backtest with bars uploaded in a binary columnar format.
+    The `bars` part's content type selects the decoder (application/x-npy,
+    application/vnd.apache.arrow.stream|file, application/msgpack).
+    """
+    try:
+        req = RunRequest.model_validate_json(request)
+    except ValidationError as e:
+        raise HTTPException(422, e.errors(include_url=False, include_context=False))
+    try:
+        columns = decode_bars(bars.file.read(), bars.content_type or "", bars.filename or "")
+    except UnsupportedFormat as e:
+        raise HTTPException(415, str(e))
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    payload = req.model_dump()
+    payload["bars"] = columns
+    if req.checkpoint:
+        return FastJSONResponse(_checkpointed(CHECKPOINTS.start, (payload,), _bar_count(payload), StageTimer()))
+    try:
+        with _profile_guard(payload):
+            result = _execute(payload)
+    except HTTPException:
+        raise
+    except RunLimitExceeded as e:
+        raise HTTPException(e.status, e.as_dict())
+    except Exception as e:
+        raise HTTPException(500, str(e))
+    if req.include_ohlcv:
+        # The bars the run saw: resampling is cached, so this reuses the run's aggregation
+        result["ohlcv"] = columns_to_lists(resample_columns(columns, req.timeframe))
+    return FastJSONResponse(result)
+
+@app.post("/checkpoints/{checkpoint_id}", response_model=RunResponse, tags=["checkpoints"])
+def resume_checkpoint(checkpoint_id: str, req: CheckpointRequest, request: Request):
+    """
+    Append bars to a run started with `checkpoint` and continue it from its
+    last bar; only the new bars are run. Returns the results over every bar
+    so far, as a full run over them would (ohlcv, when echoed, is columnar).
+    404 once the checkpoint has been deleted or evicted.
+    """
+    timer = StageTimer()
+    timer.add("validate", time.perf_counter() - request.state.started)
+    bars = req.model_dump()["bars"]
+    result = _checkpointed(CHECKPOINTS.resume, (checkpoint_id, bars), _bar_count({"bars": bars}), timer)
+    with timer.stage("serialize"):
+        response = FastJSONResponse(result)
+    return _timed(response, timer, request)
+
+@app.delete("/checkpoints/{checkpoint_id}", tags=["checkpoints"])
+def delete_checkpoint(checkpoint_id: str):
+    """Release a checkpointed run: it finishes at its last bar and can no longer be resumed."""
+    if not CHECKPOINTS.delete(checkpoint_id):
+        raise HTTPException(404, "checkpoint not found")
+    return {"checkpoint_id": checkpoint_id, "deleted": True}
+
+@app.get("/store", response_model=List[StoreEntry], tags=["store"])
+def list_store():
+    """Symbols and timeframes held in the local bar store."""
+    return STORE.symbols()
+
+@app.post("/store/{symbol}", response_model=StoreAppendOut, tags=["store"])
+def append_store(symbol: str, req: StoreRequest):
+    """
+    Append bars to the local store for `symbol`. Bars must start after the
+    last stored bar; later /run requests can then use symbol+dates instead of bars.
+    """
+    bars = req.model_dump()["bars"]
+    try:
+        return STORE.append(symbol, req.timeframe, bars)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.post("/run/batch", response_model=BatchResponse, tags=["backtest"])
+def run_batch_endpoint(req: BatchRequest):
+    """
+    Evaluate many strategies against one shared `bars` payload.
+    Bars are validated and loaded once; entries fan out across worker
+    processes and each reports its own summary or error.
+    """
+    return _sweep(run_batch, req.model_dump())
+
+@app.post("/optimize", response_model=OptimizeResponse, tags=["backtest"])
+def optimize(req: OptimizeRequest):
+    """
+    Sweep one strategy over a param grid using a process pool.
+    Bars are loaded and code compiled once per worker.
+    """
+    return _sweep(run_optimization, req.model_dump())
+
+@app.post("/walkforward", response_model=WalkForwardResponse, tags=["backtest"])
+def walkforward(req: WalkForwardRequest):
+    """
+    Walk-forward analysis: optimize `param_grid` on each rolling in-sample
+    window (all windows fanned out across one process pool), run the winners
+    on the following out-of-sample bars and stitch those legs together.
+    """
+    return _sweep(run_walkforward, req.model_dump())
+
+@app.post("/jobs", response_model=JobOut, status_code=202, tags=["jobs"])
+def submit_job(req: RunRequest):
+    """
+    Queue a backtest on the job process pool and return its id immediately.
+    Poll GET /jobs/{job_id} for status, progress and the result.
+    """
+    if not req.bars:
+        raise HTTPException(400, "bars are required for jobs")
+    # Under process isolation each job runs in its own limited child of a job worker
+    limits = effective_limits(req.limits.model_dump() if req.limits else None) if ISOLATION == "process" else None
+    return JOB_MANAGER.describe(JOB_MANAGER.submit(req.model_dump(exclude={"profile", "checkpoint"}), limits))
+
+@app.get("/jobs/{job_id}", response_model=JobOut, tags=["jobs"])
+def get_job(job_id: str):
+    """Report status, progress and (when done) the result of a job."""
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        raise HTTPException(404, "job not found")
+    return JOB_MANAGER.describe(job)
+
+@app.delete("/jobs/{job_id}", response_model=JobOut, tags=["jobs"])
+def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    job = JOB_MANAGER.cancel(job_id)
+    if job is None:
+        raise HTTPException(404, "job not found")
+    return JOB_MANAGER.describe(job)
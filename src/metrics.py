@@ -0,0 +1,119 @@
+"""
+Minimal Prometheus instrumentation: counters, gauges and histograms
+rendered in the text exposition format at /metrics, plus StageTimer for
+per-stage request timings (also returned in the optional X-Timing header).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = "untyped"
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+    def render(self) -> List[str]:
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in sorted(self._values.items())]
+
+class Gauge(Counter):
+    kind = "gauge"
+    def dec(self, amount: float = 1.0, *labels: str) -> None:
+        self.inc(-amount, *labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total, n = self._values.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[labels] = (counts, total + value, n + 1)
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, (counts, total, n) in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, counts):
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {count}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, inf)} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {n}")
+        return lines
+
+REGISTRY: List[_Metric] = []
+# Callables returning extra exposition lines at scrape time (e.g. cache counters)
+COLLECTORS: List[Callable[[], List[str]]] = []
+
+def render() -> str:
+    """Every registered metric and collector in Prometheus text format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for collect in COLLECTORS:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+STAGE_SECONDS = Histogram(
+    "backtrader_stage_seconds", "Time spent in each stage of a /run request",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    labelnames=("stage",)
+)
+BARS_PER_SECOND = Histogram(
+    "backtrader_bars_per_second", "Bars processed per second of backtest execution",
+    buckets=(1e2, 1e3, 5e3, 1e4, 2.5e4, 5e4, 1e5, 2.5e5, 1e6)
+)
+BARS_TOTAL = Counter("backtrader_bars_total", "Bars processed by completed runs")
+RUNS_TOTAL = Counter("backtrader_runs_total", "/run requests by outcome", labelnames=("outcome",))
+RUNS_IN_FLIGHT = Gauge("backtrader_runs_in_flight", "Backtests currently executing")
+
+class StageTimer:
+    """Accumulates perf_counter durations per named stage, in first-use order."""
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def observe(self) -> None:
+        """Record every stage in the stage latency histogram."""
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, name)
+
+    def header(self) -> str:
+        """X-Timing value: stage=milliseconds pairs, e.g. "validate=0.41, run=12.30"."""
+        return ", ".join(f"{name}={seconds * 1000:.2f}" for name, seconds in self.stages.items())
@@ -0,0 +1,104 @@
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+# Upper bound for iterations per request
+MAX_ITERATIONS = int(os.environ.get("BACKTRADER_MC_MAX_ITERATIONS", 100000))
+# Upper bound for path_points per request (the sampled paths hold iterations x path_points floats)
+MAX_PATH_POINTS = int(os.environ.get("BACKTRADER_MC_MAX_PATH_POINTS", 1000))
+# Simulated path elements held in memory at once; iterations are processed in chunks of this size
+CHUNK_ELEMENTS = 4_000_000
+
+DEFAULT_PERCENTILES = (5.0, 25.0, 50.0, 75.0, 95.0)
+
+def _trade_paths(pnls: np.ndarray, capital: float, rng: np.random.Generator,
+                 size: int, method: str) -> np.ndarray:
+    """Equity after each trade for `size` resampled trade sequences, starting capital first."""
+    if method == "shuffle":
+        steps = rng.permuted(np.broadcast_to(pnls, (size, len(pnls))), axis=1)
+    else:
+        steps = pnls[rng.integers(0, len(pnls), (size, len(pnls)))]
+    paths = np.empty((size, len(pnls) + 1))
+    paths[:, 0] = capital
+    np.cumsum(steps, axis=1, out=paths[:, 1:])
+    paths[:, 1:] += capital
+    return paths
+
+def _block_paths(returns: np.ndarray, capital: float, rng: np.random.Generator,
+                 size: int, block: int) -> np.ndarray:
+    """Equity paths from circular block-bootstrapped per-bar returns, starting capital first."""
+    n = len(returns)
+    starts = rng.integers(0, n, (size, -(-n // block)))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(size, -1)[:, :n] % n
+    paths = np.empty((size, n + 1))
+    paths[:, 0] = capital
+    np.cumprod(1.0 + returns[idx], axis=1, out=paths[:, 1:])
+    paths[:, 1:] *= capital
+    return paths
+
+def simulate(trade_pnls: Sequence[float], values: Sequence[float], capital: float,
+             iterations: int = 1000, method: str = "bootstrap", block: int = 20,
+             percentiles: Sequence[float] = DEFAULT_PERCENTILES, path_points: int = 100,
+             seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Monte Carlo resampling of a finished run, vectorized across iterations.
+    method:
+      "bootstrap": draw closed-trade net PnLs with replacement
+      "shuffle":   permute the closed-trade order (final value is fixed, drawdown varies)
+      "block":     circular block bootstrap of per-bar equity returns (`block` bars)
+    Returns percentile bands (one value per entry of `percentiles`) for final
+    value, return and max drawdown, plus the equity path at up to
+    `path_points` evenly spaced steps (trades, or bars for "block").
+    Iterations above MAX_ITERATIONS and path_points above MAX_PATH_POINTS
+    are capped; the result reports the iterations and path steps used.
+    """
+    if iterations < 1:
+        raise ValueError("iterations must be at least 1")
+    iterations = min(iterations, MAX_ITERATIONS)
+    path_points = min(path_points, MAX_PATH_POINTS)
+    pcts = np.asarray(percentiles, dtype=np.float64)
+    if pcts.size == 0 or np.any((pcts < 0) | (pcts > 100)):
+        raise ValueError("percentiles must be between 0 and 100")
+    if method == "block":
+        values = np.asarray(values, dtype=np.float64)
+        series = np.diff(np.concatenate(([capital], values))) / np.concatenate(([capital], values[:-1]))
+    elif method in ("bootstrap", "shuffle"):
+        series = np.asarray(trade_pnls, dtype=np.float64)
+    else:
+        raise ValueError(f"unknown monte carlo method {method!r}")
+    if series.size == 0:
+        # Nothing to resample (e.g. no closed trades): every path stays at capital
+        flat = [float(capital)] * pcts.size
+        return {"method": method, "iterations": iterations, "percentiles": pcts.tolist(),
+                "final_value": flat, "return_pct": [0.0] * pcts.size, "max_drawdown_pct": [0.0] * pcts.size,
+                "path_steps": [0], "path": [[float(capital)] for _ in range(pcts.size)]}
+
+    rng = np.random.default_rng(seed)
+    steps = np.unique(np.linspace(0, series.size, min(path_points, series.size + 1)).round().astype(np.int64))
+    finals = np.empty(iterations)
+    drawdowns = np.empty(iterations)
+    sampled = np.empty((iterations, steps.size))
+    chunk = max(1, CHUNK_ELEMENTS // (series.size + 1))
+    for lo in range(0, iterations, chunk):
+        size = min(chunk, iterations - lo)
+        if method == "block":
+            paths = _block_paths(series, capital, rng, size, max(1, block))
+        else:
+            paths = _trade_paths(series, capital, rng, size, method)
+        peak = np.maximum.accumulate(paths, axis=1)
+        drawdowns[lo:lo + size] = np.max(100.0 * (peak - paths) / peak, axis=1)
+        finals[lo:lo + size] = paths[:, -1]
+        sampled[lo:lo + size] = paths[:, steps]
+
+    return {
+        "method": method,
+        "iterations": iterations,
+        "percentiles": pcts.tolist(),
+        "final_value": np.percentile(finals, pcts).tolist(),
+        "return_pct": (np.percentile(finals, pcts) / capital * 100.0 - 100.0).tolist(),
+        "max_drawdown_pct": np.percentile(drawdowns, pcts).tolist(),
+        "path_steps": steps.tolist(),
+        # One row per percentile, one column per step
+        "path": np.percentile(sampled, pcts, axis=0).tolist()
+    }
@@ -0,0 +1,54 @@
+import itertools
+import os
+from typing import Any, Dict, List
+
+from src.parallel import run_tasks
+from src.runner import _load_strategy_class
+from src.utils.datafeed import bars_to_columns
+from src.utils.resample import resample_columns
+
+# Upper bound for grid size
+MAX_COMBINATIONS = int(os.environ.get("BACKTRADER_MAX_COMBINATIONS", 10000))
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Expand {name: [values]} into the list of all param combinations, in grid order."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def run_optimization(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one strategy over a grid of params.
+    Inputs:
+      payload['code']: Python bt.Strategy class as string
+      payload['bars']: list of OHLCV dicts
+      payload['param_grid']: dict of param name -> list of values
+      payload['params']: fixed params applied to every combination
+      payload['capital']: initial cash (float)
+      payload['timeframe']: optional timeframe the bars are aggregated to first
+      payload['max_workers']: optional worker count (capped by MAX_WORKERS)
+      payload['indicator_cache']: False disables the shared indicator cache
+    Returns:
+      dict with keys: param_names, results (one row per combination)
+    """
+    grid: Dict[str, List[Any]] = payload.get("param_grid") or {}
+    if not grid or any(not values for values in grid.values()):
+        raise ValueError("param_grid must map each param to a non-empty list of values")
+    combos = expand_grid(grid)
+    if len(combos) > MAX_COMBINATIONS:
+        raise ValueError(f"param_grid expands to {len(combos)} combinations (max {MAX_COMBINATIONS})")
+
+    # Fail fast on bad code here rather than inside every worker
+    _load_strategy_class(payload["code"], payload.get("indicator_cache", True))
+
+    fixed: Dict[str, Any] = payload.get("params") or {}
+    capital = float(payload.get("capital", 10000))
+    combos = [{**fixed, **c} for c in combos]
+    tasks = [{"code": payload["code"], "params": c, "capital": capital} for c in combos]
+    columns = resample_columns(bars_to_columns(payload["bars"]), payload.get("timeframe"))
+    rows = run_tasks(columns, tasks, payload.get("max_workers"), payload.get("symbol"),
+                     payload.get("indicator_cache", True))
+
+    return {
+        "param_names": list(grid),
+        "results": [{"params": c, **row} for c, row in zip(combos, rows)]
+    }
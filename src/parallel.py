@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from src.runner import _load_strategy_class, run_leg, run_summary
+
+# Upper bound for worker processes per fan-out request
+MAX_WORKERS = int(os.environ.get("BACKTRADER_MAX_WORKERS", os.cpu_count() or 1))
+
+# Per-worker-process state set once by _init_worker and reused by every pooled task
+_worker: Dict[str, Any] = {}
+
+def _init_worker(columns: Dict[str, Any], symbol: Optional[str], indicator_cache: bool = True) -> None:
+    """Keep the shared bar columns for the lifetime of the worker."""
+    _worker["columns"] = columns
+    _worker["symbol"] = symbol
+    _worker["indicator_cache"] = indicator_cache
+
+def _run_task(task: Dict[str, Any], columns: Dict[str, Any], symbol: Optional[str],
+              indicator_cache: bool = True) -> Dict[str, Any]:
+    """
+    Run one {code, params, capital} task against `columns`.
+    Optional `start`/`stop` bar indices restrict it to a slice (views, no
+    copy); `detail` adds run_leg's trades and per-bar record to the row, with
+    its first `warmup` bars only warming up indicators.
+    """
+    try:
+        # Compiled at most once per process thanks to STRATEGY_CACHE
+        user_cls = _load_strategy_class(task["code"], indicator_cache)
+        if "start" in task or "stop" in task:
+            window = slice(task.get("start"), task.get("stop"))
+            columns = {name: values[window] for name, values in columns.items()}
+        if task.get("detail"):
+            leg = run_leg(user_cls, columns, float(task["capital"]), task["params"], symbol, indicator_cache,
+                          task.get("warmup", 0))
+            return {**leg, "error": None}
+        summary = run_summary(user_cls, columns, float(task["capital"]), task["params"], symbol, indicator_cache)
+        return {"summary": summary, "error": None}
+    except Exception as e:
+        return {"summary": None, "error": str(e)}
+
+def _pool_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Pool entry point: run a task against the bars _init_worker kept for this worker."""
+    return _run_task(task, _worker["columns"], _worker["symbol"], _worker["indicator_cache"])
+
+def run_tasks(columns: Dict[str, Any], tasks: List[Dict[str, Any]],
+              max_workers: Optional[int] = None, symbol: Optional[str] = None,
+              indicator_cache: bool = True) -> List[Dict[str, Any]]:
+    """
+    Run {code, params, capital[, start, stop, detail, warmup]} tasks over one shared set of bar columns,
+    fanning out across a process pool that loads the bars once per worker.
+    With a single worker the tasks run inline, reading `columns` directly, so
+    concurrent requests in this process never see each other's bars.
+    Tasks on the same bars share each worker's indicator cache unless indicator_cache is False.
+    Returns one {summary, error} row per task, in task order.
+    """
+    workers = max(1, min(max_workers or MAX_WORKERS, MAX_WORKERS, len(tasks)))
+    if workers == 1:
+        return [_run_task(t, columns, symbol, indicator_cache) for t in tasks]
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(columns, symbol, indicator_cache)) as pool:
+        return list(pool.map(_pool_task, tasks, chunksize=chunksize))
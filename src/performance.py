@@ -0,0 +1,81 @@
+import math
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+# Conventions of the backtrader analyzers this module replaces:
+# SharpeRatio(timeframe=Days, annualize=True) with its default 1% annual
+# risk-free rate converted to a daily rate and population stddev.
+PERIODS_PER_YEAR = 252
+RISK_FREE_RATE = 0.01
+
+def daily_returns(dt: np.ndarray, values: np.ndarray, capital: float) -> np.ndarray:
+    """
+    Returns between the last portfolio values of consecutive calendar days,
+    the first day measured against starting capital (as bt's TimeReturn).
+    dt holds backtrader date numbers (days since 0001-01-01 as floats).
+    """
+    if len(values) == 0:
+        return np.empty(0)
+    day = np.floor(dt)
+    last = np.append(np.flatnonzero(day[1:] != day[:-1]), len(values) - 1)
+    closes = values[last]
+    return closes / np.concatenate(([capital], closes[:-1])) - 1.0
+
+def max_drawdown_pct(values: np.ndarray) -> float:
+    """Largest peak-to-trough decline in percent of the running peak."""
+    if len(values) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(values)
+    return float(np.max(100.0 * (peak - values) / peak))
+
+def compute_summary(dt: Sequence[float], values: Sequence[float], invested: Sequence[bool],
+                    trade_pnls: Sequence[float], trades_opened: int, capital: float,
+                    final_value: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Compute every SummaryOut field in one vectorized pass over the raw
+    per-bar record (date numbers, portfolio values, in-market flags) and the
+    closed trades' net PnL.
+    """
+    dt = np.asarray(dt, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    invested = np.asarray(invested, dtype=bool)
+    pnls = np.asarray(trade_pnls, dtype=np.float64)
+    if final_value is None:
+        final_value = float(values[-1]) if len(values) else capital
+
+    rate = pow(1.0 + RISK_FREE_RATE, 1.0 / PERIODS_PER_YEAR) - 1.0
+    excess = daily_returns(dt, values, capital) - rate
+    sharpe = sortino = 0.0
+    if len(excess):
+        mean = excess.mean()
+        std = math.sqrt(np.mean((excess - mean) ** 2))
+        downside = math.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+        # Constant returns (e.g. an idle run) have no risk to reward: both ratios stay 0
+        if std > 0:
+            sharpe = math.sqrt(PERIODS_PER_YEAR) * mean / std
+            if downside > 0:
+                sortino = math.sqrt(PERIODS_PER_YEAR) * mean / downside
+
+    years = (dt[-1] - dt[0]) / 365.25 if len(dt) > 1 else 0.0
+    cagr = (final_value / capital) ** (1.0 / years) - 1.0 if years > 0 and final_value > 0 else 0.0
+
+    won = int(np.count_nonzero(pnls >= 0.0))
+    gross_profit = float(pnls[pnls > 0].sum())
+    gross_loss = float(-pnls[pnls < 0].sum())
+    profit_factor = gross_profit / gross_loss if gross_loss > 0 else None
+
+    return {
+        "final_value": round(final_value, 6),
+        "return_pct": round((final_value / capital - 1.0) * 100.0, 6),
+        # Like TradeAnalyzer, trades still open at the end count towards the total
+        "total_trades": int(trades_opened),
+        "win_rate": round(won / trades_opened, 6) if trades_opened else 0.0,
+        "max_drawdown_pct": round(max_drawdown_pct(values), 6),
+        "sharpe": float(sharpe),
+        "sortino": round(float(sortino), 6),
+        "cagr_pct": round(float(cagr) * 100.0, 6),
+        "exposure_pct": round(float(invested.mean()) * 100.0, 6) if len(invested) else 0.0,
+        "profit_factor": round(profit_factor, 6) if profit_factor is not None else None,
+        "avg_trade": round(float(pnls.mean()), 6) if len(pnls) else 0.0
+    }
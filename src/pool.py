@@ -0,0 +1,134 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from src.runner import run_backtest
+from src.sandbox import RunTimeout, effective_limits
+
+# Warm worker processes serving /run; 0 runs backtests in the request thread
+POOL_SIZE = int(os.environ.get("BACKTRADER_POOL_SIZE", 0))
+# Backtests per worker before the pool is replaced (size x this in total), bounding leaks from user code
+POOL_MAX_TASKS = int(os.environ.get("BACKTRADER_POOL_MAX_TASKS", 200)) or None
+
+WARMUP_CODE = """
+import backtrader as bt
+class Warmup(bt.Strategy):
+    def __init__(self):
+        self.sma = bt.ind.SMA(period=2)
+    def next(self):
+        if not self.position:
+            self.buy()
+        else:
+            self.close()
+"""
+
+WARMUP_BARS = {
+    "time": ["2020-01-01", "2020-01-02", "2020-01-03", "2020-01-06"],
+    "open": [1.0, 1.1, 1.2, 1.3], "high": [1.2, 1.3, 1.4, 1.5], "low": [0.9, 1.0, 1.1, 1.2],
+    "close": [1.1, 1.2, 1.3, 1.4], "volume": [1.0, 1.0, 1.0, 1.0]
+}
+
+def _warm_worker(warmed: Any) -> None:
+    """
+    Pool initializer: run one tiny backtest so backtrader's metaclass
+    machinery, Cerebro, the analyzers and the runner are all initialized
+    before the first real job, then count this worker as warm.
+    """
+    run_backtest({"code": WARMUP_CODE, "bars": WARMUP_BARS, "include_ohlcv": False})
+    with warmed.get_lock():
+        warmed.value += 1
+
+class WarmPool:
+    """
+    Long-lived pre-forked worker processes (a ProcessPoolExecutor) that
+    execute run_backtest payloads. The whole pool is replaced after
+    `size * max_tasks` jobs, when a worker dies (the job fails with 500) and
+    when a job overruns its wall-clock limit (408; its worker is killed).
+    Jobs still running in a killed pool fail with it. `status()` reports how
+    many workers have finished warming up.
+    """
+    def __init__(self, size: int = POOL_SIZE, max_tasks: Optional[int] = POOL_MAX_TASKS):
+        self.size = size
+        self.max_tasks = max_tasks
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks = 0
+        self._recycled = 0
+        self._warmed = multiprocessing.Value("i", 0)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def _fork(self) -> None:
+        self._warmed.value = 0
+        self._tasks = 0
+        self._pool = ProcessPoolExecutor(self.size, mp_context=multiprocessing.get_context("fork"),
+                                         initializer=_warm_worker, initargs=(self._warmed,))
+        # The first submit forks every worker; they warm up in the background
+        self._pool.submit(int)
+
+    def start(self) -> None:
+        """Fork the workers (no-op when disabled or already started); warming continues in the background."""
+        with self._lock:
+            if self.enabled and self._pool is None:
+                self._fork()
+
+    def _replace(self, pool: ProcessPoolExecutor, kill: bool) -> None:
+        """Swap `pool` for a fresh one unless that already happened; `kill` stops its workers now (lock held)."""
+        if self._pool is not pool:
+            return
+        if kill:
+            for proc in list(pool._processes.values()):
+                proc.kill()
+        pool.shutdown(wait=False)
+        self._recycled += self.size
+        self._fork()
+
+    def run(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one backtest in a warm worker and return its result; worker errors
+        are re-raised here. Raises RunTimeout past the run's wall-clock limit
+        and RuntimeError when the worker dies.
+        """
+        self.start()
+        with self._lock:
+            if self.max_tasks and self._tasks >= self.size * self.max_tasks:
+                # Due for recycling: in-flight jobs finish on the old workers
+                self._replace(self._pool, kill=False)
+            self._tasks += 1
+            pool = self._pool
+        wall = effective_limits(payload.get("limits"))["wall_seconds"]
+        future = pool.submit(run_backtest, payload)
+        try:
+            return future.result(timeout=wall)
+        except TimeoutError:
+            with self._lock:
+                self._replace(pool, kill=True)
+            raise RunTimeout("wall_seconds", wall, f"backtest exceeded the {wall:g}s wall-clock limit")
+        except BrokenProcessPool:
+            with self._lock:
+                self._replace(pool, kill=True)
+            raise RuntimeError("the backtest worker process died; the pool was restarted")
+
+    def status(self) -> Dict[str, Any]:
+        """Pool size and warmth for /health; `ready` once every current worker has warmed up."""
+        warmed = self._warmed.value
+        return {
+            "enabled": self.enabled, "size": self.size, "max_tasks_per_worker": self.max_tasks,
+            "warm_workers": min(warmed, self.size), "recycled": self._recycled,
+            "ready": self._pool is not None and warmed >= self.size
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                for proc in list(self._pool._processes.values()):
+                    proc.kill()
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+WARM_POOL = WarmPool()
@@ -0,0 +1,137 @@
+"""
+Opt-in profiling of a backtest: cProfile over cerebro.run() for a trimmed
+top-N function table (strategy frames labelled apart from backtrader's),
+plus a stack sampler producing flamegraph-compatible collapsed stacks.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# "off" rejects profile requests
+PROFILING = os.environ.get("BACKTRADER_PROFILING", "on")
+# Profiled runs allowed at once per API process; more are rejected, not queued
+MAX_CONCURRENT = int(os.environ.get("BACKTRADER_PROFILE_CONCURRENCY", 1))
+# Upper bound for rows in the function table
+MAX_TOP = int(os.environ.get("BACKTRADER_PROFILE_MAX_TOP", 100))
+# Seconds between stack samples for the collapsed-stack output. The sampler
+# needs the GIL to read the profiled thread's stack, so while that thread is
+# busy in Python samples land at most once per sys.getswitchinterval() (5 ms
+# by default); the process-wide switch interval is deliberately left alone
+SAMPLE_INTERVAL = float(os.environ.get("BACKTRADER_PROFILE_SAMPLE_INTERVAL", 0.001))
+
+# Filename user strategies are compiled under (see runner._compile_strategy)
+STRATEGY_FILENAME = "<strategy>"
+
+_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT)
+_BACKTRADER_DIR = os.sep + "backtrader" + os.sep
+
+class ProfilerBusy(Exception):
+    """Every profiling slot is taken."""
+
+@contextmanager
+def profile_slot() -> Iterator[None]:
+    """Hold one of the MAX_CONCURRENT profiling slots; raises ProfilerBusy when none is free."""
+    if not _SLOTS.acquire(blocking=False):
+        raise ProfilerBusy(f"at most {MAX_CONCURRENT} profiled run(s) at a time; retry shortly")
+    try:
+        yield
+    finally:
+        _SLOTS.release()
+
+def _origin(filename: str) -> str:
+    if filename == STRATEGY_FILENAME:
+        return "strategy"
+    if _BACKTRADER_DIR in filename:
+        return "backtrader"
+    return "builtin" if filename == "~" else "other"
+
+def _short(filename: str) -> str:
+    if _BACKTRADER_DIR in filename:
+        return filename[filename.rindex(_BACKTRADER_DIR) + 1:]
+    return os.path.basename(filename) if filename not in (STRATEGY_FILENAME, "~") else filename
+
+def _frame_label(code: Any) -> str:
+    return f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})"
+
+class _StackSampler(threading.Thread):
+    """Counts the stacks of one thread below `anchor` (excluded) every `interval` seconds."""
+    def __init__(self, thread_id: int, anchor: Any, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id, self.anchor, self.interval = thread_id, anchor, interval
+        self.counts: Counter = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.anchor:
+                if frame.f_code.co_filename != cProfile.__file__:
+                    stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            # Only count samples taken inside the profiled call
+            if frame is not None and stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+def _function_rows(stats: Dict[Tuple[str, int, str], Tuple]) -> List[Dict[str, Any]]:
+    """Every profiled function, by cumulative time descending."""
+    rows = []
+    for (filename, line, name), (_, calls, self_time, cumulative, _) in stats.items():
+        if name == "<method 'disable' of '_lsprof.Profiler' objects>":
+            continue
+        rows.append({
+            "function": name, "file": _short(filename), "line": line, "origin": _origin(filename),
+            "calls": calls, "self_seconds": round(self_time, 6), "cumulative_seconds": round(cumulative, 6)
+        })
+    rows.sort(key=lambda r: r["cumulative_seconds"], reverse=True)
+    return rows
+
+def profile_call(fn: Callable[[], Any], top: int = 25, collapsed: bool = False) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Call fn() under cProfile (and, with `collapsed`, a stack sampler) and
+    return (fn's result, report). The report holds wall time, self time per
+    origin (strategy / backtrader / builtin / other), the top functions by
+    cumulative time, the strategy's own functions, and optionally collapsed
+    stacks ("frame;frame;frame count" lines) for flamegraph.pl or speedscope.
+    """
+    limit = max(1, min(top, MAX_TOP))
+    sampler = None
+    if collapsed:
+        sampler = _StackSampler(threading.get_ident(), sys._getframe(), SAMPLE_INTERVAL)
+        sampler.start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        result = profiler.runcall(fn)
+    finally:
+        wall = time.perf_counter() - start
+        if sampler is not None:
+            sampler.stop()
+
+    stats = pstats.Stats(profiler).stats
+    by_origin: Dict[str, float] = {}
+    for (filename, _, _), (_, _, self_time, _, _) in stats.items():
+        by_origin[_origin(filename)] = by_origin.get(_origin(filename), 0.0) + self_time
+    rows = _function_rows(stats)
+    report = {
+        "wall_seconds": round(wall, 6),
+        "self_seconds_by_origin": {k: round(v, 6) for k, v in sorted(by_origin.items())},
+        "functions": rows[:limit],
+        "strategy_functions": [r for r in rows if r["origin"] == "strategy"][:limit],
+        "collapsed": None,
+        "samples": 0,
+    }
+    if sampler is not None:
+        report["collapsed"] = "".join(f"{stack} {n}\n" for stack, n in sorted(sampler.counts.items()))
+        report["samples"] = sum(sampler.counts.values())
+    return result, report
@@ -0,0 +1,121 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from src.utils.cache import LRUCache
+from src.utils.hashing import code_hash, payload_hash
+from src.utils.responses import orjson
+
+class _Entry(NamedTuple):
+    result: Dict[str, Any]
+    created: float
+    code_hash: str
+    # Encoded JSON size; LRUCache sums `nbytes` against its maxbytes bound
+    nbytes: int
+
+def _encoded_size(result: Dict[str, Any]) -> int:
+    if orjson is not None:
+        return len(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY))
+    return len(json.dumps(result, separators=(",", ":")))
+
+class ResultCache:
+    """
+    Memoizes run_backtest results by a canonical hash of the request.
+    Entries live in an in-memory LRU bounded by count and by maxbytes of
+    encoded JSON (None = unbounded); when db_path is set they are also
+    written to SQLite so hits survive restarts. ttl (seconds) applies to both.
+    """
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None, db_path: Optional[str] = None,
+                 maxbytes: Optional[int] = None):
+        self.ttl = ttl
+        self._memory = LRUCache(maxsize=maxsize, maxbytes=maxbytes)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, code_hash TEXT NOT NULL, created REAL NOT NULL, body TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_code_hash ON results (code_hash)")
+            self._db.commit()
+
+    @staticmethod
+    def key(payload: Dict[str, Any]) -> str:
+        """Cache key for a RunRequest payload (every field participates)."""
+        return payload_hash(payload)
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (result, age in seconds) or None on miss/expiry."""
+        entry = self._memory.get(key)
+        if entry is None and self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT code_hash, created, body FROM results WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None:
+                entry = _Entry(json.loads(row[2]), row[1], row[0], len(row[2]))
+                self._memory.set(key, entry)
+        if entry is None:
+            return None
+        age = time.time() - entry.created
+        if self.ttl is not None and age > self.ttl:
+            self._delete(key)
+            return None
+        return entry.result, age
+
+    def set(self, key: str, code: str, result: Dict[str, Any]) -> None:
+        """Store a result, tagged with its code hash for invalidation."""
+        created = time.time()
+        chash = code_hash(code)
+        self._memory.set(key, _Entry(result, created, chash, _encoded_size(result)))
+        if self._db is not None:
+            body = json.dumps(result, separators=(",", ":"))
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, code_hash, created, body) VALUES (?, ?, ?, ?)",
+                    (key, chash, created, body)
+                )
+                self._db.commit()
+
+    def invalidate_code(self, chash: str) -> int:
+        """Drop every result produced by the given code hash; returns entries removed."""
+        keys = {k for k, entry in self._memory.items() if entry.code_hash == chash}
+        for k in keys:
+            self._memory.pop(k)
+        if self._db is not None:
+            with self._db_lock:
+                keys.update(r[0] for r in self._db.execute("SELECT key FROM results WHERE code_hash = ?", (chash,)))
+                self._db.execute("DELETE FROM results WHERE code_hash = ?", (chash,))
+                self._db.commit()
+        return len(keys)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def _delete(self, key: str) -> None:
+        self._memory.pop(key)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._memory.stats()
+        stats["ttl"] = self.ttl
+        stats["persistent"] = self._db is not None
+        return stats
+
+RESULT_CACHE = ResultCache(
+    maxsize=int(os.environ.get("BACKTRADER_RESULT_CACHE_SIZE", 128)),
+    ttl=float(os.environ.get("BACKTRADER_RESULT_CACHE_TTL", 0)) or None,
+    db_path=os.environ.get("BACKTRADER_RESULT_CACHE_DB") or None,
+    maxbytes=int(os.environ.get("BACKTRADER_RESULT_CACHE_MB", 256)) * 1024 * 1024
+)
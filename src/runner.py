@@ -1,120 +1,431 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterator, List, NamedTuple, Optional, Union
 import os
+import queue
+import threading
+import types
+import numpy as np
 import backtrader as bt
-from src.utils.datafeed import bars_to_temp_csv
+from src import indicators
+from src.metrics import StageTimer
+from src.montecarlo import simulate
+from src.performance import compute_summary
+from src.profiling import profile_call
+from src.utils.cache import LRUCache
+from src.utils.downsample import DOWNSAMPLERS
+from src.utils.datafeed import (
+    Bars, align_columns, bars_to_temp_csv, bars_to_columns, columns_to_lists, format_dates, is_daily, InMemoryData
+)
+from src.utils.resample import resample_columns
+from src.utils.hashing import code_hash
+
+# "memory" (default) feeds bars straight into backtrader lines; "csv" keeps
+# the legacy temp-file + GenericCSVData path as a fallback
+DATAFEED_MODE = os.environ.get("BACKTRADER_DATAFEED", "memory")
+
+class CompiledStrategy(NamedTuple):
+    """Compiled strategy source and the bt.Strategy subclass it defines."""
+    code: types.CodeType
+    strategy: type
+
+# Compiled strategies keyed by code_hash(code)
+STRATEGY_CACHE = LRUCache(
+    maxsize=int(os.environ.get("BACKTRADER_STRATEGY_CACHE_SIZE", 256)),
+    ttl=float(os.environ.get("BACKTRADER_STRATEGY_CACHE_TTL", 3600)) or None
+)
+
+# Bound on records buffered between a streaming run and its consumer
+STREAM_QUEUE_SIZE = 4096
 
 class EquityCurve(bt.Analyzer):
-    """Analyzer that records portfolio value per bar for equity_curve output."""
-    def start(self): self._data = []
+    """
+    Analyzer that records portfolio value per bar for equity_curve output.
+    Date numbers, values and in-market flags go into preallocated numpy
+    buffers; they are formatted to {time, value} points only in get_analysis.
+    With a `sink`, each point is also emitted as a record while running and
+    get_analysis returns no points.
+    """
+    params = (("sink", None),)
+    def start(self):
+        # Portfolio datas may start and end apart; the buffer grows if their union is longer still
+        size = max(16, *(d.buflen() for d in self.strategy.datas))
+        self._dt, self._values = np.empty(size), np.empty(size)
+        self._invested = np.empty(size, dtype=bool)
+        self._n = 0
+    def next(self):
+        strat = self.strategy
+        n = self._n
+        if n == len(self._dt):  # not preloaded (live/next mode): grow
+            self._dt, self._values, self._invested = (np.resize(a, 2 * n) for a in (self._dt, self._values, self._invested))
+        # The strategy clock: the latest bar across datas, whichever of them has one now
+        dt = strat.datetime[0]
+        value = strat.broker.getvalue()
+        self._dt[n], self._values[n] = dt, value
+        self._invested[n] = any(strat.getposition(d).size for d in strat.datas)
+        self._n = n + 1
+        if self.p.sink is not None:
+            self.p.sink({"type": "equity", "time": format_dates([dt])[0], "value": float(value)})
+    @property
+    def dt(self) -> np.ndarray: return self._dt[:self._n]
+    @property
+    def values(self) -> np.ndarray: return self._values[:self._n]
+    @property
+    def invested(self) -> np.ndarray: return self._invested[:self._n]
+    def points(self, index: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Format recorded bars (optionally only those at `index`) as {time, value} points."""
+        dt, values = self.dt, self.values
+        if index is not None:
+            dt, values = dt[index], values[index]
+        return [{"time": t, "value": v} for t, v in zip(format_dates(dt), values.tolist())]
+    def get_analysis(self):
+        return [] if self.p.sink is not None else self.points()
+
+class ProgressReporter(bt.Analyzer):
+    """Analyzer that reports the fraction of bars processed to a callback, about every 1%."""
+    params = (("callback", None), ("every", 0.01))
+    def start(self):
+        self._total = max(1, *(d.buflen() for d in self.strategy.datas))
+        self._step = max(1, int(self._total * self.p.every))
+        self._count = 0
     def next(self):
-        dt = self.strategy.datas[0].datetime.date(0).strftime("%Y-%m-%d")
-        self._data.append({"time": dt, "value": float(self.strategy.broker.getvalue())})
-    def get_analysis(self): return self._data
+        self._count += 1
+        if self._count % self._step == 0:
+            self.p.callback(min(1.0, self._count / self._total))
+    def get_analysis(self): return {"bars": self._count}
+
+class TradeRecord:
+    """
+    Closed trade as raw numbers; formatted to a TradeOut dict by as_dict.
+    `symbol` is set only in multi-symbol runs.
+    """
+    __slots__ = ("dtopen", "dtclose", "long", "pnl", "pnlcomm", "symbol")
+    def __init__(self, dtopen: float, dtclose: float, long: bool, pnl: float, pnlcomm: float,
+                 symbol: Optional[str] = None):
+        self.dtopen, self.dtclose, self.long, self.pnl, self.pnlcomm = dtopen, dtclose, long, pnl, pnlcomm
+        self.symbol = symbol
+    def as_dict(self) -> Dict[str, Any]:
+        entry, exit_ = format_dates([self.dtopen, self.dtclose])
+        out = {
+            "entry_time": entry, "exit_time": exit_,
+            "direction": "long" if self.long else "short",
+            "pnl": self.pnl, "pnlcomm": self.pnlcomm
+        }
+        if self.symbol is not None:
+            out["symbol"] = self.symbol
+        return out
+
+def format_trades(records: List[TradeRecord]) -> List[Dict[str, Any]]:
+    """Format closed trades for output, converting all dates in one vectorized call."""
+    if not records:
+        return []
+    dates = format_dates([d for r in records for d in (r.dtopen, r.dtclose)])
+    trades = [
+        {"entry_time": dates[2 * i], "exit_time": dates[2 * i + 1],
+         "direction": "long" if r.long else "short", "pnl": r.pnl, "pnlcomm": r.pnlcomm}
+        for i, r in enumerate(records)
+    ]
+    for trade, r in zip(trades, records):
+        if r.symbol is not None:
+            trade["symbol"] = r.symbol
+    return trades
 
 class TradeCaptureMixin(bt.Strategy):
     """Mixin to collect closed trades in notify_trade for API output."""
-    def __init__(self): super().__init__(); self._trades = []
+    _trade_sink: Optional[Callable[[Dict[str, Any]], None]] = None
+    # Leading bars that only warm up indicators: next() (and so trading) starts after them
+    _warmup: int = 0
+    def __init__(self): super().__init__(); self._closed_trades = []; self._trades_opened = 0
+    def _start(self):
+        super()._start()
+        if self._warmup:
+            self._minperiods = [max(p, self._warmup + 1) for p in self._minperiods]
     def notify_trade(self, trade):
+        if trade.justopened:
+            self._trades_opened += 1
         if trade.isclosed:
-            entry = bt.num2date(trade.dtopen).strftime("%Y-%m-%d")
-            exit_  = bt.num2date(trade.dtclose).strftime("%Y-%m-%d")
-            # Determine direction based on trade size (positive = long, negative = short)
-            direction = "long" if trade.size > 0 else "short"
-            self._trades.append({
-                "entry_time": entry, "exit_time": exit_,
-                "direction": direction,
-                "pnl": float(trade.pnl), "pnlcomm": float(trade.pnlcomm)
-            })
+            # trade.size is 0 once closed; trade.long keeps the opening side
+            symbol = trade.data._name if len(self.datas) > 1 else None
+            record = TradeRecord(trade.dtopen, trade.dtclose, bool(trade.long),
+                                 float(trade.pnl), float(trade.pnlcomm), symbol)
+            self._closed_trades.append(record)
+            if self._trade_sink is not None:
+                self._trade_sink({"type": "trade", **record.as_dict()})
+        super().notify_trade(trade)
 
-def _load_strategy_class(code: str) -> type:
+def _load_strategy_class(code: str, indicator_cache: bool = True) -> type:
     """
-    Compile and return the first subclass of bt.Strategy from a code string.
+    Return the first subclass of bt.Strategy defined by a code string,
+    compiling it only on a STRATEGY_CACHE miss. With indicator_cache False
+    (or the cache switched off) it is compiled against plain backtrader.
     Raises RuntimeError if none found.
     """
+    cached = indicator_cache and indicators.INDICATOR_CACHE_MODE != "off"
+    key = code_hash(code) if cached else code_hash(code) + ":plain"
+    compiled = STRATEGY_CACHE.get(key)
+    if compiled is None:
+        compiled = _compile_strategy(code, cached)
+        STRATEGY_CACHE.set(key, compiled)
+    return compiled.strategy
+
+def _compile_strategy(code: str, indicator_cache: bool = True) -> CompiledStrategy:
+    """
+    Compile and exec a code string, resolving its first bt.Strategy subclass.
+    Raises RuntimeError if none found.
+    """
+    codeobj = compile(code, "<strategy>", "exec")
     ns: Dict[str, Any] = {}
     # Use a more permissive globals for strategy execution
-    # In production, you might want to restrict this more
-    safe_globals = {
-        "__builtins__": __builtins__,
-        "backtrader": bt,
-        "bt": bt
-    }
-    exec(code, safe_globals, ns)
+    # In production, you might want to restrict this more.
+    # `bt` (and any backtrader import) resolves to the indicator-caching stand-in
+    # unless indicator_cache is False
+    safe_globals = indicators.strategy_globals(indicator_cache)
+    exec(codeobj, safe_globals, ns)
     for v in ns.values():
         if isinstance(v, type) and issubclass(v, bt.Strategy):
-            return v
+            return CompiledStrategy(codeobj, v)
     raise RuntimeError("No bt.Strategy subclass found in code")
 
-def run_backtest(payload: Dict[str, Any]) -> Dict[str, Any]:
+def run_backtest(payload: Dict[str, Any],
+                 progress: Optional[Callable[[float], None]] = None,
+                 sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 timer: Optional[StageTimer] = None) -> Dict[str, Any]:
     """
     Execute Backtrader on provided bars with a dynamic strategy.
     Inputs:
       payload['code']: Python bt.Strategy class as string
-      payload['bars']: list of OHLCV dicts (YYYY-MM-DD dates)
+      payload['bars']: list of OHLCV dicts, or columnar {field: [values]} (YYYY-MM-DD dates)
+      payload['portfolio']: instead of bars, {symbol: bars} run as named datas
+        in one Cerebro (aligned up front; trades carry their symbol, no ohlcv echo)
+      payload['timeframe']: optional target timeframe (1m, 5m, 1h, 1d, 1w...);
+        bars are aggregated up to it before the run
       payload['capital']: initial cash (float)
       payload['params']: dict passed to strategy
+      payload['include_ohlcv']: echo bars as ohlcv (default True; the
+        aggregated columns when bars were resampled)
+      payload['equity_points']: optional cap on equity_curve points,
+        downsampled with payload['downsample'] ("lttb" or "minmax")
+      payload['monte_carlo']: optional MonteCarloOptions dict; adds a
+        monte_carlo key with percentile bands
+      payload['profile']: optional ProfileOptions dict; profiles cerebro.run()
+        and adds a profile key with the hot-spot report
+      payload['indicator_cache']: False builds SMA/EMA/RSI without the shared
+        indicator cache (default True)
+      progress: optional callback receiving the fraction of bars processed
+      sink: optional callback receiving equity/trade records as they happen;
+            equity points are then not kept in the returned equity_curve
+      timer: optional StageTimer receiving compile/feed/run/results durations
     Returns:
       dict with keys: ohlcv, trades, equity_curve, summary
     """
     code: str = payload["code"]
-    bars: Optional[List[Dict[str, Any]]] = payload.get("bars")
-    if not bars:
+    bars: Optional[Bars] = payload.get("bars")
+    portfolio: Optional[Dict[str, Bars]] = payload.get("portfolio")
+    if not bars and not portfolio:
         raise RuntimeError("MVP requires 'bars' in payload")
 
     capital: float = float(payload.get("capital", 10000))
     params: Dict[str, Any] = payload.get("params", {})
 
-    # Build Cerebro
-    cerebro = bt.Cerebro()
+    timer = timer or StageTimer()
+    with timer.stage("compile"):
+        user_cls = _load_strategy_class(code, payload.get("indicator_cache", True))
 
-    # Strategy with trade capture
-    user_cls = _load_strategy_class(code)
-    Strat = type("UserStrategyWithCapture", (TradeCaptureMixin, user_cls), {})
-    cerebro.addstrategy(Strat, **params)
+    timeframe: Optional[str] = payload.get("timeframe")
 
-    # Data feed via temp CSV
-    path = bars_to_temp_csv(bars)
-    data = bt.feeds.GenericCSVData(
-        dataname=path, dtformat="%Y-%m-%d",
-        datetime=0, open=1, high=2, low=3, close=4, volume=5, openinterest=6
-    )
-    cerebro.adddata(data, name=payload.get("symbol") or "DATA")
-
-    # Broker and analyzers
-    cerebro.broker.setcash(capital)
-    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="tradesum")
-    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name="sharpe", timeframe=bt.TimeFrame.Days, annualize=True)
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="dd")
-    cerebro.addanalyzer(EquityCurve, _name="equity")
+    # Data feed from in-memory columns (temp CSV only as a fallback)
+    path = None
+    with timer.stage("feed"):
+        if portfolio:
+            aligned = align_columns({
+                symbol: resample_columns(bars_to_columns(b), timeframe) for symbol, b in portfolio.items()
+            })
+            data = {symbol: InMemoryData(dataname=cols) for symbol, cols in aligned.items()}
+            bars = None
+        else:
+            source = bars_to_columns(bars)
+            cols = resample_columns(source, timeframe)
+            if cols is not source:
+                bars = columns_to_lists(cols)
+            if DATAFEED_MODE == "csv":
+                daily = is_daily(cols["time"])
+                path = bars_to_temp_csv(columns_to_lists(cols))
+                data = bt.feeds.GenericCSVData(
+                    dataname=path, dtformat="%Y-%m-%d" if daily else "%Y-%m-%dT%H:%M:%S",
+                    timeframe=bt.TimeFrame.Days if daily else bt.TimeFrame.Minutes,
+                    datetime=0, open=1, high=2, low=3, close=4, volume=5, openinterest=6
+                )
+            else:
+                data = InMemoryData(dataname=cols)
 
     try:
-        res = cerebro.run()
-        strat = res[0]
-
-        ta = strat.analyzers.tradesum.get_analysis()
-        dd = strat.analyzers.dd.get_analysis()
-        sh = strat.analyzers.sharpe.get_analysis()
-
-        total_trades = ta.get("total", {}).get("total", 0)
-        won = ta.get("won", {}).get("total", 0)
-        win_rate = float(won) / total_trades if total_trades else 0.0
-
-        final_value = float(cerebro.broker.getvalue())
-        summary = {
-            "final_value": round(final_value, 6),
-            "return_pct": round((final_value / capital - 1.0) * 100.0, 6),
-            "total_trades": int(total_trades),
-            "win_rate": round(win_rate, 6),
-            "max_drawdown_pct": round(dd.get("max", {}).get("drawdown", 0.0), 6),
-            "sharpe": float(sh.get("sharperatio") or 0.0)
-        }
+        with timer.stage("run"):
+            cerebro = _build_cerebro(user_cls, data, capital, params, payload.get("symbol"), sink,
+                                     payload.get("indicator_cache", True))
+            if progress is not None:
+                cerebro.addanalyzer(ProgressReporter, _name="progress", callback=progress)
+            if payload.get("profile"):
+                runs, profile = profile_call(cerebro.run, **payload["profile"])
+                strat = runs[0]
+            else:
+                strat = cerebro.run()[0]
+        with timer.stage("results"):
+            result = _results(strat, cerebro, payload, capital, bars, sink)
+            if payload.get("profile"):
+                result["profile"] = profile
+        return result
+    finally:
+        if path:
+            try: os.remove(path)
+            except Exception: pass
 
-        return {
-            "ohlcv": bars,
-            "trades": getattr(strat, "_trades", []),
-            "equity_curve": strat.analyzers.equity.get_analysis(),
-            "summary": summary
-        }
+def _results(strat: bt.Strategy, cerebro: bt.Cerebro, payload: Dict[str, Any], capital: float,
+             bars: Any, sink: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Format a run's recorded equity and trades as the /run result (ohlcv, trades, equity_curve, summary...)."""
+    eq = strat.analyzers.equity
+    if sink is not None:
+        equity = []
+    elif payload.get("equity_points") and len(eq.values) > payload["equity_points"]:
+        method = DOWNSAMPLERS[payload.get("downsample") or "lttb"]
+        equity = eq.points(method(eq.values, payload["equity_points"]))
+    else:
+        equity = eq.points()
+    result = {
+        "ohlcv": bars if payload.get("include_ohlcv", True) else None,
+        "trades": format_trades(strat._closed_trades),
+        "equity_curve": equity,
+        "summary": _summarize(strat, cerebro, capital)
+    }
+    if payload.get("monte_carlo"):
+        result["monte_carlo"] = simulate(
+            [t.pnlcomm for t in strat._closed_trades], eq.values, capital, **payload["monte_carlo"])
+    return result
+
+class StreamClosed(Exception):
+    """Raised inside a streaming run once its consumer has gone away."""
+
+def iter_backtest(payload: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Run a backtest on a background thread and yield its records in batches
+    as they are produced: {"type": "equity"|"trade", ...} while running, then
+    a final {"type": "summary", "summary": {...}} (or {"type": "error", "detail": ...}).
+    The bounded queue applies backpressure, so memory stays flat regardless
+    of bar count; closing the iterator stops the run.
+    """
+    records: "queue.Queue[Any]" = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    closed = threading.Event()
+    done = object()
+
+    def put(record: Any) -> None:
+        while True:
+            if closed.is_set():
+                raise StreamClosed()
+            try:
+                records.put(record, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def work() -> None:
+        try:
+            result = run_backtest(payload, sink=put)
+            put({"type": "summary", "summary": result["summary"]})
+        except StreamClosed:
+            return
+        except Exception as e:
+            try: put({"type": "error", "detail": str(e)})
+            except StreamClosed: return
+        try: put(done)
+        except StreamClosed: pass
+
+    threading.Thread(target=work, name="backtest-stream", daemon=True).start()
+    try:
+        while True:
+            batch = [records.get()]
+            while len(batch) < 512:
+                try: batch.append(records.get_nowait())
+                except queue.Empty: break
+            if batch[-1] is done:
+                if len(batch) > 1:
+                    yield batch[:-1]
+                return
+            yield batch
     finally:
-        try: os.remove(path)
-        except Exception: pass
\ No newline at end of file
+        closed.set()
+
+def run_summary(user_cls: type, columns: Dict[str, Any], capital: float,
+                params: Dict[str, Any], symbol: Optional[str] = None,
+                indicator_cache: bool = True) -> Dict[str, Any]:
+    """
+    Run an already-loaded strategy class over prepared bar columns and
+    return only the summary metrics. Used by sweeps that reuse data and code.
+    """
+    cerebro = _build_cerebro(user_cls, InMemoryData(dataname=columns), capital, params, symbol,
+                             indicator_cache=indicator_cache)
+    strat = cerebro.run()[0]
+    return _summarize(strat, cerebro, capital)
+
+def run_leg(user_cls: type, columns: Dict[str, Any], capital: float,
+            params: Dict[str, Any], symbol: Optional[str] = None,
+            indicator_cache: bool = True, warmup: int = 0) -> Dict[str, Any]:
+    """
+    Like run_summary, but also return the formatted trades and the raw
+    per-bar record (date numbers, values, in-market flags, closed-trade PnLs)
+    for callers that stitch several runs into one curve.
+    The first `warmup` bars only feed indicators: the strategy's next() starts
+    after them and they are left out of the record and summary.
+    """
+    cerebro = _build_cerebro(user_cls, InMemoryData(dataname=columns), capital, params, symbol,
+                             indicator_cache=indicator_cache, warmup=warmup)
+    strat = cerebro.run()[0]
+    eq = strat.analyzers.equity
+    dt, values, invested = eq.dt[warmup:].copy(), eq.values[warmup:].copy(), eq.invested[warmup:].copy()
+    pnls = [t.pnlcomm for t in strat._closed_trades]
+    return {
+        "summary": compute_summary(dt, values, invested, pnls, strat._trades_opened, capital,
+                                   final_value=float(cerebro.broker.getvalue())),
+        "trades": format_trades(strat._closed_trades),
+        "dt": dt, "values": values, "invested": invested,
+        "pnlcomm": pnls,
+        "trades_opened": strat._trades_opened
+    }
+
+def _build_cerebro(user_cls: type, data: Union[bt.feed.DataBase, Dict[str, bt.feed.DataBase]], capital: float,
+                   params: Dict[str, Any], symbol: Optional[str] = None,
+                   sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   indicator_cache: bool = True, warmup: int = 0) -> bt.Cerebro:
+    """
+    Assemble a Cerebro with trade capture, the data feed (or a {symbol: feed}
+    map of aligned feeds), broker cash and analyzers. `indicator_cache` tells
+    the cached bt.ind wrappers whether this strategy may use INDICATOR_CACHE;
+    `warmup` holds next() back for that many leading bars.
+    """
+    # The standard BuySell/Trades observers add one instance per data, each
+    # scanning every order each bar; portfolio runs skip them (outputs come
+    # from the analyzer and trade capture, not from observers)
+    cerebro = bt.Cerebro(stdstats=not isinstance(data, dict))
+
+    # Strategy with trade capture
+    attrs = {"_trade_sink": staticmethod(sink)} if sink is not None else {}
+    attrs["_indicator_cache"] = indicator_cache
+    if warmup:
+        attrs["_warmup"] = warmup
+    Strat = type("UserStrategyWithCapture", (TradeCaptureMixin, user_cls), attrs)
+    cerebro.addstrategy(Strat, **params)
+    if isinstance(data, dict):
+        for name, feed in data.items():
+            cerebro.adddata(feed, name=name)
+    else:
+        cerebro.adddata(data, name=symbol or "DATA")
+
+    # Broker and the single recording analyzer; metrics are computed afterwards
+    cerebro.broker.setcash(capital)
+    cerebro.addanalyzer(EquityCurve, _name="equity", sink=sink)
+    return cerebro
+
+def _summarize(strat: bt.Strategy, cerebro: bt.Cerebro, capital: float) -> Dict[str, Any]:
+    """Build the SummaryOut dict from the run's recorded values and trades."""
+    eq = strat.analyzers.equity
+    return compute_summary(
+        eq.dt, eq.values, eq.invested,
+        [t.pnlcomm for t in strat._closed_trades], strat._trades_opened,
+        capital, final_value=float(cerebro.broker.getvalue())
+    )
@@ -0,0 +1,140 @@
+"""
+Isolated execution: run one backtest (or any call running strategy code,
+such as a sweep) in a forked child process under RLIMIT_AS / RLIMIT_CPU
+with a wall-clock timeout, so a runaway strategy fails its own request
+instead of stalling or OOM-killing the API worker.
+"""
+import multiprocessing
+import os
+import resource
+import signal
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.runner import run_backtest
+
+# "process" runs all strategy code (/run, sweeps, jobs) in limited child processes; "off" runs inline
+ISOLATION = os.environ.get("BACKTRADER_ISOLATION", "off")
+
+# Server maxima; per-request limits may only lower them
+MAX_MEMORY_MB = int(os.environ.get("BACKTRADER_MAX_MEMORY_MB", 2048))
+MAX_CPU_SECONDS = float(os.environ.get("BACKTRADER_MAX_CPU_SECONDS", 60))
+MAX_WALL_SECONDS = float(os.environ.get("BACKTRADER_MAX_WALL_SECONDS", 120))
+
+class RunLimitExceeded(Exception):
+    """A backtest hit one of its resource limits; `status` is the HTTP code to report."""
+    status = 500
+    error = "limit_exceeded"
+    def __init__(self, limit: str, value: float, detail: str):
+        super().__init__(detail)
+        self.limit, self.value, self.detail = limit, value, detail
+    def __reduce__(self):
+        # Picklable, so limit errors survive the trip back from job workers
+        return type(self), (self.limit, self.value, self.detail)
+    def as_dict(self) -> Dict[str, Any]:
+        return {"error": self.error, "limit": self.limit, "value": self.value, "detail": self.detail}
+
+class RunTimeout(RunLimitExceeded):
+    """Wall-clock or CPU time limit reached."""
+    status = 408
+    error = "timeout"
+
+class RunMemoryExceeded(RunLimitExceeded):
+    """Address-space limit reached."""
+    status = 413
+    error = "memory_exceeded"
+
+def effective_limits(requested: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Per-request limits capped by the server maxima (missing values take the maximum)."""
+    requested = requested or {}
+    def cap(name: str, maximum: float) -> float:
+        value = requested.get(name)
+        return min(value, maximum) if value else maximum
+    return {
+        "memory_mb": cap("memory_mb", MAX_MEMORY_MB),
+        "cpu_seconds": cap("cpu_seconds", MAX_CPU_SECONDS),
+        "wall_seconds": cap("wall_seconds", MAX_WALL_SECONDS),
+    }
+
+def _child(conn: Any, fn: Callable[[], Any], limits: Dict[str, float], reraise: Tuple[type, ...]) -> None:
+    # Own process group, so a timeout also kills any worker pool the call forks
+    os.setsid()
+    memory = int(limits["memory_mb"]) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    cpu = max(1, int(limits["cpu_seconds"] + 0.999))
+    # SIGXCPU at the soft limit, SIGKILL one second later
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    try:
+        message = ("ok", fn())
+    except MemoryError:
+        message = ("memory", "strategy exceeded the memory limit")
+    except reraise as e:
+        message = ("raise", e)
+    except BaseException as e:
+        message = ("error", str(e) or type(e).__name__)
+    try:
+        conn.send(message)
+    except MemoryError:
+        conn.send(("memory", "result exceeded the memory limit"))
+    conn.close()
+
+def _kill(proc: Any) -> None:
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # Gone already, or killed before it became a group leader
+        if proc.is_alive():
+            proc.kill()
+
+def call_isolated(fn: Callable[[], Any], limits: Optional[Dict[str, Any]] = None,
+                  reraise: Tuple[type, ...] = ()) -> Any:
+    """
+    Call fn() in a forked child (which inherits the already-imported modules
+    and fn's closure) under the effective limits and return its result.
+    Processes the child forks (e.g. a sweep's worker pool) inherit the
+    per-process limits and are killed with it. Raises RunTimeout (408) or
+    RunMemoryExceeded (413) when a limit is hit, exceptions of the `reraise`
+    types as raised, and RuntimeError for other failures; the API process
+    itself is never at risk.
+    """
+    limits = effective_limits(limits)
+    ctx = multiprocessing.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    # Not daemonic: daemonic processes may not start the worker pools sweeps use
+    proc = ctx.Process(target=_child, args=(sender, fn, limits, reraise))
+    proc.start()
+    sender.close()
+    try:
+        if not receiver.poll(limits["wall_seconds"]):
+            _kill(proc)
+            raise RunTimeout("wall_seconds", limits["wall_seconds"],
+                             f"backtest exceeded the {limits['wall_seconds']:g}s wall-clock limit")
+        try:
+            status, value = receiver.recv()
+        except EOFError:
+            status, value = None, None
+    finally:
+        proc.join(timeout=5)
+        # Also reaps anything the child left running in its group
+        _kill(proc)
+        proc.join()
+        receiver.close()
+
+    if status == "ok":
+        return value
+    if status == "memory":
+        raise RunMemoryExceeded("memory_mb", limits["memory_mb"], value)
+    if status == "raise":
+        raise value
+    if status == "error":
+        raise RuntimeError(value)
+    # The child died without reporting: SIGXCPU at the CPU limit, SIGKILL from the OOM killer
+    if proc.exitcode == -signal.SIGXCPU:
+        raise RunTimeout("cpu_seconds", limits["cpu_seconds"],
+                         f"backtest exceeded the {limits['cpu_seconds']:g}s CPU time limit")
+    if proc.exitcode == -signal.SIGKILL:
+        raise RunMemoryExceeded("memory_mb", limits["memory_mb"], "backtest process was killed (out of memory)")
+    raise RuntimeError(f"backtest process exited unexpectedly (exit code {proc.exitcode})")
+
+def run_isolated(payload: Dict[str, Any], limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run one backtest with call_isolated; strategy errors surface as RuntimeError."""
+    return call_isolated(lambda: run_backtest(payload), limits)
@@ -1,8 +1,18 @@
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Dict, Any, Union
+from pydantic import AfterValidator, BaseModel, Field, model_validator
+from src.utils.datafeed import validate_columns
+from src.utils.resample import check_resample, timeframe_seconds
+
+def _check_timeframe(value: Optional[str]) -> Optional[str]:
+    if value is not None:
+        timeframe_seconds(value)
+    return value
+
+# Bar width such as 1m, 5m, 1h, 1d or 1w
+Timeframe = Annotated[Optional[str], AfterValidator(_check_timeframe)]
 
 class Bar(BaseModel):
-    """Single OHLCV bar used as input/output. time is YYYY-MM-DD."""
+    """Single OHLCV bar used as input/output. time is YYYY-MM-DD, or an ISO datetime for intraday bars."""
     time: str
     open: float
     high: float
@@ -11,17 +21,82 @@ class Bar(BaseModel):
     volume: float
     openinterest: Optional[float] = 0.0
 
+class ColumnarBars(BaseModel):
+    """
+    Bars as parallel columns, e.g. {"time": [...], "open": [...], ...}.
+    Checked with vectorized array ops instead of one model per bar.
+    """
+    time: List[str]
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+    volume: List[float]
+    openinterest: Optional[List[float]] = None
+
+    @model_validator(mode="after")
+    def _check_columns(self):
+        validate_columns(self.__dict__)
+        return self
+
+class MonteCarloOptions(BaseModel):
+    """Monte Carlo resampling applied to a finished /run."""
+    iterations: int = Field(1000, ge=1, description="Simulated paths (capped server side)")
+    method: Literal["bootstrap", "shuffle", "block"] = Field(
+        "bootstrap", description="Resample trade PnLs with replacement, shuffle their order, or block-bootstrap bar returns")
+    block: int = Field(20, ge=1, description="Block length in bars for method=block")
+    percentiles: List[Annotated[float, Field(ge=0, le=100)]] = Field(
+        [5.0, 25.0, 50.0, 75.0, 95.0], min_length=1, description="Bands to report, each between 0 and 100")
+    path_points: int = Field(100, ge=2, description="Steps of the equity path reported per percentile (capped server side)")
+    seed: Optional[int] = None
+
+class RunLimits(BaseModel):
+    """Per-request resource limits for isolated runs; capped by the server maxima."""
+    memory_mb: Optional[int] = Field(None, ge=256, description="Address-space limit of the run process")
+    cpu_seconds: Optional[float] = Field(None, gt=0, description="CPU time limit")
+    wall_seconds: Optional[float] = Field(None, gt=0, description="Wall-clock limit")
+
+class ProfileOptions(BaseModel):
+    """Opt-in profiling of cerebro.run() for one /run request."""
+    top: int = Field(25, ge=1, description="Rows in the function table (capped server side)")
+    collapsed: bool = Field(False, description="Also sample stacks and return them in collapsed (flamegraph) format")
+
 class RunRequest(BaseModel):
-    """Input payload to /run (MVP requires bars)."""
+    """Input payload to /run: bars (as rows or columns), or symbol+dates read from the store."""
     code: str = Field(..., description="Python bt.Strategy subclass as string")
-    bars: Optional[List[Bar]] = None
+    bars: Optional[Union[List[Bar], ColumnarBars]] = None
+    portfolio: Optional[Dict[str, Union[List[Bar], ColumnarBars]]] = Field(
+        None, description="Symbol -> bars, run together as named datas in one Cerebro (instead of bars)")
     symbol: Optional[str] = None
-    timeframe: Optional[str] = "1d"
+    timeframe: Timeframe = Field(
+        None, description="Aggregate bars up to this timeframe (1m, 5m, 1h, 1d, 1w...) before running; stored series default to 1d")
     start_date: Optional[str] = None
     end_date: Optional[str] = None
     capital: float = 10000
     params: Dict[str, Any] = {}
     risk: Dict[str, Any] = {}
+    include_ohlcv: bool = Field(True, description="Echo the input bars back as `ohlcv`")
+    equity_points: Optional[int] = Field(None, ge=4, description="Downsample equity_curve to at most this many points")
+    downsample: Literal["lttb", "minmax"] = Field("lttb", description="Shape-preserving method used with equity_points")
+    monte_carlo: Optional[MonteCarloOptions] = Field(None, description="Add percentile bands from resampling the run")
+    limits: Optional[RunLimits] = Field(None, description="Lower the resource limits of an isolated run")
+    profile: Optional[ProfileOptions] = Field(None, description="Profile the run and return its hot spots (never cached)")
+    indicator_cache: bool = Field(True, description="Reuse SMA/EMA/RSI outputs cached from earlier runs on the same bars")
+    checkpoint: bool = Field(
+        False, description="Keep the run resumable: append later bars with POST /checkpoints/{checkpoint_id} (never cached)")
+
+    @model_validator(mode="after")
+    def _check_resample(self):
+        # Bars wider than the timeframe cannot be aggregated down to it
+        if self.timeframe:
+            for bars in [self.bars, *(self.portfolio or {}).values()]:
+                if bars:
+                    check_resample(bars.time if isinstance(bars, ColumnarBars) else [b.time for b in bars], self.timeframe)
+        return self
+
+class CheckpointRequest(BaseModel):
+    """Bars appended to a checkpointed run; they must start after its last bar."""
+    bars: Union[List[Bar], ColumnarBars]
 
 class TradeOut(BaseModel):
     """Closed trade summary emitted by strategy capture."""
@@ -30,6 +105,7 @@ class TradeOut(BaseModel):
     direction: str
     pnl: float
     pnlcomm: float
+    symbol: Optional[str] = Field(None, description="Data the trade was on (portfolio runs only)")
 
 class EquityPoint(BaseModel):
     """Portfolio value at each bar."""
@@ -44,10 +120,163 @@ class SummaryOut(BaseModel):
     win_rate: float
     max_drawdown_pct: float
     sharpe: float
+    sortino: float = 0.0
+    cagr_pct: float = 0.0
+    exposure_pct: float = Field(0.0, description="Percent of bars with an open position")
+    profit_factor: Optional[float] = Field(None, description="Gross profit / gross loss; null without losing trades")
+    avg_trade: float = Field(0.0, description="Mean net PnL per closed trade")
+
+class MonteCarloOut(BaseModel):
+    """Percentile bands across simulated paths; each list has one value per percentile."""
+    method: str
+    iterations: int
+    percentiles: List[float]
+    final_value: List[float]
+    return_pct: List[float]
+    max_drawdown_pct: List[float]
+    path_steps: List[int] = Field(..., description="Trade (or bar, for method=block) index of each path column")
+    path: List[List[float]] = Field(..., description="Equity at path_steps, one row per percentile")
+
+class ProfileFunction(BaseModel):
+    """One row of the profile table; origin is strategy, backtrader, builtin or other."""
+    function: str
+    file: str
+    line: int
+    origin: str
+    calls: int
+    self_seconds: float
+    cumulative_seconds: float
+
+class ProfileOut(BaseModel):
+    """Hot spots of a profiled run, by cumulative time."""
+    wall_seconds: float
+    self_seconds_by_origin: Dict[str, float]
+    functions: List[ProfileFunction]
+    strategy_functions: List[ProfileFunction] = Field(..., description="Functions defined in the submitted code")
+    collapsed: Optional[str] = Field(None, description="Sampled stacks as 'frame;frame;frame count' lines")
+    samples: int = 0
 
 class RunResponse(BaseModel):
     """BacktestResults output shape (ohlcv, trades, equity_curve, summary)."""
-    ohlcv: List[Bar]
+    ohlcv: Optional[Union[List[Bar], ColumnarBars]] = None
     trades: List[TradeOut]
     equity_curve: List[EquityPoint]
-    summary: SummaryOut
\ No newline at end of file
+    summary: SummaryOut
+    monte_carlo: Optional[MonteCarloOut] = None
+    profile: Optional[ProfileOut] = None
+    checkpoint_id: Optional[str] = Field(None, description="Id to append bars to this run with (checkpointed runs only)")
+
+class OptimizeRequest(BaseModel):
+    """Input payload to /optimize: one strategy swept over a param grid."""
+    code: str = Field(..., description="Python bt.Strategy subclass as string")
+    bars: Union[List[Bar], ColumnarBars]
+    param_grid: Dict[str, List[Any]] = Field(..., description="Param name -> list of values to sweep")
+    timeframe: Timeframe = Field(None, description="Aggregate bars up to this timeframe before running")
+    symbol: Optional[str] = None
+    capital: float = 10000
+    params: Dict[str, Any] = {}
+    max_workers: Optional[int] = Field(None, ge=1, description="Worker processes (capped server side)")
+    indicator_cache: bool = Field(True, description="Reuse SMA/EMA/RSI outputs cached from earlier runs on the same bars")
+
+class OptimizeRow(BaseModel):
+    """Summary (or error) for one param combination."""
+    params: Dict[str, Any]
+    summary: Optional[SummaryOut] = None
+    error: Optional[str] = None
+
+class OptimizeResponse(BaseModel):
+    """One row per param combination, in grid order."""
+    param_names: List[str]
+    results: List[OptimizeRow]
+
+class WalkForwardRequest(BaseModel):
+    """Input payload to /walkforward: rolling in-sample optimization with out-of-sample tests."""
+    code: str = Field(..., description="Python bt.Strategy subclass as string")
+    bars: Union[List[Bar], ColumnarBars]
+    param_grid: Dict[str, List[Any]] = Field(..., description="Param name -> list of values to sweep in-sample")
+    window: int = Field(..., ge=2, description="In-sample length in bars")
+    test: int = Field(..., ge=2, description="Out-of-sample length in bars")
+    step: Optional[int] = Field(None, ge=1, description="Bars between window starts (default: test)")
+    objective: Literal["sharpe", "sortino", "return_pct", "cagr_pct", "final_value", "avg_trade", "win_rate"] = Field(
+        "sharpe", description="Summary field maximized in-sample")
+    timeframe: Timeframe = Field(None, description="Aggregate bars up to this timeframe before running")
+    symbol: Optional[str] = None
+    capital: float = 10000
+    params: Dict[str, Any] = {}
+    max_workers: Optional[int] = Field(None, ge=1, description="Worker processes (capped server side)")
+    indicator_cache: bool = Field(True, description="Reuse SMA/EMA/RSI outputs cached from earlier runs on the same bars")
+
+class WalkForwardWindow(BaseModel):
+    """Chosen params and results for one in-sample/out-of-sample window."""
+    index: int
+    in_sample_start: str
+    in_sample_end: str
+    out_of_sample_start: str
+    out_of_sample_end: str
+    params: Optional[Dict[str, Any]] = None
+    in_sample_summary: Optional[SummaryOut] = None
+    summary: Optional[SummaryOut] = None
+    error: Optional[str] = None
+
+class WalkForwardResponse(BaseModel):
+    """Per-window rows plus the out-of-sample legs stitched into one run."""
+    param_names: List[str]
+    windows: List[WalkForwardWindow]
+    equity_curve: List[EquityPoint]
+    trades: List[TradeOut]
+    summary: Optional[SummaryOut] = None
+
+
+class JobOut(BaseModel):
+    """State of an asynchronous backtest submitted to /jobs."""
+    job_id: str
+    status: str = Field(..., description="queued | running | done | failed | cancelled")
+    progress: float = Field(0.0, description="Fraction of bars processed (0-1)")
+    created: float
+    finished: Optional[float] = None
+    result: Optional[RunResponse] = None
+    error: Optional[str] = None
+
+
+class BatchEntry(BaseModel):
+    """One strategy to evaluate within a /run/batch request."""
+    code: str = Field(..., description="Python bt.Strategy subclass as string")
+    params: Dict[str, Any] = {}
+    capital: float = 10000
+
+class BatchRequest(BaseModel):
+    """Input payload to /run/batch: many strategies against one bar set."""
+    bars: Union[List[Bar], ColumnarBars]
+    entries: List[BatchEntry] = Field(..., min_length=1)
+    timeframe: Timeframe = Field(None, description="Aggregate bars up to this timeframe before running")
+    symbol: Optional[str] = None
+    max_workers: Optional[int] = Field(None, ge=1, description="Worker processes (capped server side)")
+    indicator_cache: bool = Field(True, description="Reuse SMA/EMA/RSI outputs cached from earlier runs on the same bars")
+
+class BatchRow(BaseModel):
+    """Summary (or error) for one batch entry, in request order."""
+    index: int
+    summary: Optional[SummaryOut] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchRow]
+
+class StoreRequest(BaseModel):
+    """Bars to append to the local store for one symbol and timeframe."""
+    timeframe: str = "1d"
+    bars: Union[List[Bar], ColumnarBars]
+
+class StoreEntry(BaseModel):
+    """A stored symbol/timeframe with its row count and time range."""
+    symbol: str
+    timeframe: str
+    count: int
+    start: str
+    end: str
+
+class StoreAppendOut(BaseModel):
+    symbol: str
+    timeframe: str
+    appended: int
+    total: int
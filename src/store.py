@@ -0,0 +1,202 @@
+"""
+Local on-disk bar store: one directory per symbol and timeframe holding a
+raw little-endian file per column (time as int64 epoch seconds, values as
+float64) plus meta.json with the row count. Reads are memory-mapped, and
+date ranges are sliced with a binary search on the sorted time column, so
+a /run over stored data gets zero-copy views served from the page cache.
+
+CLI:
+  python -m src.store ingest SYMBOL bars.csv [--timeframe 1d] [--root DIR]
+  python -m src.store list [--root DIR]
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.datafeed import VALUE_COLUMNS, Bars, bars_to_columns
+from src.utils.resample import timeframe_seconds
+
+STORE_DIR = os.environ.get("BACKTRADER_STORE_DIR", "data/store")
+
+_NAME = re.compile(r"^[A-Za-z0-9._-]+$")
+
+class SymbolNotFound(KeyError):
+    """No stored bars for the requested symbol/timeframe."""
+
+class BarStore:
+    """Append-only memory-mapped columnar bar store rooted at a directory."""
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        # Guards writes and _maps; reentrant since append reads through _columns
+        self._lock = threading.RLock()
+        # (symbol, timeframe) -> (row count, {column: memmap})
+        self._maps: Dict[Tuple[str, str], Tuple[int, Dict[str, np.ndarray]]] = {}
+
+    def _dir(self, symbol: str, timeframe: str) -> str:
+        for name in (symbol, timeframe):
+            if not _NAME.match(name) or name in (".", ".."):
+                raise ValueError(f"invalid store name {name!r}")
+        return os.path.join(self.root, symbol.upper(), timeframe)
+
+    def count(self, symbol: str, timeframe: str = "1d") -> int:
+        """Rows stored for symbol/timeframe (0 when absent); doubles as a data version."""
+        try:
+            with open(os.path.join(self._dir(symbol, timeframe), "meta.json")) as f:
+                return int(json.load(f)["count"])
+        except FileNotFoundError:
+            return 0
+
+    def source(self, symbol: str, timeframe: str = "1d") -> str:
+        """
+        Stored timeframe to build `timeframe` bars for symbol from: itself when
+        stored, else the coarsest stored series whose bar width divides it.
+        Raises SymbolNotFound when nothing is stored for the symbol and
+        ValueError when every stored series is coarser than `timeframe`.
+        """
+        width = timeframe_seconds(timeframe)
+        if self.count(symbol, timeframe):
+            return timeframe
+        path = os.path.dirname(self._dir(symbol, timeframe))
+        stored = []
+        for name in sorted(os.listdir(path)) if os.path.isdir(path) else ():
+            try:
+                stored.append((timeframe_seconds(name), name))
+            except ValueError:
+                continue
+        stored = [(seconds, name) for seconds, name in stored if self.count(symbol, name)]
+        if not stored:
+            raise SymbolNotFound(f"no stored bars for {symbol.upper()}")
+        finer = [(seconds, name) for seconds, name in stored if width % seconds == 0]
+        if not finer:
+            raise ValueError(f"cannot build {timeframe} bars for {symbol.upper()} from stored "
+                             f"{', '.join(name for _, name in sorted(stored))}")
+        return max(finer)[1]
+
+    def append(self, symbol: str, timeframe: str, bars: Bars) -> Dict[str, Any]:
+        """
+        Append bars (rows or columns) to symbol/timeframe. Bars must be in
+        time order and start after the last stored bar.
+        """
+        cols = bars_to_columns(bars)
+        times = cols["time"].astype("datetime64[s]").astype("<i8")
+        if len(times) > 1 and np.any(np.diff(times) <= 0):
+            raise ValueError("bars.time must be strictly increasing")
+        path = self._dir(symbol, timeframe)
+        with self._lock:
+            os.makedirs(path, exist_ok=True)
+            count = self.count(symbol, timeframe)
+            if count:
+                last = self._columns(symbol, timeframe)["time"][-1]
+                if times[0] <= last.astype("datetime64[s]").astype("<i8"):
+                    raise ValueError(f"bars must start after the last stored bar ({last})")
+            # Drop any rows an interrupted append wrote past the stored count
+            for name in ("time.i8", *(f"{name}.f8" for name in VALUE_COLUMNS)):
+                file = os.path.join(path, name)
+                if os.path.exists(file) and os.path.getsize(file) > count * 8:
+                    os.truncate(file, count * 8)
+            # Column files first, count last: readers never see partial rows
+            with open(os.path.join(path, "time.i8"), "ab") as f:
+                f.write(times.tobytes())
+            for name in VALUE_COLUMNS:
+                with open(os.path.join(path, f"{name}.f8"), "ab") as f:
+                    f.write(np.ascontiguousarray(cols[name], dtype="<f8").tobytes())
+            total = count + len(times)
+            tmp = os.path.join(path, "meta.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"count": total}, f)
+            os.replace(tmp, os.path.join(path, "meta.json"))
+        return {"symbol": symbol.upper(), "timeframe": timeframe, "appended": len(times), "total": total}
+
+    def _columns(self, symbol: str, timeframe: str) -> Dict[str, np.ndarray]:
+        count = self.count(symbol, timeframe)
+        if count == 0:
+            raise SymbolNotFound(f"no stored bars for {symbol.upper()}/{timeframe}")
+        key = (symbol.upper(), timeframe)
+        with self._lock:
+            cached = self._maps.get(key)
+            if cached is not None and cached[0] == count:
+                return cached[1]
+            path = self._dir(symbol, timeframe)
+            cols = {"time": np.memmap(os.path.join(path, "time.i8"), dtype="<i8", mode="r", shape=(count,)).view("datetime64[s]")}
+            for name in VALUE_COLUMNS:
+                cols[name] = np.memmap(os.path.join(path, f"{name}.f8"), dtype="<f8", mode="r", shape=(count,))
+            self._maps[key] = (count, cols)
+            return cols
+
+    def load(self, symbol: str, timeframe: str = "1d",
+             start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Columns for bars with start <= time <= end (dates are inclusive whole
+        days). Located by binary search; the arrays are views on the mapped files.
+        """
+        cols = self._columns(symbol, timeframe)
+        times = cols["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, _bound(start, False), "left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, _bound(end, True), "left"))
+        return {name: values[lo:hi] for name, values in cols.items()}
+
+    def symbols(self) -> List[Dict[str, Any]]:
+        """Every stored symbol/timeframe with its row count and time range."""
+        out = []
+        if not os.path.isdir(self.root):
+            return out
+        for symbol in sorted(os.listdir(self.root)):
+            if not os.path.isdir(os.path.join(self.root, symbol)):
+                continue
+            for timeframe in sorted(os.listdir(os.path.join(self.root, symbol))):
+                count = self.count(symbol, timeframe)
+                if count:
+                    times = self._columns(symbol, timeframe)["time"]
+                    out.append({"symbol": symbol, "timeframe": timeframe, "count": count,
+                                "start": str(times[0]), "end": str(times[-1])})
+        return out
+
+def _bound(value: str, end: bool) -> np.datetime64:
+    """Range bound as datetime64[s]; a bare date as `end` covers that whole day."""
+    if end and len(value) <= 10:
+        return np.datetime64(value, "D") + np.timedelta64(1, "D")
+    t = np.datetime64(value, "s")
+    return t + np.timedelta64(1, "s") if end else t
+
+def read_csv(path: str) -> Dict[str, List[Any]]:
+    """Read a CSV with a header of time,open,high,low,close,volume[,openinterest] into columns."""
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        cols: Dict[str, List[Any]] = {name: [] for name in reader.fieldnames or []}
+        for row in reader:
+            for name, value in row.items():
+                cols[name].append(value)
+    out: Dict[str, List[Any]] = {"time": cols.get("time") or cols["datetime"]}
+    for name in VALUE_COLUMNS:
+        if name in cols:
+            out[name] = [float(v) for v in cols[name]]
+    return out
+
+STORE = BarStore()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.store", description="Manage the local bar store")
+    parser.add_argument("--root", default=STORE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="append bars from a CSV file")
+    ingest.add_argument("symbol")
+    ingest.add_argument("csv_path")
+    ingest.add_argument("--timeframe", default="1d")
+    sub.add_parser("list", help="list stored symbols")
+    args = parser.parse_args(argv)
+
+    store = BarStore(args.root)
+    if args.command == "ingest":
+        print(json.dumps(store.append(args.symbol, args.timeframe, read_csv(args.csv_path))))
+    else:
+        for entry in store.symbols():
+            print(f"{entry['symbol']:<12} {entry['timeframe']:<6} {entry['count']:>10}  {entry['start']} .. {entry['end']}")
+
+if __name__ == "__main__":
+    main()
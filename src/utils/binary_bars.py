@@ -0,0 +1,101 @@
+import io
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from src.utils.datafeed import VALUE_COLUMNS, validate_columns
+
+# pyarrow and msgpack are optional; their formats are rejected when missing
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+NPY = "application/x-npy"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+MSGPACK = "application/msgpack"
+
+class UnsupportedFormat(ValueError):
+    """Raised for a content type we cannot decode (unknown or missing optional dependency)."""
+
+def _as_time(values: Any) -> np.ndarray:
+    """Accept datetime64 values, int epoch seconds or ISO strings for the time column."""
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        return values
+    # ints are read as epoch seconds, strings are parsed as ISO dates
+    return values.astype("datetime64[s]")
+
+def _to_columns(raw: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    missing = [c for c in ("time",) + VALUE_COLUMNS[:-1] if c not in raw]
+    if missing:
+        raise ValueError(f"binary bars missing columns: {', '.join(missing)}")
+    cols = {name: raw[name] for name in VALUE_COLUMNS if name in raw}
+    cols["time"] = _as_time(raw["time"])
+    return validate_columns(cols)
+
+def decode_npy(buf: bytes) -> Dict[str, np.ndarray]:
+    """
+    Decode a .npy structured array with fields time, open, high, low, close,
+    volume[, openinterest]. Columns are views over buf (no copy).
+    """
+    f = io.BytesIO(buf)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    if dtype.names is None or dtype.hasobject or len(shape) != 1:
+        raise ValueError("npy bars must be a 1-D structured array without object fields")
+    arr = np.frombuffer(buf, dtype=dtype, count=shape[0], offset=f.tell())
+    return _to_columns({name: arr[name] for name in dtype.names})
+
+def decode_arrow(buf: bytes) -> Dict[str, np.ndarray]:
+    """Decode an Arrow IPC stream or file; single-chunk numeric columns are zero-copy."""
+    if pa is None:
+        raise UnsupportedFormat("Arrow bars require the optional 'pyarrow' package")
+    reader = pa.ipc.open_file(pa.py_buffer(buf)) if buf[:6] == b"ARROW1" else pa.ipc.open_stream(pa.py_buffer(buf))
+    table = reader.read_all()
+    return _to_columns({name: table.column(name).to_numpy() for name in table.column_names})
+
+def decode_msgpack(buf: bytes) -> Dict[str, np.ndarray]:
+    """
+    Decode a MessagePack map of column -> list, or column -> raw little-endian
+    bytes (float64 for values, int64 epoch seconds for time).
+    """
+    if msgpack is None:
+        raise UnsupportedFormat("MessagePack bars require the optional 'msgpack' package")
+    raw = msgpack.unpackb(buf, raw=False)
+    if not isinstance(raw, dict):
+        raise ValueError("msgpack bars must be a map of column -> values")
+    cols: Dict[str, Any] = {}
+    for name, values in raw.items():
+        if isinstance(values, (bytes, bytearray)):
+            values = np.frombuffer(values, dtype="<i8" if name == "time" else "<f8")
+        cols[name] = values
+    return _to_columns(cols)
+
+DECODERS: Dict[str, Callable[[bytes], Dict[str, np.ndarray]]] = {
+    NPY: decode_npy,
+    ARROW_STREAM: decode_arrow,
+    ARROW_FILE: decode_arrow,
+    MSGPACK: decode_msgpack,
+    "application/x-msgpack": decode_msgpack,
+}
+
+EXTENSIONS = {".npy": NPY, ".arrow": ARROW_FILE, ".arrows": ARROW_STREAM, ".msgpack": MSGPACK}
+
+def decode_bars(buf: bytes, content_type: str = "", filename: str = "") -> Dict[str, np.ndarray]:
+    """Pick a decoder by content type (falling back to the file extension) and decode bars."""
+    decoder = DECODERS.get(content_type.split(";")[0].strip().lower())
+    if decoder is None:
+        ext = filename[filename.rfind("."):].lower() if "." in filename else ""
+        decoder = DECODERS.get(EXTENSIONS.get(ext, ""))
+    if decoder is None:
+        raise UnsupportedFormat(f"unsupported bars content type {content_type!r}; use one of {', '.join(sorted(DECODERS))}")
+    return decoder(buf)
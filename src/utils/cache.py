@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with optional TTL expiry and hit/miss counters.
+    maxsize bounds the entry count; ttl (seconds, None = never) bounds entry age;
+    maxbytes (None = unbounded) bounds the summed `nbytes` of array values.
+    """
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None, maxbytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value (refreshing its recency) or default on miss/expiry."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl is not None and time.monotonic() - item[1] > self.ttl:
+                self._remove(key)
+                self.evictions += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert or replace a value, evicting least recently used entries over maxsize/maxbytes."""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, time.monotonic())
+            self._bytes += getattr(value, "nbytes", 0)
+            while len(self._data) > self.maxsize or (
+                    self.maxbytes is not None and self._bytes > self.maxbytes and len(self._data) > 1):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return a value without touching the counters."""
+        with self._lock:
+            item = self._remove(key)
+            return default if item is None else item[0]
+
+    def _remove(self, key: Hashable) -> Optional[tuple]:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= getattr(item[0], "nbytes", 0)
+        return item
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of (key, value) pairs, least recently used first."""
+        with self._lock:
+            return [(k, item[0]) for k, item in self._data.items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and sizing for monitoring endpoints."""
+        with self._lock:
+            return {
+                "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "bytes": self._bytes, "maxbytes": self.maxbytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions
+            }
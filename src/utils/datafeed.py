@@ -1,7 +1,23 @@
 import csv, tempfile
-from typing import List, Dict, Any
+import datetime
+from array import array
+from typing import List, Dict, Any, Union
 
-def bars_to_temp_csv(bars: List[Dict[str, Any]]) -> str:
+import numpy as np
+import backtrader as bt
+
+# Ordinal (days since 0001-01-01, as used by bt.date2num) of the unix epoch
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+VALUE_COLUMNS = ("open", "high", "low", "close", "volume", "openinterest")
+
+# Bar times are held at second resolution; daily bars are the ones at midnight
+TIME_DTYPE = "datetime64[s]"
+
+# Bars arrive either as rows (list of dicts) or columnar ({"time": [...], "open": [...], ...})
+Bars = Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+
+def bars_to_temp_csv(bars: Bars) -> str:
     """
     Write bars to a temp CSV compatible with backtrader GenericCSVData.
     Returns path to the temp file. Caller is responsible for cleanup.
@@ -12,8 +28,169 @@ def bars_to_temp_csv(bars: List[Dict[str, Any]]) -> str:
     tmp = tempfile.NamedTemporaryFile(mode="w+", newline="", suffix=".csv", delete=False)
     w = csv.writer(tmp)
     w.writerow(["datetime","open","high","low","close","volume","openinterest"])
+    if isinstance(bars, dict):
+        oi = bars.get("openinterest") or [0] * len(bars["time"])
+        w.writerows(zip(bars["time"], bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"], oi))
+        bars = []
     for r in bars:
         w.writerow([r["time"], r["open"], r["high"], r["low"], r["close"], r["volume"], r.get("openinterest", 0)])
     tmp.flush()
     tmp.close()
-    return tmp.name
\ No newline at end of file
+    return tmp.name
+
+def bars_to_columns(bars: Bars) -> Dict[str, np.ndarray]:
+    """
+    Convert rows (list of bar dicts) or columnar bars into column arrays.
+
+    Returns a dict with 'time' as datetime64[s] (YYYY-MM-DD or ISO datetime
+    strings) and one float64 array per OHLCV/openinterest field.
+    """
+    if isinstance(bars, dict):
+        return validate_columns(bars)
+    n = len(bars)
+    cols: Dict[str, np.ndarray] = {
+        "time": np.array([r["time"] for r in bars], dtype=TIME_DTYPE)
+    }
+    for name in VALUE_COLUMNS:
+        cols[name] = np.fromiter((r.get(name) or 0.0 for r in bars), dtype=np.float64, count=n)
+    return cols
+
+def validate_columns(bars: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Convert columnar bars to arrays with vectorized checks: equal column
+    lengths, strictly increasing time and high >= low.
+    Raises ValueError describing the first problem found.
+    """
+    n = len(bars["time"])
+    if n == 0:
+        raise ValueError("bars must contain at least one bar")
+    cols: Dict[str, np.ndarray] = {"time": np.asarray(bars["time"], dtype=TIME_DTYPE)}
+    for name in VALUE_COLUMNS:
+        values = bars.get(name)
+        if values is None and name == "openinterest":
+            cols[name] = np.zeros(n)
+            continue
+        cols[name] = np.asarray(values, dtype=np.float64)
+        if cols[name].shape != (n,):
+            raise ValueError(f"bars.{name} has {len(cols[name])} values, expected {n} (len of bars.time)")
+    bad = np.flatnonzero(np.diff(cols["time"]) <= np.timedelta64(0))
+    if bad.size:
+        raise ValueError(f"bars.time must be strictly increasing (index {int(bad[0]) + 1})")
+    bad = np.flatnonzero(cols["high"] < cols["low"])
+    if bad.size:
+        raise ValueError(f"bars.high must be >= bars.low (index {int(bad[0])})")
+    return cols
+
+def align_columns(columns: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Put every symbol's columns on the union of all their timestamps between
+    its own first and last bar, found with one sort-merge up front so
+    backtrader only has to synchronise feeds where symbols start or end.
+    Gaps inside a symbol's range become flat bars at the previous close with
+    zero volume; nothing is invented before its first or after its last bar,
+    so a symbol is neither traded nor valued before it exists.
+    """
+    times = np.unique(np.concatenate([c["time"] for c in columns.values()]))
+    aligned: Dict[str, Dict[str, np.ndarray]] = {}
+    for symbol, cols in columns.items():
+        span = times[np.searchsorted(times, cols["time"][0]):np.searchsorted(times, cols["time"][-1], side="right")]
+        if len(cols["time"]) == len(span):
+            # strictly increasing and the same length as the union over its range: already aligned
+            aligned[symbol] = cols
+            continue
+        # Index of each symbol's last bar at or before every timestamp in its range
+        pos = np.searchsorted(cols["time"], span, side="right") - 1
+        exact = cols["time"][pos] == span
+        close = cols["close"][pos]
+        out = {"time": span, "close": close}
+        for name in ("open", "high", "low"):
+            out[name] = np.where(exact, cols[name][pos], close)
+        for name in ("volume", "openinterest"):
+            out[name] = np.where(exact, cols[name][pos], 0.0)
+        aligned[symbol] = out
+    return aligned
+
+def is_daily(times: np.ndarray) -> bool:
+    """True when every bar time is at midnight, i.e. the bars are dates."""
+    return not np.any(times.astype(TIME_DTYPE).astype(np.int64) % 86400)
+
+def format_times(times: np.ndarray) -> List[str]:
+    """Format a time column as YYYY-MM-DD for daily bars, YYYY-MM-DDTHH:MM:SS otherwise."""
+    return np.datetime_as_string(times, unit="D" if is_daily(times) else "s").tolist()
+
+def format_dates(nums: Any) -> List[str]:
+    """
+    Format backtrader date numbers in one vectorized call: YYYY-MM-DD for
+    daily bars (stamped at session end), YYYY-MM-DDTHH:MM:SS for intraday ones.
+    """
+    nums = np.asarray(nums, dtype=np.float64)
+    days = np.floor(nums)
+    secs = np.rint((nums - days) * 86400.0).astype(np.int64)
+    days = days.astype(np.int64) - EPOCH_ORDINAL
+    # Session-end stamps (23:59:59.99...) round up to a whole day
+    daily = secs >= 86400
+    out = np.datetime_as_string(days.astype("datetime64[D]"), unit="D")
+    if not daily.all():
+        out = out.astype("<U19")
+        intraday = ~daily
+        out[intraday] = np.datetime_as_string((days[intraday] * 86400 + secs[intraday]).astype(TIME_DTYPE), unit="s")
+    return out.tolist()
+
+def columns_to_lists(cols: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    """Inverse of bars_to_columns for JSON output: ISO date/datetime strings and float lists."""
+    out: Dict[str, List[Any]] = {"time": format_times(cols["time"])}
+    out.update((name, cols[name].tolist()) for name in VALUE_COLUMNS)
+    return out
+
+class InMemoryData(bt.feed.DataBase):
+    """
+    Data feed backed by column arrays (see bars_to_columns).
+    Pass the columns as `dataname`; nothing is written to or parsed from disk.
+    """
+    def start(self):
+        super().start()
+        cols = self.p.dataname
+        self._daily = is_daily(cols["time"])
+        if not self._daily:
+            # Report the bar width to strategies/analyzers instead of the Days default
+            secs = cols["time"].astype(TIME_DTYPE).astype(np.int64)
+            width = int(np.diff(secs).min()) if len(secs) > 1 else 60
+            if width % 60:
+                self._timeframe, self._compression = bt.TimeFrame.Seconds, width
+            else:
+                self._timeframe, self._compression = bt.TimeFrame.Minutes, width // 60
+        self._columns = self._line_columns(cols)
+        self._idx = 0
+
+    def _line_columns(self, cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Columns keyed by line name, with time converted to backtrader date numbers."""
+        secs = cols["time"].astype(TIME_DTYPE).astype(np.int64)
+        if self._daily:
+            # Daily bars are stamped at session end, matching GenericCSVData
+            eos = bt.date2num(datetime.datetime.combine(datetime.date(1970, 1, 1), self.p.sessionend))
+            out = {"datetime": secs // 86400 + eos}
+        else:
+            out = {"datetime": EPOCH_ORDINAL + secs / 86400.0}
+        out.update((name, np.asarray(cols[name], dtype=np.float64)) for name in VALUE_COLUMNS)
+        return out
+
+    def preload(self):
+        # Bulk-copy the columns into the line buffers when nothing (filters,
+        # date bounds, bounded buffers) needs to see bars one at a time
+        if (self._filters or self._ffilters or self._tzinput
+                or self.p.fromdate is not None or self.p.todate is not None
+                or not isinstance(self.lines.datetime.array, array)):
+            return super().preload()
+        for name, values in self._columns.items():
+            getattr(self.lines, name).array.frombytes(values.tobytes())
+        self._idx = len(self._columns["datetime"])
+        self.home()
+
+    def _load(self):
+        i = self._idx
+        if i >= len(self._columns["datetime"]):
+            return False
+        for name, values in self._columns.items():
+            getattr(self.lines, name)[0] = float(values[i])
+        self._idx = i + 1
+        return True
@@ -0,0 +1,53 @@
+from typing import Sequence
+
+import numpy as np
+
+def lttb(values: Sequence[float], n: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of n points that preserve the
+    visual shape of a series (first and last points always kept).
+    """
+    y = np.asarray(values, dtype=np.float64)
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.arange(size, dtype=np.float64)
+    # n-2 inner buckets over points 1..size-2
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < n - 1:
+            nlo, nhi = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def minmax(values: Sequence[float], n: int) -> np.ndarray:
+    """
+    Min/max bucketing: indices of the min and max of each of n//2 buckets,
+    in order, so every peak and trough (and drawdown) stays visible.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    size = len(y)
+    buckets = n // 2
+    if n >= size or buckets < 1:
+        return np.arange(size)
+    edges = np.linspace(0, size, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    lo = np.minimum.reduceat(y, starts)
+    hi = np.maximum.reduceat(y, starts)
+    keep = np.zeros(size, dtype=bool)
+    for start, stop, vmin, vmax in zip(starts, edges[1:], lo, hi):
+        seg = y[start:stop]
+        keep[start + int(np.argmax(seg == vmin))] = True
+        keep[start + int(np.argmax(seg == vmax))] = True
+    return np.flatnonzero(keep)
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
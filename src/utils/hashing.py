@@ -0,0 +1,22 @@
+import hashlib
+import json
+from typing import Any, Dict
+
+import numpy as np
+
+def code_hash(code: str) -> str:
+    """Full SHA-256 hex digest of strategy source; the cache key for compiled code."""
+    return hashlib.sha256(code.encode()).hexdigest()
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    """SHA-256 of a canonical JSON encoding (sorted keys, no whitespace) of a payload."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def columns_hash(columns: Dict[str, Any]) -> str:
+    """SHA-256 over the raw bytes of bar column arrays, in sorted column order."""
+    h = hashlib.sha256()
+    for name in sorted(columns):
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(columns[name]).tobytes())
+    return h.hexdigest()
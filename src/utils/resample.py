@@ -0,0 +1,72 @@
+import os
+import re
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.utils.cache import LRUCache
+from src.utils.datafeed import TIME_DTYPE
+from src.utils.hashing import columns_hash
+
+UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_TIMEFRAME = re.compile(r"^(\d+)([smhdw])$")
+
+# Resampled columns keyed by (columns_hash of the source, timeframe)
+RESAMPLE_CACHE = LRUCache(
+    maxsize=int(os.environ.get("BACKTRADER_RESAMPLE_CACHE_SIZE", 32)),
+    ttl=float(os.environ.get("BACKTRADER_RESAMPLE_CACHE_TTL", 3600)) or None
+)
+
+def timeframe_seconds(timeframe: str) -> int:
+    """Bar width in seconds for a timeframe such as 1m, 5m, 1h, 1d or 1w."""
+    match = _TIMEFRAME.match(timeframe.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"invalid timeframe {timeframe!r}; use e.g. 1m, 5m, 1h, 1d or 1w")
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+def check_resample(times: np.ndarray, timeframe: Optional[str]) -> None:
+    """Raise ValueError when bars at `times` are spaced wider than `timeframe`."""
+    if not timeframe or len(times) < 2:
+        return
+    width = timeframe_seconds(timeframe)
+    finest = int(np.diff(np.asarray(times, dtype=TIME_DTYPE).astype(np.int64)).min())
+    if finest > width:
+        raise ValueError(f"cannot resample {finest}s bars to {timeframe}; upload bars at {timeframe} or finer")
+
+def resample_columns(cols: Dict[str, np.ndarray], timeframe: Optional[str]) -> Dict[str, np.ndarray]:
+    """
+    Aggregate bar columns to a coarser timeframe with one vectorized pass:
+    first open, max high, min low, last close and openinterest, summed volume.
+    Buckets are labelled with their start time (weeks start on Monday).
+    Returns cols unchanged when timeframe is empty or already matches, and
+    raises ValueError when the bars are coarser than the timeframe.
+    Results are cached by source data hash and timeframe.
+    """
+    if not timeframe:
+        return cols
+    check_resample(cols["time"], timeframe)
+    width = timeframe_seconds(timeframe)
+    secs = cols["time"].astype(TIME_DTYPE).astype(np.int64)
+    # The epoch was a Thursday; shift week buckets to start on Monday
+    offset = 4 * 86400 if width % UNIT_SECONDS["w"] == 0 else 0
+    bucket = (secs - offset) // width
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    if len(starts) == len(secs):
+        return cols
+
+    key = (columns_hash(cols), timeframe)
+    cached = RESAMPLE_CACHE.get(key)
+    if cached is not None:
+        return cached
+    last = np.append(starts[1:], len(secs)) - 1
+    out = {
+        "time": (bucket[starts] * width + offset).astype(TIME_DTYPE),
+        "open": cols["open"][starts],
+        "high": np.maximum.reduceat(cols["high"], starts),
+        "low": np.minimum.reduceat(cols["low"], starts),
+        "close": cols["close"][last],
+        "volume": np.add.reduceat(cols["volume"], starts),
+        "openinterest": cols["openinterest"][last],
+    }
+    RESAMPLE_CACHE.set(key, out)
+    return out
@@ -0,0 +1,20 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+# orjson is optional; the stdlib encoder is the fallback
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when available. Returning it from a
+    route also skips FastAPI's response_model re-validation of large results.
+    """
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
@@ -0,0 +1,133 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.optimizer import MAX_COMBINATIONS, expand_grid
+from src.parallel import run_tasks
+from src.performance import compute_summary
+from src.runner import _load_strategy_class
+from src.utils.datafeed import bars_to_columns, format_dates, format_times
+from src.utils.resample import resample_columns
+
+def walk_windows(n: int, window: int, test: int, step: int) -> List[Tuple[int, int, int]]:
+    """(in-sample start, out-of-sample start, out-of-sample stop) bar indices for each window."""
+    return [(s, s + window, s + window + test) for s in range(0, n - window - test + 1, step)]
+
+def _pick(rows: List[Dict[str, Any]], objective: str) -> Optional[int]:
+    """Index of the combination with the highest objective among rows without errors."""
+    best, best_score = None, -np.inf
+    for i, row in enumerate(rows):
+        score = row["summary"][objective] if row["summary"] else None
+        if score is not None and score > best_score:
+            best, best_score = i, score
+    return best
+
+def run_walkforward(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Walk-forward analysis: optimize params on each in-sample window, then
+    run the chosen params on the out-of-sample bars that follow it. Each
+    out-of-sample leg runs over its in-sample window too, so indicators are
+    warm when it starts, but only trades and records its out-of-sample bars.
+    Inputs:
+      payload['code']: Python bt.Strategy class as string
+      payload['bars']: list of OHLCV dicts, or columnar bars
+      payload['param_grid']: dict of param name -> list of values
+      payload['window']: in-sample length in bars
+      payload['test']: out-of-sample length in bars
+      payload['step']: bars between window starts (defaults to test)
+      payload['objective']: summary field maximized in-sample (default sharpe)
+      payload['timeframe']: optional timeframe the bars are aggregated to first
+      payload['params'], payload['capital'], payload['max_workers'],
+        payload['indicator_cache'] as for /optimize
+    Returns:
+      dict with keys: param_names, windows (one row per window),
+      equity_curve (out-of-sample legs stitched by compounding), trades and
+      summary (trade PnLs scaled with their leg, see _stitch)
+    """
+    grid: Dict[str, List[Any]] = payload.get("param_grid") or {}
+    if not grid or any(not values for values in grid.values()):
+        raise ValueError("param_grid must map each param to a non-empty list of values")
+    window, test = int(payload["window"]), int(payload["test"])
+    step = int(payload.get("step") or test)
+    if step < test:
+        raise ValueError("step must be >= test so out-of-sample legs do not overlap")
+    columns = resample_columns(bars_to_columns(payload["bars"]), payload.get("timeframe"))
+    windows = walk_windows(len(columns["time"]), window, test, step)
+    if not windows:
+        raise ValueError(f"{len(columns['time'])} bars is too few for window={window} plus test={test}")
+    fixed: Dict[str, Any] = payload.get("params") or {}
+    combos = [{**fixed, **c} for c in expand_grid(grid)]
+    if len(combos) * len(windows) > MAX_COMBINATIONS:
+        raise ValueError(f"{len(windows)} windows x {len(combos)} combinations exceeds {MAX_COMBINATIONS} runs")
+
+    # Fail fast on bad code here rather than inside every worker
+    code = payload["code"]
+    indicator_cache = payload.get("indicator_cache", True)
+    _load_strategy_class(code, indicator_cache)
+    capital = float(payload.get("capital", 10000))
+    objective = payload.get("objective") or "sharpe"
+    workers, symbol = payload.get("max_workers"), payload.get("symbol")
+
+    # Every window's in-sample grid goes to the pool in one fan-out
+    tasks = [{"code": code, "params": c, "capital": capital, "start": start, "stop": oos}
+             for start, oos, _ in windows for c in combos]
+    rows = run_tasks(columns, tasks, workers, symbol, indicator_cache)
+    picks = [_pick(rows[i * len(combos):(i + 1) * len(combos)], objective) for i in range(len(windows))]
+
+    chosen = [i for i, p in enumerate(picks) if p is not None]
+    legs = run_tasks(columns, [
+        {"code": code, "params": combos[picks[i]], "capital": capital,
+         "start": windows[i][0], "stop": windows[i][2], "warmup": window, "detail": True}
+        for i in chosen
+    ], workers, symbol, indicator_cache) if chosen else []
+    leg_of = dict(zip(chosen, legs))
+
+    times = format_times(columns["time"])
+    out_windows = []
+    for i, (start, oos, stop) in enumerate(windows):
+        pick, leg = picks[i], leg_of.get(i)
+        is_row = rows[i * len(combos) + pick] if pick is not None else None
+        error = None
+        if pick is None:
+            error = "no in-sample run succeeded: " + (rows[i * len(combos)]["error"] or "objective unavailable")
+        elif leg["error"]:
+            error = leg["error"]
+        out_windows.append({
+            "index": i,
+            "in_sample_start": times[start], "in_sample_end": times[oos - 1],
+            "out_of_sample_start": times[oos], "out_of_sample_end": times[stop - 1],
+            "params": combos[pick] if pick is not None else None,
+            "in_sample_summary": is_row["summary"] if is_row else None,
+            "summary": leg["summary"] if leg and not leg["error"] else None,
+            "error": error
+        })
+
+    ok = [leg for leg in legs if not leg["error"]]
+    return {"param_names": list(grid), "windows": out_windows, **_stitch(ok, capital)}
+
+def _stitch(legs: List[Dict[str, Any]], capital: float) -> Dict[str, Any]:
+    """
+    Chain out-of-sample legs into one curve: each leg starts from `capital`,
+    so its values and trade PnLs are scaled by the stitched value at the end
+    of the previous leg, keeping trades (and avg_trade, profit_factor) on the
+    same compounded base as the curve.
+    """
+    if not legs:
+        return {"equity_curve": [], "trades": [], "summary": None}
+    scale, values, pnls, trades = 1.0, [], [], []
+    for leg in legs:
+        values.append(leg["values"] * scale)
+        pnls.extend(p * scale for p in leg["pnlcomm"])
+        trades.extend({**t, "pnl": t["pnl"] * scale, "pnlcomm": t["pnlcomm"] * scale} for t in leg["trades"])
+        scale = values[-1][-1] / capital if len(values[-1]) else scale
+    dt = np.concatenate([leg["dt"] for leg in legs])
+    stitched = np.concatenate(values)
+    summary = compute_summary(
+        dt, stitched, np.concatenate([leg["invested"] for leg in legs]),
+        pnls, sum(leg["trades_opened"] for leg in legs), capital
+    )
+    return {
+        "equity_curve": [{"time": t, "value": v} for t, v in zip(format_dates(dt), stitched.tolist())],
+        "trades": trades,
+        "summary": summary
+    }
@@ -0,0 +1,90 @@
+import time
+from src.utils.cache import LRUCache
+from src.runner import _load_strategy_class, STRATEGY_CACHE
+
+def test_lru_evicts_least_recently_used():
+    """Test that the oldest untouched entry is evicted once maxsize is exceeded."""
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recent
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_expires_entries():
+    """Test that entries older than ttl count as misses."""
+    cache = LRUCache(maxsize=4, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+    assert len(cache) == 0
+
+def test_maxbytes_evicts_least_recently_used_arrays():
+    """Test that array values are evicted once their summed nbytes exceed maxbytes."""
+    import numpy as np
+    cache = LRUCache(maxsize=10, maxbytes=2000)
+    cache.set("a", np.zeros(100))
+    cache.set("b", np.zeros(100))
+    cache.set("c", np.zeros(100))
+
+    assert "a" not in cache and "b" in cache and "c" in cache
+    assert cache.stats()["bytes"] == 1600
+    cache.pop("b")
+    assert cache.stats()["bytes"] == 800
+
+def test_strategy_class_is_cached_by_code_hash():
+    """Test that identical code resolves to the same class with a cache hit."""
+    code = """
+import backtrader as bt
+class CachedStrategy(bt.Strategy):
+    def next(self):
+        pass
+    """
+    STRATEGY_CACHE.clear()
+    hits = STRATEGY_CACHE.hits
+
+    first = _load_strategy_class(code)
+    second = _load_strategy_class(code)
+
+    assert first is second
+    assert STRATEGY_CACHE.hits == hits + 1
+
+def test_result_cache_round_trips_through_sqlite(tmp_path):
+    """Test that results persist to disk and can be invalidated by code hash."""
+    from src.result_cache import ResultCache
+    from src.utils.hashing import code_hash
+    db = str(tmp_path / "results.db")
+    payload = {"code": "class A: pass", "bars": [], "capital": 10000, "params": {}}
+    key = ResultCache.key(payload)
+
+    ResultCache(db_path=db).set(key, payload["code"], {"summary": {"final_value": 1.0}})
+    restarted = ResultCache(db_path=db)
+    hit = restarted.get(key)
+
+    assert hit is not None and hit[0] == {"summary": {"final_value": 1.0}}
+    assert restarted.invalidate_code(code_hash(payload["code"])) == 1
+    assert ResultCache(db_path=db).get(key) is None
+
+def test_result_key_ignores_dict_ordering():
+    """Test that the canonical hash does not depend on key order."""
+    from src.result_cache import ResultCache
+    assert ResultCache.key({"a": 1, "params": {"x": 1, "y": 2}}) == ResultCache.key({"params": {"y": 2, "x": 1}, "a": 1})
+
+def test_result_cache_memory_is_bounded_by_bytes():
+    """Test that the in-memory result tier evicts least recently used results over maxbytes."""
+    from src.result_cache import ResultCache
+    small = {"equity_curve": [{"time": "2021-01-01", "value": 1.0}] * 10}
+    cache = ResultCache(maxsize=100, maxbytes=1000)
+    cache.set("a", "code", small)
+    cache.set("b", "code", small)
+    assert cache.stats()["bytes"] < 1000
+    cache.get("a")
+    cache.set("c", "code", {"equity_curve": [{"time": "2021-01-01", "value": 1.0}] * 15})
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == small
+    assert cache.stats()["maxbytes"] == 1000 and cache.stats()["bytes"] <= 1000
@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.checkpoints import CHECKPOINTS, CheckpointNotFound, CheckpointStore
+from src.main import app
+from src.runner import run_backtest
+
+client = TestClient(app)
+
+CROSS = """
+import backtrader as bt
+class Cross(bt.Strategy):
+    def __init__(self):
+        self.cross = bt.ind.CrossOver(bt.ind.SMA(period=10), bt.ind.EMA(period=30))
+        self.rsi = bt.ind.RSI(period=14)
+    def next(self):
+        if self.cross[0] > 0 and self.rsi[0] < 70:
+            self.buy()
+        elif self.cross[0] < 0 and self.position:
+            self.close()
+"""
+
+# Plain attribute state and limit orders left pending across checkpoint boundaries
+STATEFUL = """
+import backtrader as bt
+class Stateful(bt.Strategy):
+    def __init__(self):
+        self.count = 0
+        self.order = None
+    def notify_order(self, order):
+        if not order.alive():
+            self.order = None
+    def next(self):
+        self.count += 1
+        if self.order is not None and self.count - self.placed >= 5:
+            self.cancel(self.order)
+        elif self.order is None and self.count % 7 == 0:
+            price = self.data.close[0] * (0.998 if not self.position else 1.002)
+            if self.position:
+                self.order = self.sell(exectype=bt.Order.Limit, price=price)
+            else:
+                self.order = self.buy(exectype=bt.Order.Limit, price=price)
+            self.placed = self.count
+"""
+
+def _bars(n: int, intraday: bool = False, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    if intraday:
+        times = np.datetime64("2021-01-04T09:30:00", "s") + np.arange(n) * 60
+    else:
+        times = np.datetime64("2015-01-01", "D") + np.arange(n)
+    return {
+        "time": np.datetime_as_string(times).tolist(), "open": (close * 1.001).tolist(),
+        "high": (close * 1.01).tolist(), "low": (close * 0.99).tolist(), "close": close.tolist(),
+        "volume": [1000.0] * n
+    }
+
+def _slice(bars, start, stop):
+    return {name: values[start:stop] for name, values in bars.items()}
+
+@pytest.mark.parametrize("code", [CROSS, STATEFUL])
+@pytest.mark.parametrize("intraday", [False, True])
+def test_resumed_runs_equal_full_reruns(code, intraday):
+    """Test that every resumed checkpoint result equals a full rerun over the bars so far."""
+    bars = _bars(400, intraday)
+    splits = [0, 40, 41, 180, 333, 400]
+    payload = {"code": code, "include_ohlcv": False, "monte_carlo": {"iterations": 50, "seed": 1}}
+    checkpoint_id = None
+    for start, stop in zip(splits, splits[1:]):
+        if checkpoint_id is None:
+            result = CHECKPOINTS.start({**payload, "bars": _slice(bars, start, stop)})
+        else:
+            result = CHECKPOINTS.resume(checkpoint_id, _slice(bars, start, stop))
+        checkpoint_id = result.pop("checkpoint_id")
+        assert checkpoint_id is not None
+        # Every intermediate result is the full run over the bars so far
+        assert result == run_backtest({**payload, "bars": _slice(bars, 0, stop)})
+    assert CHECKPOINTS.delete(checkpoint_id)
+
+def test_checkpoint_endpoints_round_trip():
+    """Test that /run with checkpoint and /checkpoints/{id} resume, reject overlapping bars and delete."""
+    bars = _bars(300)
+    request = {"code": CROSS, "capital": 25000, "equity_points": 50}
+    first = client.post("/run", json={**request, "bars": _slice(bars, 0, 200), "checkpoint": True})
+    assert first.status_code == 200
+    checkpoint_id = first.json()["checkpoint_id"]
+    resumed = client.post(f"/checkpoints/{checkpoint_id}", json={"bars": _slice(bars, 200, 300)})
+    assert resumed.status_code == 200
+    full = client.post("/run", json={**request, "bars": bars}, headers={"Cache-Control": "no-cache"})
+    expected = {**full.json(), "checkpoint_id": checkpoint_id}
+    # Full runs echo the bars as sent; checkpoints echo columns with openinterest filled in
+    assert resumed.json()["ohlcv"]["close"] == expected.pop("ohlcv")["close"]
+    assert {k: v for k, v in resumed.json().items() if k != "ohlcv"} == expected
+
+    overlap = client.post(f"/checkpoints/{checkpoint_id}", json={"bars": _slice(bars, 299, 300)})
+    assert overlap.status_code == 400
+    assert "after the checkpoint's last bar" in overlap.json()["detail"]
+    assert client.delete(f"/checkpoints/{checkpoint_id}").status_code == 200
+    gone = client.post(f"/checkpoints/{checkpoint_id}", json={"bars": _slice(bars, 299, 300)})
+    assert gone.status_code == 404
+
+def test_checkpoint_rejects_unsupported_options():
+    """Test that checkpointed runs with a timeframe are rejected with 400."""
+    response = client.post("/run", json={"code": CROSS, "bars": _bars(50), "timeframe": "1w", "checkpoint": True})
+    assert response.status_code == 400
+
+def test_strategy_errors_drop_the_checkpoint():
+    """Test that a strategy error while resuming re-raises and discards the checkpoint."""
+    code = STATEFUL.replace("self.count += 1", "self.count += 1 / (150 - len(self))")
+    bars = _bars(200)
+    result = CHECKPOINTS.start({"code": code, "bars": _slice(bars, 0, 100)})
+    with pytest.raises(ZeroDivisionError):
+        CHECKPOINTS.resume(result["checkpoint_id"], _slice(bars, 100, 200))
+    with pytest.raises(CheckpointNotFound):
+        CHECKPOINTS.get(result["checkpoint_id"])
+
+def test_store_evicts_least_recently_used():
+    """Test that a full store evicts the least recently used checkpoint and releases its run thread."""
+    store = CheckpointStore(maxsize=1)
+    bars = _bars(60)
+    first = store.start({"code": STATEFUL, "bars": bars})["checkpoint_id"]
+    checkpoint = store.get(first)
+    second = store.start({"code": STATEFUL, "bars": bars})["checkpoint_id"]
+    with pytest.raises(CheckpointNotFound):
+        store.get(first)
+    # The evicted run is released and finishes on its own thread
+    checkpoint.thread.join(5)
+    assert not checkpoint.thread.is_alive()
+    assert len(store) == 1 and store.get(second)
+    store.clear()
+
+def test_idle_checkpoints_expire_without_further_requests():
+    """Test that the reaper closes idle checkpoints past their TTL and stops once the store is empty."""
+    store = CheckpointStore(ttl=0.1)
+    first = store.start({"code": STATEFUL, "bars": _bars(60)})["checkpoint_id"]
+    checkpoint = store._items[first]
+    assert not checkpoint.feed.ended()
+    # Nothing touches the store again: the reaper closes the checkpoint on its own
+    checkpoint.thread.join(5)
+    assert not checkpoint.thread.is_alive()
+    assert checkpoint.feed.ended() and len(store) == 0
+    # The reaper stops with the store empty and restarts with the next checkpoint
+    assert store._reaper is None
+    second = store.start({"code": STATEFUL, "bars": _bars(60)})["checkpoint_id"]
+    assert store._reaper is not None and store.get(second)
+    store.clear()
@@ -56,8 +56,8 @@ def test_missing_code_returns_400():
     assert response.status_code == 422  # FastAPI validation error
     assert "Field required" in str(response.json())
 
-def test_symbol_dates_only_returns_501():
-    """Test that providing only symbol and dates (without bars) returns 501."""
+def test_symbol_dates_only_unknown_symbol_returns_404():
+    """Test that symbol and dates (without bars) for a symbol missing from the store returns 404."""
     payload = {
         "code": """
 import backtrader as bt
@@ -65,16 +65,310 @@ class TestStrategy(bt.Strategy):
     def next(self):
         pass
         """,
-        "symbol": "AAPL",
+        "symbol": "NOSUCHSYMBOL",
         "start_date": "2020-01-01",
         "end_date": "2020-01-31"
     }
     
     response = client.post("/run", json=payload)
-    assert response.status_code == 501
-    assert "symbol-based data loading not implemented" in response.json()["detail"]
+    assert response.status_code == 404
+    assert "no stored bars" in response.json()["detail"]
 
 def test_empty_payload_returns_422():
     """Test that completely empty payload returns 422 (validation error)."""
     response = client.post("/run", json={})
-    assert response.status_code == 422  # FastAPI validation error
\ No newline at end of file
+    assert response.status_code == 422  # FastAPI validation error
+
+def test_optimize_returns_row_per_combination():
+    """Test that /optimize returns one summary row per param combination."""
+    payload = {
+        "code": """
+import backtrader as bt
+class TestStrategy(bt.Strategy):
+    params = (('period', 3),)
+    def __init__(self):
+        self.sma = bt.ind.SMA(self.data.close, period=self.p.period)
+    def next(self):
+        if not self.position:
+            self.buy()
+        """,
+        "bars": [
+            {"time": f"2020-01-{i:02d}", "open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100.5 + i, "volume": 10000, "openinterest": 0}
+            for i in range(2, 12)
+        ],
+        "param_grid": {"period": [2, 3, 4]}
+    }
+
+    response = client.post("/optimize", json=payload)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["param_names"] == ["period"]
+    assert [row["params"]["period"] for row in data["results"]] == [2, 3, 4]
+    assert all(row["summary"]["final_value"] > 0 for row in data["results"])
+
+def test_walkforward_returns_windows_and_stitched_curve():
+    """Test that /walkforward returns one row per window and the out-of-sample curve, and 400 for too few bars."""
+    payload = {
+        "code": """
+import backtrader as bt
+class TestStrategy(bt.Strategy):
+    params = (('period', 3),)
+    def __init__(self):
+        self.sma = bt.ind.SMA(self.data.close, period=self.p.period)
+    def next(self):
+        if not self.position:
+            self.buy()
+        """,
+        "bars": [
+            {"time": f"2020-01-{i:02d}", "open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100.5 + i, "volume": 10000}
+            for i in range(1, 31)
+        ],
+        "param_grid": {"period": [2, 3]},
+        "window": 10, "test": 5
+    }
+
+    response = client.post("/walkforward", json=payload)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["windows"]) == 4
+    assert all(w["params"]["period"] in (2, 3) and w["error"] is None for w in data["windows"])
+    assert [p["time"] for p in data["equity_curve"]][:1] == ["2020-01-11"]
+    assert len(data["equity_curve"]) == 20
+
+    response = client.post("/walkforward", json={**payload, "window": 40})
+    assert response.status_code == 400
+
+
+def test_repeated_run_is_served_from_result_cache():
+    """Test that an identical /run request is a cache hit until its code hash is invalidated."""
+    from src.utils.hashing import code_hash
+    payload = {
+        "code": """
+import backtrader as bt
+class CacheProbeStrategy(bt.Strategy):
+    def next(self):
+        pass
+        """,
+        "bars": [
+            {"time": "2020-01-02", "open": 100, "high": 101, "low": 99, "close": 100.5, "volume": 10000, "openinterest": 0},
+            {"time": "2020-01-03", "open": 100.5, "high": 101.5, "low": 100, "close": 101.2, "volume": 11000, "openinterest": 0}
+        ],
+        "capital": 10000
+    }
+
+    first = client.post("/run", json=payload)
+    second = client.post("/run", json=payload)
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert "X-Cache-Age" in second.headers
+    assert second.json() == first.json()
+
+    response = client.delete(f"/cache/results/{code_hash(payload['code'])}")
+    assert response.json()["invalidated"] == 1
+    assert client.post("/run", json=payload).headers["X-Cache"] == "MISS"
+
+
+def test_columnar_bars_match_row_bars():
+    """Test that columnar bars give the same result as the equivalent rows and are echoed as columns."""
+    code = """
+import backtrader as bt
+class ColumnarStrategy(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy(size=1)
+    """
+    rows = [
+        {"time": f"2020-03-{i:02d}", "open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100.5 + i, "volume": 1000, "openinterest": 0}
+        for i in range(2, 9)
+    ]
+    columns = {k: [r[k] for r in rows] for k in ("time", "open", "high", "low", "close", "volume")}
+
+    by_rows = client.post("/run", json={"code": code, "bars": rows}).json()
+    by_columns = client.post("/run", json={"code": code, "bars": columns}).json()
+
+    assert by_columns["summary"] == by_rows["summary"]
+    assert by_columns["equity_curve"] == by_rows["equity_curve"]
+    assert by_columns["ohlcv"]["close"] == columns["close"]
+
+def test_invalid_columnar_bars_return_422():
+    """Test the vectorized checks on columnar bars: lengths, time order, high >= low."""
+    base = {"time": ["2020-01-02", "2020-01-03"], "open": [1, 1], "high": [2, 2], "low": [0, 0], "close": [1, 1], "volume": [1, 1]}
+    code = "import backtrader as bt\nclass S(bt.Strategy): pass"
+    for broken, message in [
+        ({"close": [1]}, "bars.close has 1 values"),
+        ({"time": ["2020-01-03", "2020-01-02"]}, "strictly increasing"),
+        ({"high": [2, -1]}, "high must be >= bars.low"),
+    ]:
+        response = client.post("/run", json={"code": code, "bars": {**base, **broken}})
+        assert response.status_code == 422
+        assert message in str(response.json())
+
+
+def _binary_fixture():
+    import numpy as np
+    code = """
+import backtrader as bt
+class BinaryStrategy(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy(size=1)
+    """
+    rows = [
+        {"time": f"2020-04-{i:02d}", "open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100.5 + i, "volume": 1000, "openinterest": 0}
+        for i in range(1, 9)
+    ]
+    dtype = [("time", "datetime64[s]")] + [(k, "f8") for k in ("open", "high", "low", "close", "volume")]
+    arr = np.array([tuple([np.datetime64(r["time"], "s")] + [r[k] for k, _ in dtype[1:]]) for r in rows], dtype=dtype)
+    return code, rows, arr
+
+def test_npy_upload_matches_json_run():
+    """Test that bars uploaded as a .npy structured array give the same result as JSON rows."""
+    import io, json
+    import numpy as np
+    code, rows, arr = _binary_fixture()
+    buf = io.BytesIO()
+    np.save(buf, arr)
+
+    response = client.post(
+        "/run/binary",
+        data={"request": json.dumps({"code": code, "capital": 10000})},
+        files={"bars": ("bars.npy", buf.getvalue(), "application/x-npy")}
+    )
+    expected = client.post("/run", json={"code": code, "bars": rows, "capital": 10000}).json()
+
+    assert response.status_code == 200
+    assert response.json()["summary"] == expected["summary"]
+    assert response.json()["ohlcv"]["time"] == [r["time"] for r in rows]
+
+def test_binary_upload_with_timeframe_echoes_resampled_bars():
+    """Test that /run/binary with a timeframe echoes the resampled bars the run used, as /run does."""
+    import io, json
+    import numpy as np
+    code, rows, arr = _binary_fixture()
+    buf = io.BytesIO()
+    np.save(buf, arr)
+
+    response = client.post(
+        "/run/binary",
+        data={"request": json.dumps({"code": code, "timeframe": "1w"})},
+        files={"bars": ("bars.npy", buf.getvalue(), "application/x-npy")}
+    )
+    expected = client.post("/run", json={"code": code, "bars": rows, "timeframe": "1w"}).json()
+
+    assert response.status_code == 200
+    assert response.json()["ohlcv"] == expected["ohlcv"]
+    assert len(response.json()["ohlcv"]["time"]) == len(response.json()["equity_curve"]) < len(rows)
+
+def test_arrow_upload_and_unknown_format():
+    """Test Arrow IPC decoding and the 415 for unsupported content types."""
+    import json
+    pa = pytest.importorskip("pyarrow")
+    code, rows, arr = _binary_fixture()
+    table = pa.table({name: arr[name] for name in arr.dtype.names})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    request = {"request": json.dumps({"code": code})}
+    ok = client.post("/run/binary", data=request,
+                     files={"bars": ("bars", sink.getvalue().to_pybytes(), "application/vnd.apache.arrow.stream")})
+    unsupported = client.post("/run/binary", data=request, files={"bars": ("bars.bin", b"xx", "application/octet-stream")})
+
+    assert ok.status_code == 200
+    assert len(ok.json()["equity_curve"]) == len(rows)
+    assert unsupported.status_code == 415
+
+
+def test_ndjson_stream_matches_json_response():
+    """Test that the NDJSON stream carries the same equity, trades and summary as the JSON response."""
+    import json
+    payload = {
+        "code": """
+import backtrader as bt
+class StreamStrategy(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy(size=1)
+        elif len(self.data) % 3 == 0:
+            self.close()
+        """,
+        "bars": [
+            {"time": f"2020-05-{i:02d}", "open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100.5 + i, "volume": 1000, "openinterest": 0}
+            for i in range(1, 21)
+        ]
+    }
+
+    expected = client.post("/run", json=payload).json()
+    response = client.post("/run", json=payload, headers={"Accept": "application/x-ndjson"})
+    records = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [{"time": r["time"], "value": r["value"]} for r in records if r["type"] == "equity"] == expected["equity_curve"]
+    assert [{k: v for k, v in r.items() if k != "type"} for r in records if r["type"] == "trade"] == expected["trades"]
+    assert records[-1] == {"type": "summary", "summary": expected["summary"]}
+
+
+def test_slim_response_options():
+    """Test omitting the ohlcv echo and downsampling the equity curve."""
+    import math
+    bars = [
+        {"time": f"2021-{1 + i // 28:02d}-{1 + i % 28:02d}", "open": 100, "high": 110, "low": 90,
+         "close": 100 + 10 * math.sin(i / 5), "volume": 1000, "openinterest": 0}
+        for i in range(200)
+    ]
+    code = """
+import backtrader as bt
+class HoldStrategy(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy(size=10)
+    """
+    full = client.post("/run", json={"code": code, "bars": bars}).json()
+    for method in ("lttb", "minmax"):
+        slim = client.post("/run", json={"code": code, "bars": bars, "include_ohlcv": False,
+                                         "equity_points": 20, "downsample": method}).json()
+
+        assert slim["ohlcv"] is None
+        assert 2 < len(slim["equity_curve"]) <= 20
+        assert all(p in full["equity_curve"] for p in slim["equity_curve"])
+        assert slim["summary"] == full["summary"]
+    # min/max bucketing keeps the deepest point of the curve
+    assert min(p["value"] for p in slim["equity_curve"]) == min(p["value"] for p in full["equity_curve"])
+
+def test_run_with_monte_carlo_bands(monkeypatch):
+    """Test that monte_carlo options add percentile bands computed from the run's trades."""
+    bars = [
+        {"time": f"2021-{1 + i // 28:02d}-{1 + i % 28:02d}", "open": 100 + i % 7, "high": 110 + i % 7, "low": 90,
+         "close": 100 + (i % 11), "volume": 1000}
+        for i in range(120)
+    ]
+    code = """
+import backtrader as bt
+class FlipStrategy(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy(size=10)
+        elif len(self) % 5 == 0:
+            self.close()
+    """
+    response = client.post("/run", json={"code": code, "bars": bars,
+                                         "monte_carlo": {"iterations": 2000, "percentiles": [5, 50, 95], "seed": 1}})
+
+    assert response.status_code == 200
+    mc = response.json()["monte_carlo"]
+    assert mc["iterations"] == 2000 and mc["percentiles"] == [5, 50, 95]
+    assert mc["final_value"][0] <= mc["final_value"][1] <= mc["final_value"][2]
+    assert len(mc["path"]) == 3 and len(mc["path"][0]) == len(mc["path_steps"])
+    assert mc["path_steps"][-1] == len(response.json()["trades"])
+    assert client.post("/run", json={"code": code, "bars": bars}).json().get("monte_carlo") is None
+
+    # Bad percentiles are request errors; oversized iteration counts are capped
+    for percentiles in ([5, 101], [-1], []):
+        bad = client.post("/run", json={"code": code, "bars": bars, "monte_carlo": {"percentiles": percentiles}})
+        assert bad.status_code == 422
+    import src.montecarlo
+    monkeypatch.setattr(src.montecarlo, "MAX_ITERATIONS", 100)
+    capped = client.post("/run", json={"code": code, "bars": bars, "monte_carlo": {"iterations": 10 ** 9}})
+    assert capped.status_code == 200 and capped.json()["monte_carlo"]["iterations"] == 100
@@ -0,0 +1,152 @@
+import backtrader as bt
+import numpy as np
+import pytest
+
+import src.indicators as indicators
+from src.indicators import CACHED_BT, INDICATOR_CACHE, CachedRSI, CachedSMA
+from src.runner import _load_strategy_class, run_backtest, run_summary
+from src.utils.datafeed import InMemoryData, bars_to_columns
+
+def _columns(n: int = 600, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    days = np.datetime64("2015-01-01", "D") + np.arange(n)
+    return bars_to_columns({
+        "time": np.datetime_as_string(days).tolist(), "open": close.tolist(),
+        "high": (close * 1.01).tolist(), "low": (close * 0.99).tolist(),
+        "close": close.tolist(), "volume": [1000.0] * n
+    })
+
+def _record(module, columns, runonce: bool):
+    """Per-bar values of SMA/EMA/RSI built through `module` (bt or CACHED_BT)."""
+    out = {"rows": []}
+    class Record(bt.Strategy):
+        def __init__(self):
+            self.inds = [module.ind.SMA(period=20), module.ind.EMA(self.data.close, period=30),
+                         module.ind.RSI(period=14), module.indicators.SimpleMovingAverage(self.data, period=1)]
+            out["types"] = [type(i) for i in self.inds]
+        def next(self):
+            out["rows"].append([i[0] for i in self.inds])
+    cerebro = bt.Cerebro(runonce=runonce)
+    cerebro.adddata(InMemoryData(dataname=columns))
+    cerebro.addstrategy(Record)
+    cerebro.run()
+    return out
+
+@pytest.mark.parametrize("runonce", [True, False])
+def test_cached_indicators_match_backtrader(runonce):
+    """Test that cached SMA/EMA/RSI warm up on the same bar and match backtrader values in both run modes."""
+    columns = _columns()
+    expected = _record(bt, columns, runonce)
+    cached = _record(CACHED_BT, columns, runonce)
+    assert cached["types"][0] is CachedSMA and cached["types"][2] is CachedRSI
+    # Same warm-up (first next() on the same bar) and values to rounding
+    assert len(cached["rows"]) == len(expected["rows"])
+    np.testing.assert_allclose(cached["rows"], expected["rows"], rtol=1e-12)
+
+def test_rsi_zero_loss_matches_backtrader():
+    """Test that RSI with no losses gives 100 under safediv and raises ZeroDivisionError without it."""
+    assert indicators.rsi(np.arange(30.0), 14, safediv=True)[15] == 100.0
+    with pytest.raises(ZeroDivisionError):
+        indicators.rsi(np.arange(30.0), 14)
+
+def test_unsupported_calls_build_regular_indicators():
+    """Test that indicator inputs, delayed lines and extra params fall back to regular backtrader indicators."""
+    columns = _columns(100)
+    kinds = {}
+    class Mixed(bt.Strategy):
+        def __init__(self):
+            rsi = CACHED_BT.ind.RSI(period=14)
+            kinds["of_indicator"] = type(CACHED_BT.ind.SMA(rsi, period=5))
+            kinds["delayed"] = type(CACHED_BT.ind.SMA(self.data.close(-1), period=5))
+            kinds["lookback"] = type(CACHED_BT.ind.RSI(period=14, lookback=2))
+            kinds["movav"] = type(CACHED_BT.ind.RSI(period=14, movav=bt.ind.SMA))
+    cerebro = bt.Cerebro()
+    cerebro.adddata(InMemoryData(dataname=columns))
+    cerebro.addstrategy(Mixed)
+    cerebro.run()
+    # The stand-ins themselves compute exactly like the backtrader classes they subclass
+    assert kinds == {"of_indicator": CACHED_BT.ind.SMA, "delayed": CACHED_BT.ind.SMA,
+                     "lookback": CACHED_BT.ind.RSI, "movav": CACHED_BT.ind.RSI}
+    assert issubclass(CACHED_BT.ind.SMA, bt.ind.SMA) and issubclass(CachedSMA, CACHED_BT.ind.SMA)
+
+SUBCLASSING = """
+import backtrader as bt
+class Check(bt.Strategy):
+    def __init__(self):
+        class Fast(bt.ind.EMA):
+            params = (("period", 5),)
+        self.fast = Fast()
+        self.sma = bt.ind.SMA(period=bt.ind.SMA.params.period // 3)
+        assert isinstance(self.fast, bt.ind.EMA) and isinstance(self.sma, bt.ind.SMA)
+    def next(self):
+        if self.fast[0] > self.sma[0] and not self.position:
+            self.buy()
+        elif self.fast[0] < self.sma[0] and self.position:
+            self.close()
+"""
+
+@pytest.mark.parametrize("indicator_cache", [True, False])
+def test_standins_subclass_and_isinstance_like_backtrader(indicator_cache):
+    """Test that user subclasses, params access and isinstance work on the stand-ins as on backtrader classes."""
+    bars = {name: (values.astype(str).tolist() if name == "time" else values.tolist())
+            for name, values in _columns(200).items()}
+    result = run_backtest({"code": SUBCLASSING, "bars": bars, "include_ohlcv": False,
+                           "indicator_cache": indicator_cache})
+    assert result["summary"]["total_trades"] > 0
+
+def test_too_few_bars_fails_like_backtrader():
+    """Test that a period longer than the data raises IndexError with and without the cache."""
+    code = CODE.replace("period=40", "period=250")
+    bars = {name: (values.astype(str).tolist() if name == "time" else values.tolist())
+            for name, values in _columns(200).items()}
+    for flag in (True, False):
+        with pytest.raises(IndexError):
+            run_backtest({"code": code, "bars": bars, "include_ohlcv": False, "indicator_cache": flag})
+
+CODE = """
+import backtrader as bt
+class Cross(bt.Strategy):
+    params = (("fast", 10),)
+    def __init__(self):
+        from backtrader import indicators as btind
+        self.fast = bt.ind.SMA(period=self.p.fast)
+        self.slow = btind.EMA(period=40)
+        self.rsi = bt.ind.RSI()
+    def next(self):
+        if not self.position and self.fast[0] > self.slow[0] and self.rsi[0] < 70:
+            self.buy()
+        elif self.position and self.fast[0] < self.slow[0]:
+            self.close()
+"""
+
+def test_sweep_reuses_cached_outputs_and_matches_uncached():
+    """Test that a sweep reuses shared indicator outputs across runs and matches uncached summaries."""
+    columns = _columns()
+    user_cls = _load_strategy_class(CODE)
+    INDICATOR_CACHE.clear()
+    before = INDICATOR_CACHE.stats()
+    cached = [run_summary(user_cls, columns, 10000, {"fast": f}) for f in (5, 10, 5)]
+    after = INDICATOR_CACHE.stats()
+    # EMA(40) and RSI are shared by every run; SMA(5) repeats in the third
+    assert after["misses"] - before["misses"] == 4
+    assert after["hits"] - before["hits"] == 5
+    plain = [run_summary(user_cls, columns, 10000, {"fast": f}, indicator_cache=False) for f in (5, 10, 5)]
+    assert INDICATOR_CACHE.stats()["hits"] == after["hits"]
+    assert cached == plain
+
+def test_run_opt_out_and_global_switch(monkeypatch):
+    """Test that the per-run indicator_cache flag and the global mode switch bypass or use the cache."""
+    bars = {name: (values.astype(str).tolist() if name == "time" else values.tolist())
+            for name, values in _columns(200).items()}
+    INDICATOR_CACHE.clear()
+    result = run_backtest({"code": CODE, "bars": bars, "include_ohlcv": False, "indicator_cache": False})
+    assert len(INDICATOR_CACHE) == 0
+    # Compiled against plain backtrader when the cache is not used
+    assert _load_strategy_class(CODE, indicator_cache=False).__init__.__globals__["bt"] is bt
+    monkeypatch.setattr(indicators, "INDICATOR_CACHE_MODE", "off")
+    assert run_backtest({"code": CODE, "bars": bars, "include_ohlcv": False}) == result
+    assert len(INDICATOR_CACHE) == 0
+    monkeypatch.setattr(indicators, "INDICATOR_CACHE_MODE", "on")
+    assert run_backtest({"code": CODE, "bars": bars, "include_ohlcv": False}) == result
+    assert len(INDICATOR_CACHE) == 3
@@ -0,0 +1,58 @@
+import datetime
+import time
+from src.jobs import JobManager
+
+CODE = """
+import backtrader as bt
+class JobStrategy(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy(size=1)
+"""
+
+SLOW_CODE = """
+import backtrader as bt
+class SlowStrategy(bt.Strategy):
+    def next(self):
+        import time
+        time.sleep(0.01)
+"""
+
+def _bars(n):
+    start = datetime.date(2000, 1, 1)
+    return [
+        {"time": (start + datetime.timedelta(days=i)).isoformat(), "open": 100, "high": 101, "low": 99, "close": 100, "volume": 1000, "openinterest": 0}
+        for i in range(n)
+    ]
+
+def _wait(manager, job, statuses, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = manager.describe(job)
+        if info["status"] in statuses:
+            return info
+        time.sleep(0.05)
+    raise AssertionError(f"job stuck in {manager.describe(job)['status']}")
+
+def test_job_runs_to_completion():
+    """Test that a submitted job finishes with a result and full progress."""
+    manager = JobManager(max_workers=1)
+    try:
+        job = manager.submit({"code": CODE, "bars": _bars(30), "capital": 10000, "params": {}})
+        info = _wait(manager, job, {"done", "failed"})
+        assert info["status"] == "done", info["error"]
+        assert info["progress"] == 1.0
+        assert len(info["result"]["equity_curve"]) == 30
+    finally:
+        manager.shutdown()
+
+def test_running_job_can_be_cancelled():
+    """Test that cancelling a running job stops it at the next progress check."""
+    manager = JobManager(max_workers=1)
+    try:
+        job = manager.submit({"code": SLOW_CODE, "bars": _bars(2000), "capital": 10000, "params": {}})
+        _wait(manager, job, {"running"})
+        manager.cancel(job.id)
+        assert _wait(manager, job, {"cancelled", "done", "failed"})["status"] == "cancelled"
+    finally:
+        manager.shutdown()
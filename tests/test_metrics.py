@@ -0,0 +1,70 @@
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.metrics import Histogram, StageTimer
+from src.runner import run_backtest
+
+client = TestClient(app)
+
+CODE = """
+import backtrader as bt
+class Hold(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy()
+"""
+
+BARS = {
+    "time": ["2021-03-01", "2021-03-02", "2021-03-03", "2021-03-04"],
+    "open": [10.0, 10.5, 11.0, 11.5], "high": [11.0, 11.5, 12.0, 12.5], "low": [9.5, 10.0, 10.5, 11.0],
+    "close": [10.5, 11.0, 11.5, 12.0], "volume": [100.0, 100.0, 100.0, 100.0]
+}
+
+def _sample(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+def test_histogram_buckets_are_cumulative():
+    """Test that histogram buckets count every observation at or below their bound."""
+    h = Histogram("test_latency_seconds", "test", buckets=(0.1, 1.0), labelnames=("stage",))
+    h.observe(0.05, "a")
+    h.observe(0.5, "a")
+    h.observe(5.0, "a")
+    lines = h.render()
+    assert 'test_latency_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{stage="a"} 3' in lines
+
+def test_run_backtest_reports_stages_to_timer():
+    """Test that run_backtest reports its compile, feed, run and results stages to the timer."""
+    timer = StageTimer()
+    run_backtest({"code": CODE, "bars": BARS, "include_ohlcv": False}, timer=timer)
+    assert list(timer.stages) == ["compile", "feed", "run", "results"]
+    assert all(seconds >= 0 for seconds in timer.stages.values())
+
+def test_run_x_timing_header_and_metrics():
+    """Test that X-Timing returns per-stage timings on request and /metrics exports the run counters."""
+    before = client.get("/metrics").text
+    payload = {"code": CODE, "bars": BARS, "include_ohlcv": False, "capital": 12345}
+    response = client.post("/run", json=payload, headers={"X-Timing": "1", "Cache-Control": "no-cache"})
+    assert response.status_code == 200
+    stages = dict(part.split("=") for part in response.headers["X-Timing"].split(", "))
+    assert {"validate", "cache", "compile", "feed", "run", "results", "serialize", "total"} <= set(stages)
+    assert all(float(ms) >= 0 for ms in stages.values())
+
+    # Without the request header no timing is sent back; the cached repeat counts as a hit
+    assert "X-Timing" not in client.post("/run", json=payload).headers
+
+    after = client.get("/metrics")
+    assert after.headers["content-type"].startswith("text/plain")
+    text = after.text
+    assert _sample(text, 'backtrader_runs_total{outcome="ok"}') == _sample(before, 'backtrader_runs_total{outcome="ok"}') + 1
+    assert _sample(text, 'backtrader_runs_total{outcome="cache_hit"}') >= 1
+    assert _sample(text, "backtrader_bars_total") >= _sample(before, "backtrader_bars_total") + 4
+    assert 'backtrader_stage_seconds_bucket{stage="run",le="+Inf"}' in text
+    assert "backtrader_bars_per_second_count" in text
+    assert _sample(text, "backtrader_runs_in_flight") == 0
+    assert 'backtrader_cache_hits_total{cache="results"}' in text
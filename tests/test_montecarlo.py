@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import src.montecarlo as mc
+
+def test_monte_carlo_bands():
+    """Test seeded reproducibility, ordered bands, chunking and the fixed final value of shuffles."""
+    pnls = np.random.default_rng(0).normal(5, 50, 60)
+
+    boot = mc.simulate(pnls, [], 1000.0, iterations=500, seed=7)
+    assert boot == mc.simulate(pnls, [], 1000.0, iterations=500, seed=7)
+    assert boot["final_value"] == sorted(boot["final_value"])
+    assert boot["path_steps"][0] == 0 and boot["path_steps"][-1] == 60
+    assert all(row[0] == 1000.0 for row in boot["path"])
+
+    shuffled = mc.simulate(pnls, [], 1000.0, iterations=500, method="shuffle", seed=7)
+    assert shuffled["final_value"] == pytest.approx([1000.0 + pnls.sum()] * 5)
+    assert shuffled["max_drawdown_pct"][0] < shuffled["max_drawdown_pct"][-1]
+
+    values = 1000.0 * np.cumprod(1 + np.random.default_rng(1).normal(0, 0.01, 250))
+    block = mc.simulate([], values, 1000.0, iterations=300, method="block", block=10, seed=3)
+    old = mc.CHUNK_ELEMENTS
+    try:
+        mc.CHUNK_ELEMENTS = 1000  # force several chunks; the random stream is consumed identically
+        assert mc.simulate([], values, 1000.0, iterations=300, method="block", block=10, seed=3) == block
+    finally:
+        mc.CHUNK_ELEMENTS = old
+    with pytest.raises(ValueError, match="iterations"):
+        mc.simulate(pnls, [], 1000.0, iterations=0)
+    assert mc.simulate(pnls, [], 1000.0, iterations=mc.MAX_ITERATIONS + 1, seed=7)["iterations"] == mc.MAX_ITERATIONS
+
+def test_path_points_are_capped_server_side(monkeypatch):
+    """Test that path_points above MAX_PATH_POINTS report at most that many evenly spaced steps."""
+    pnls = np.random.default_rng(0).normal(5, 50, 500)
+    monkeypatch.setattr(mc, "MAX_PATH_POINTS", 50)
+
+    capped = mc.simulate(pnls, [], 1000.0, iterations=100, path_points=10 ** 12, seed=7)
+
+    assert len(capped["path_steps"]) == 50
+    assert capped["path_steps"][0] == 0 and capped["path_steps"][-1] == 500
+    assert all(len(row) == 50 for row in capped["path"])
+    assert capped == mc.simulate(pnls, [], 1000.0, iterations=100, path_points=50, seed=7)
@@ -0,0 +1,128 @@
+import pytest
+from src.optimizer import expand_grid, run_optimization
+from src.runner import run_backtest
+
+CODE = """
+import backtrader as bt
+class SMAStrategy(bt.Strategy):
+    params = (('period', 5), ('size', 10))
+    def __init__(self):
+        self.sma = bt.ind.SMA(self.data.close, period=self.p.period)
+    def next(self):
+        if not self.position and self.data.close[0] > self.sma[0]:
+            self.buy(size=self.p.size)
+        elif self.position and self.data.close[0] < self.sma[0]:
+            self.close()
+"""
+
+BARS = [
+    {"time": f"2020-02-{i:02d}", "open": 100 + (i % 4), "high": 103 + (i % 4), "low": 97 + (i % 4), "close": 100 + (i % 6), "volume": 10000, "openinterest": 0}
+    for i in range(1, 29)
+]
+
+def test_expand_grid_keeps_grid_order():
+    """Test that the grid expands to the cartesian product in declaration order."""
+    assert expand_grid({"a": [1, 2], "b": ["x", "y"]}) == [
+        {"a": 1, "b": "x"}, {"a": 1, "b": "y"}, {"a": 2, "b": "x"}, {"a": 2, "b": "y"}
+    ]
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_optimization_matches_individual_runs(max_workers):
+    """Test that every sweep row equals the summary of the equivalent single run."""
+    result = run_optimization({
+        "code": CODE, "bars": BARS, "capital": 10000,
+        "param_grid": {"period": [3, 5]}, "params": {"size": 5},
+        "max_workers": max_workers
+    })
+
+    assert result["param_names"] == ["period"]
+    assert [row["params"] for row in result["results"]] == [{"size": 5, "period": 3}, {"size": 5, "period": 5}]
+    for row in result["results"]:
+        single = run_backtest({"code": CODE, "bars": BARS, "capital": 10000, "params": row["params"]})
+        assert row["error"] is None
+        assert row["summary"] == single["summary"]
+
+def test_empty_grid_raises_value_error():
+    """Test that a grid with no values is rejected."""
+    with pytest.raises(ValueError, match="param_grid"):
+        run_optimization({"code": CODE, "bars": BARS, "param_grid": {"period": []}})
+
+def test_batch_reports_per_entry_errors():
+    """Test that a bad entry fails alone while the rest of the batch succeeds."""
+    from src.batch import run_batch
+    result = run_batch({
+        "bars": BARS,
+        "entries": [
+            {"code": CODE, "params": {"period": 3}, "capital": 10000},
+            {"code": "x = 1", "params": {}, "capital": 10000},
+            {"code": CODE, "params": {"period": 5}, "capital": 5000},
+        ],
+        "max_workers": 2
+    })
+
+    rows = result["results"]
+    assert [r["index"] for r in rows] == [0, 1, 2]
+    assert rows[1]["summary"] is None and "No bt.Strategy subclass" in rows[1]["error"]
+    single = run_backtest({"code": CODE, "bars": BARS, "capital": 5000, "params": {"period": 5}})
+    assert rows[2]["summary"] == single["summary"]
+
+def _long_bars(n):
+    import datetime
+    start = datetime.date(2020, 1, 1)
+    return [
+        {"time": (start + datetime.timedelta(days=i)).isoformat(), "open": 100 + (i % 7), "high": 104 + (i % 7),
+         "low": 96 + (i % 7), "close": 100 + (i % 9) + i * 0.1, "volume": 10000}
+        for i in range(n)
+    ]
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_walkforward_windows_match_slice_runs(max_workers):
+    """Test that each window picks the best in-sample params and its out-of-sample leg equals a run on that slice."""
+    from src.walkforward import run_walkforward
+    bars = _long_bars(100)
+    result = run_walkforward({
+        "code": CODE, "bars": bars, "capital": 10000, "param_grid": {"period": [3, 5, 8]},
+        "window": 40, "test": 20, "objective": "return_pct", "max_workers": max_workers
+    })
+
+    assert [(w["in_sample_start"], w["out_of_sample_end"]) for w in result["windows"]] == [
+        (bars[0]["time"], bars[59]["time"]), (bars[20]["time"], bars[79]["time"]), (bars[40]["time"], bars[99]["time"])
+    ]
+    # A leg runs over its in-sample window too (warm indicators) but only trades after it
+    warm = CODE.replace("    def next(self):\n", "    def next(self):\n        if len(self) <= 40:\n            return\n")
+    scale = 1.0
+    for i, w in enumerate(result["windows"]):
+        start = 20 * i
+        scores = [run_backtest({"code": CODE, "bars": bars[start:start + 40], "params": {"period": p}})["summary"]["return_pct"]
+                  for p in (3, 5, 8)]
+        assert w["params"] == {"period": (3, 5, 8)[scores.index(max(scores))]}
+        oos = run_backtest({"code": warm, "bars": bars[start:start + 60], "params": w["params"]})
+        assert w["summary"]["final_value"] == oos["summary"]["final_value"]
+        assert result["equity_curve"][20 * i:20 * i + 20] == [
+            {**p, "value": pytest.approx(p["value"] * scale)} for p in oos["equity_curve"][40:]]
+        # Trades are scaled by the same compounding as the curve
+        assert [t for t in result["trades"] if bars[start + 40]["time"] <= t["entry_time"] <= bars[start + 59]["time"]] == [
+            {**t, "pnl": pytest.approx(t["pnl"] * scale), "pnlcomm": pytest.approx(t["pnlcomm"] * scale)} for t in oos["trades"]]
+        scale = result["equity_curve"][20 * i + 19]["value"] / 10000
+
+    assert len(result["equity_curve"]) == 60
+    assert result["summary"]["final_value"] == pytest.approx(result["equity_curve"][-1]["value"])
+
+def test_walkforward_rejects_overlapping_tests():
+    """Test that a step shorter than the out-of-sample length is rejected."""
+    from src.walkforward import run_walkforward
+    with pytest.raises(ValueError, match="step"):
+        run_walkforward({"code": CODE, "bars": _long_bars(100), "param_grid": {"period": [3]},
+                         "window": 40, "test": 20, "step": 10})
+
+def test_inline_sweeps_keep_their_own_bars_under_concurrency():
+    """Test that concurrent single-worker sweeps never run on another request's bars."""
+    from concurrent.futures import ThreadPoolExecutor
+    long_bars = [dict(b, time=f"2020-{1 + i // 28:02d}-{1 + i % 28:02d}") for i, b in enumerate(BARS * 6)]
+    payloads = [{"code": CODE, "bars": bars, "param_grid": {"period": [3, 4, 5, 6]}, "max_workers": 1}
+                for bars in (long_bars, BARS)]
+    expected = [run_optimization(p)["results"] for p in payloads]
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(run_optimization, payloads[i % 2]) for i in range(8)]
+        for i, future in enumerate(futures):
+            assert future.result()["results"] == expected[i % 2]
@@ -0,0 +1,90 @@
+import datetime
+import random
+import pytest
+import backtrader as bt
+from src.runner import _load_strategy_class, _build_cerebro, _summarize
+from src.utils.datafeed import InMemoryData, bars_to_columns
+
+STRATEGIES = {
+    "sma_cross": """
+import backtrader as bt
+class SMACross(bt.Strategy):
+    def __init__(self):
+        self.fast = bt.ind.SMA(period=5)
+        self.slow = bt.ind.SMA(period=20)
+    def next(self):
+        if self.fast[0] > self.slow[0] and self.position.size <= 0:
+            self.close()
+            self.buy(size=10)
+        elif self.fast[0] < self.slow[0] and self.position.size >= 0:
+            self.close()
+            self.sell(size=10)
+""",
+    "buy_and_hold": """
+import backtrader as bt
+class BuyAndHold(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy(size=20)
+""",
+    "idle": """
+import backtrader as bt
+class Idle(bt.Strategy):
+    def next(self):
+        pass
+""",
+}
+
+def _bars(n, seed):
+    rng = random.Random(seed)
+    price, start, bars = 100.0, datetime.date(2018, 1, 1), []
+    for i in range(n):
+        o = price
+        price = max(5.0, price + rng.gauss(0, 2))
+        bars.append({"time": (start + datetime.timedelta(days=i)).isoformat(), "open": o,
+                     "high": max(o, price) + 1, "low": min(o, price) - 1, "close": price,
+                     "volume": 1000, "openinterest": 0})
+    return bars
+
+@pytest.mark.parametrize("name", sorted(STRATEGIES))
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_summary_matches_backtrader_analyzers(name, seed):
+    """Test parity of the vectorized metrics with TradeAnalyzer, SharpeRatio and DrawDown."""
+    capital = 10000.0
+    data = InMemoryData(dataname=bars_to_columns(_bars(300, seed)))
+    cerebro = _build_cerebro(_load_strategy_class(STRATEGIES[name]), data, capital, {})
+    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="tradesum")
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name="sharpe", timeframe=bt.TimeFrame.Days, annualize=True)
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="dd")
+    strat = cerebro.run()[0]
+
+    summary = _summarize(strat, cerebro, capital)
+    ta = strat.analyzers.tradesum.get_analysis()
+    total = ta.get("total", {}).get("total", 0)
+    won = ta.get("won", {}).get("total", 0)
+
+    assert summary["total_trades"] == total
+    assert summary["win_rate"] == pytest.approx(round(won / total, 6) if total else 0.0)
+    assert summary["max_drawdown_pct"] == pytest.approx(strat.analyzers.dd.get_analysis()["max"]["drawdown"], abs=1e-6)
+    assert summary["sharpe"] == pytest.approx(strat.analyzers.sharpe.get_analysis()["sharperatio"] or 0.0, rel=1e-9, abs=1e-12)
+    assert summary["final_value"] == round(cerebro.broker.getvalue(), 6)
+    if name == "buy_and_hold":
+        assert summary["exposure_pct"] == pytest.approx(100.0 * 299 / 300)
+
+def test_trade_statistics():
+    """Test profit factor, average trade and the no-losses case."""
+    from src.performance import compute_summary
+    dt = [737791.99, 737792.99, 737793.99]
+    summary = compute_summary(dt, [100.0, 110.0, 105.0], [False, True, False], [30.0, -10.0, -5.0], 3, 100.0)
+    assert summary["profit_factor"] == pytest.approx(2.0)
+    assert summary["avg_trade"] == pytest.approx(5.0)
+    assert summary["win_rate"] == pytest.approx(round(1 / 3, 6))
+    assert compute_summary(dt, [100.0] * 3, [False] * 3, [5.0], 1, 100.0)["profit_factor"] is None
+
+def test_idle_run_has_zero_ratios():
+    """Test that a run that never trades reports sharpe and sortino of 0, not a penalty for the risk-free rate."""
+    from src.performance import compute_summary
+    dt = [737791.99 + i for i in range(30)]
+    summary = compute_summary(dt, [100.0] * 30, [False] * 30, [], 0, 100.0)
+    assert summary["sharpe"] == summary["sortino"] == 0.0
+    assert summary["return_pct"] == summary["max_drawdown_pct"] == 0.0
@@ -0,0 +1,77 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+import src.main
+from src.main import app
+from src.pool import WARMUP_BARS, WARMUP_CODE, WarmPool
+from src.runner import run_backtest
+
+client = TestClient(app)
+
+def _wait_ready(pool, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not pool.status()["ready"]:
+        assert time.monotonic() < deadline, "pool did not warm up"
+        time.sleep(0.05)
+
+def test_warm_pool_runs_backtests_and_recycles_workers(monkeypatch):
+    """Test that pooled runs match inline runs, errors propagate and workers are replaced after max_tasks."""
+    pool = WarmPool(size=1, max_tasks=2)
+    try:
+        assert pool.status()["ready"] is False
+        pool.start()
+        _wait_ready(pool)
+
+        monkeypatch.setattr(src.main, "WARM_POOL", pool)
+        health = client.get("/health").json()
+        assert health["status"] == "healthy"
+        assert health["pool"]["warm_workers"] == 1
+
+        payload = {"code": WARMUP_CODE, "bars": WARMUP_BARS}
+        for _ in range(3):
+            assert pool.run(payload) == run_backtest(payload)
+        with pytest.raises(RuntimeError, match="No bt.Strategy subclass"):
+            pool.run({"code": "x = 1", "bars": WARMUP_BARS})
+
+        deadline = time.monotonic() + 30
+        while pool.status()["recycled"] < 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+    finally:
+        pool.shutdown()
+
+def test_dead_or_hung_workers_fail_their_request_and_are_replaced():
+    """Test that a worker exiting mid-run fails with an error and an endless run times out, each with a fresh pool after."""
+    from src.sandbox import RunTimeout
+    pool = WarmPool(size=1, max_tasks=None)
+    code = """
+import backtrader as bt
+class Bad(bt.Strategy):
+    def next(self):
+        {body}
+"""
+    try:
+        pool.start()
+        _wait_ready(pool)
+        payload = {"code": WARMUP_CODE, "bars": WARMUP_BARS}
+
+        started = time.monotonic()
+        with pytest.raises(RuntimeError, match="worker process died"):
+            pool.run({"code": code.format(body="import os; os._exit(1)"), "bars": WARMUP_BARS})
+        assert time.monotonic() - started < 10
+        assert pool.run(payload) == run_backtest(payload)
+
+        with pytest.raises(RunTimeout) as info:
+            pool.run({"code": code.format(body="while True: pass"), "bars": WARMUP_BARS, "limits": {"wall_seconds": 0.5}})
+        assert info.value.status == 408
+        assert pool.run(payload) == run_backtest(payload)
+        assert pool.status()["recycled"] == 2
+    finally:
+        pool.shutdown()
+
+def test_health_reports_disabled_pool():
+    """Test that /health reports the pool and stays healthy when it is disabled."""
+    health = client.get("/health").json()
+    assert health["status"] == "healthy"
+    assert health["pool"]["enabled"] is False
@@ -0,0 +1,82 @@
+import datetime
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.profiling import profile_call, profile_slot
+
+client = TestClient(app)
+
+CODE = """
+import backtrader as bt
+class Busy(bt.Strategy):
+    def __init__(self):
+        self.sma = bt.ind.SMA(period=5)
+    def score(self):
+        return sum(i * i for i in range(200))
+    def next(self):
+        self.score()
+        if not self.position and self.data.close[0] > self.sma[0]:
+            self.buy()
+        elif self.position and self.data.close[0] < self.sma[0]:
+            self.close()
+"""
+
+def _bars(n: int = 300):
+    start = datetime.date(2020, 1, 1)
+    return {
+        "time": [(start + datetime.timedelta(days=i)).isoformat() for i in range(n)],
+        "open": [100.0 + (i % 11) for i in range(n)], "high": [102.0 + (i % 11) for i in range(n)],
+        "low": [98.0 + (i % 11) for i in range(n)], "close": [100.5 + (i % 13) for i in range(n)],
+        "volume": [1000.0] * n
+    }
+
+def test_profile_call_returns_result_and_table():
+    """Test that profile_call returns the call result and a cumulative-time table cut to top rows."""
+    def work():
+        return sum(i for i in range(10000))
+    result, report = profile_call(work, top=3)
+    assert result == sum(range(10000))
+    assert len(report["functions"]) <= 3
+    assert report["functions"][0]["cumulative_seconds"] >= report["functions"][-1]["cumulative_seconds"]
+    assert report["collapsed"] is None and report["samples"] == 0
+
+def test_sampling_leaves_the_switch_interval_alone():
+    """Test that collapsed-stack sampling does not change the process-wide GIL switch interval."""
+    import sys
+    before = sys.getswitchinterval()
+    def work():
+        total = sum(i * i for i in range(300000))
+        return total, sys.getswitchinterval()
+    (_, during), report = profile_call(work, collapsed=True)
+    assert during == before == sys.getswitchinterval()
+    assert report["samples"] > 0
+
+def test_run_profile_labels_strategy_frames():
+    """Test that /run profiles attribute time by origin, list strategy frames and bypass the result cache."""
+    payload = {"code": CODE, "bars": _bars(), "include_ohlcv": False, "profile": {"top": 10, "collapsed": True}}
+    response = client.post("/run", json=payload)
+    assert response.status_code == 200
+    profile = response.json()["profile"]
+    assert len(profile["functions"]) == 10
+    assert {"strategy", "backtrader"} <= set(profile["self_seconds_by_origin"])
+    names = {f["function"] for f in profile["strategy_functions"]}
+    assert {"next", "score"} <= names
+    assert all(f["file"] == "<strategy>" for f in profile["strategy_functions"])
+    assert profile["samples"] > 0
+    for line in profile["collapsed"].splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) >= 1 and stack
+    assert "next (<strategy>:" in profile["collapsed"]
+
+    # Profiled runs are never served from or stored in the result cache
+    assert response.headers["X-Cache"] == "MISS"
+    assert client.post("/run", json=payload).headers["X-Cache"] == "MISS"
+
+def test_run_profile_rejected_while_profiler_busy():
+    """Test that a profiled run gets 429 while another profile holds the profiler."""
+    payload = {"code": CODE, "bars": _bars(20), "profile": {}}
+    with profile_slot():
+        response = client.post("/run", json=payload)
+    assert response.status_code == 429
+    assert client.post("/run", json=payload).status_code == 200
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.runner import run_backtest
+from src.utils.datafeed import bars_to_columns, columns_to_lists
+from src.utils.resample import RESAMPLE_CACHE, resample_columns
+
+client = TestClient(app)
+
+def minute_bars(n, start="2021-03-01T09:30"):
+    times = np.datetime64(start, "s") + np.arange(n) * np.timedelta64(60, "s")
+    close = 100 + np.sin(np.arange(n) / 7.0) * 5
+    return [
+        {"time": str(t), "open": c - 0.2, "high": c + 0.5 + (i % 3), "low": c - 0.5 - (i % 2), "close": c,
+         "volume": 10.0 + i}
+        for i, (t, c) in enumerate(zip(times, close.tolist()))
+    ]
+
+def test_resample_aggregates_each_bucket():
+    """Test OHLCV aggregation into 5 minute buckets labelled by bucket start."""
+    bars = minute_bars(12)
+    out = resample_columns(bars_to_columns(bars), "5m")
+
+    assert columns_to_lists(out)["time"] == ["2021-03-01T09:30:00", "2021-03-01T09:35:00", "2021-03-01T09:40:00"]
+    first = bars[:5]
+    assert out["open"][0] == first[0]["open"]
+    assert out["high"][0] == max(b["high"] for b in first)
+    assert out["low"][0] == min(b["low"] for b in first)
+    assert out["close"][0] == first[-1]["close"]
+    assert out["volume"][0] == sum(b["volume"] for b in first)
+    assert out["close"][-1] == bars[-1]["close"]
+
+def test_resample_weeks_daily_passthrough_and_errors():
+    """Test Monday-based weeks, the no-op for matching bars and rejecting coarser bars."""
+    days = [{"time": f"2021-03-{d:02d}", "open": 1, "high": 2, "low": 0, "close": d, "volume": 1} for d in range(1, 15)]
+    weekly = resample_columns(bars_to_columns(days), "1w")
+    assert columns_to_lists(weekly)["time"] == ["2021-03-01", "2021-03-08"]  # both Mondays
+    assert list(weekly["close"]) == [7.0, 14.0]
+
+    cols = bars_to_columns(days)
+    assert resample_columns(cols, "1d") is cols
+    with pytest.raises(ValueError, match="cannot resample"):
+        resample_columns(cols, "1h")
+    with pytest.raises(ValueError, match="invalid timeframe"):
+        resample_columns(cols, "5x")
+
+def test_resampled_series_are_cached_by_data_and_timeframe():
+    """Test that repeating a resample is a cache hit returning the same columns."""
+    cols = bars_to_columns(minute_bars(30))
+    first = resample_columns(cols, "15m")
+    hits = RESAMPLE_CACHE.stats()["hits"]
+    assert resample_columns(bars_to_columns(minute_bars(30)), "15m") is first
+    assert RESAMPLE_CACHE.stats()["hits"] == hits + 1
+    assert resample_columns(cols, "10m") is not first
+
+def test_intraday_run_with_timeframe_matches_preaggregated_bars():
+    """Test that a run with timeframe equals a run on bars aggregated client side, with intraday timestamps."""
+    code = """
+import backtrader as bt
+class Intraday(bt.Strategy):
+    def next(self):
+        assert self.data._timeframe == bt.TimeFrame.Minutes and self.data._compression == 60
+        if not self.position and len(self) % 3 == 1:
+            self.buy(size=1)
+        elif self.position and len(self) % 3 == 0:
+            self.close()
+"""
+    bars = minute_bars(600)
+    hourly = columns_to_lists(resample_columns(bars_to_columns(bars), "1h"))
+
+    resampled = run_backtest({"code": code, "bars": bars, "timeframe": "1h"})
+    direct = run_backtest({"code": code, "bars": hourly})
+
+    assert resampled["equity_curve"] == direct["equity_curve"]
+    assert resampled["trades"] == direct["trades"]
+    assert resampled["ohlcv"]["time"] == hourly["time"]
+    assert resampled["equity_curve"][0]["time"] == "2021-03-01T09:00:00"
+    assert resampled["trades"][0]["entry_time"].startswith("2021-03-01T")
+
+    response = client.post("/run", json={"code": code, "bars": bars[:5], "timeframe": "hourly"})
+    assert response.status_code == 422
+    # Bars coarser than the timeframe are a request error, not a failed run
+    response = client.post("/run", json={"code": code, "bars": hourly, "timeframe": "1m"})
+    assert response.status_code == 422
+    assert "cannot resample" in response.text
@@ -118,4 +118,204 @@ class TestStrategy(bt.Strategy):
     }
     
     with pytest.raises(RuntimeError, match="MVP requires 'bars' in payload"):
-        run_backtest(payload)
\ No newline at end of file
+        run_backtest(payload)
+
+def test_in_memory_feed_matches_csv_feed(monkeypatch):
+    """Test that the in-memory data feed produces the same results as the CSV fallback."""
+    import src.runner as runner
+    payload = {
+        "code": """
+import backtrader as bt
+class CrossStrategy(bt.Strategy):
+    def __init__(self):
+        self.sma = bt.ind.SMA(self.data.close, period=3)
+    def next(self):
+        if not self.position and self.data.close[0] > self.sma[0]:
+            self.buy(size=10)
+        elif self.position and self.data.close[0] < self.sma[0]:
+            self.close()
+        """,
+        "bars": [
+            {"time": f"2020-01-{i:02d}", "open": 100 + (i % 5), "high": 102 + (i % 5), "low": 98 + (i % 5), "close": 100 + (i % 7), "volume": 10000, "openinterest": 0}
+            for i in range(1, 31)
+        ],
+        "capital": 10000
+    }
+
+    monkeypatch.setattr(runner, "DATAFEED_MODE", "csv")
+    csv_result = run_backtest(payload)
+    monkeypatch.setattr(runner, "DATAFEED_MODE", "memory")
+    memory_result = run_backtest(payload)
+
+    assert memory_result == csv_result
+    assert len(memory_result["trades"]) >= 1
+
+def test_closing_stream_stops_the_run():
+    """Test that abandoning iter_backtest stops the background run."""
+    import datetime, threading, time
+    from src.runner import iter_backtest
+    payload = {
+        "code": """
+import backtrader as bt
+class LongStrategy(bt.Strategy):
+    def next(self):
+        pass
+        """,
+        "bars": {
+            "time": [str(datetime.date(1970, 1, 1) + datetime.timedelta(days=i)) for i in range(20000)],
+            "open": [100.0] * 20000, "high": [101.0] * 20000, "low": [99.0] * 20000,
+            "close": [100.0] * 20000, "volume": [1.0] * 20000
+        },
+        "capital": 10000
+    }
+
+    stream = iter_backtest(payload)
+    first = next(stream)
+    stream.close()
+
+    assert first[0]["type"] == "equity"
+    deadline = time.time() + 10
+    while any(t.name == "backtest-stream" for t in threading.enumerate()) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not any(t.name == "backtest-stream" for t in threading.enumerate())
+
+def test_trade_direction_and_user_notify_trade():
+    """Test that closed shorts report 'short' and the user's notify_trade still fires."""
+    payload = {
+        "code": """
+import backtrader as bt
+class ShortThenLong(bt.Strategy):
+    def __init__(self):
+        self.notified = 0
+    def notify_trade(self, trade):
+        self.notified += 1
+    def next(self):
+        n = len(self.data)
+        if n == 1: self.sell(size=5)
+        elif n == 3: self.close()
+        elif n == 4 and self.notified: self.buy(size=5)
+        elif n == 6: self.close()
+        """,
+        "bars": [
+            {"time": f"2020-06-{i:02d}", "open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100 + i, "volume": 1000, "openinterest": 0}
+            for i in range(1, 10)
+        ],
+        "capital": 10000
+    }
+
+    result = run_backtest(payload)
+
+    assert [t["direction"] for t in result["trades"]] == ["short", "long"]
+    assert result["trades"][0]["entry_time"] == "2020-06-02"
+    assert result["trades"][0]["pnl"] < 0 < result["trades"][1]["pnl"]
+
+def test_align_columns_fills_gaps():
+    """Test that symbols are put on the union timeline within their own range, with flat bars in gaps."""
+    import numpy as np
+    from src.utils.datafeed import align_columns, bars_to_columns
+    def bars(days, price):
+        return [{"time": f"2020-01-{d:02d}", "open": price, "high": price + 1, "low": price - 1, "close": price + d,
+                 "volume": 100} for d in days]
+    aligned = align_columns({"A": bars_to_columns(bars([1, 2, 3, 4], 10.0)), "B": bars_to_columns(bars([2, 4], 50.0)),
+                             "C": bars_to_columns(bars([1, 2], 70.0))})
+
+    # Nothing before a symbol's first bar or after its last one
+    assert list(aligned["B"]["time"]) == list(aligned["A"]["time"][1:])
+    assert list(aligned["C"]["time"]) == list(aligned["A"]["time"][:2])
+    assert aligned["B"]["close"][1] == aligned["B"]["open"][1] == 52.0  # flat bar at the previous close
+    assert list(aligned["B"]["volume"]) == [100.0, 0.0, 100.0]
+    assert not np.isnan(aligned["B"]["close"]).any()
+
+def test_portfolio_with_staggered_dates():
+    """Test that symbols starting and ending at different dates give a finite equity curve and real trades only."""
+    import datetime
+    import math
+    code = """
+import backtrader as bt
+class EachData(bt.Strategy):
+    def prenext(self):
+        self.next()
+    def next(self):
+        for d in self.datas:
+            if not len(d):
+                continue
+            pos = self.getposition(d).size
+            if not pos and len(d) % 6 == 1:
+                self.buy(data=d, size=2)
+            elif pos and len(d) % 6 == 4:
+                self.close(data=d)
+"""
+    start = datetime.date(2021, 1, 1)
+    def series(offset, n, base):
+        return [{"time": (start + datetime.timedelta(days=offset + i)).isoformat(), "open": base + i,
+                 "high": base + i + 1, "low": base + i - 1, "close": base + i + 0.5, "volume": 100} for i in range(n)]
+    # BBB lists from day 10 to day 21 of AAA's 30 days
+    portfolio = {"AAA": series(0, 30, 100.0), "BBB": series(10, 12, 50.0)}
+
+    result = run_backtest({"code": code, "portfolio": portfolio, "capital": 10000})
+
+    assert len(result["equity_curve"]) == 30
+    assert all(math.isfinite(p["value"]) for p in result["equity_curve"])
+    assert math.isfinite(result["summary"]["max_drawdown_pct"])
+    bbb = [t for t in result["trades"] if t["symbol"] == "BBB"]
+    assert bbb and all("2021-01-11" <= t["entry_time"] and t["exit_time"] <= "2021-01-22" for t in bbb)
+    pnl = sum(t["pnlcomm"] for t in result["trades"])
+    assert result["summary"]["final_value"] == pytest.approx(10000 + pnl)
+
+@pytest.mark.parametrize("first", [(10, 12), (0, 12)], ids=["starts_late", "ends_early"])
+def test_equity_curve_follows_the_union_when_the_first_symbol_is_short(first):
+    """Test that equity points carry the union's dates when the first symbol starts late or ends early."""
+    import datetime
+    code = """
+import backtrader as bt
+class Hold(bt.Strategy):
+    def prenext(self):
+        self.next()
+    def next(self):
+        for d in self.datas:
+            if len(d) and not self.getposition(d).size:
+                self.buy(data=d, size=1)
+"""
+    start = datetime.date(2021, 1, 1)
+    def series(offset, n, base):
+        return [{"time": (start + datetime.timedelta(days=offset + i)).isoformat(), "open": base + i,
+                 "high": base + i + 1, "low": base + i - 1, "close": base + i + 0.5, "volume": 100} for i in range(n)]
+    portfolio = {"AAA": series(*first, 50.0), "BBB": series(0, 30, 100.0)}
+
+    result = run_backtest({"code": code, "portfolio": portfolio, "capital": 10000})
+
+    times = [p["time"][:10] for p in result["equity_curve"]]
+    assert times == [b["time"] for b in portfolio["BBB"]]
+
+def test_portfolio_trades_match_single_symbol_runs():
+    """Test that a portfolio run tags trades by symbol and matches each symbol run alone."""
+    import datetime
+    code = """
+import backtrader as bt
+class EachData(bt.Strategy):
+    def next(self):
+        for d in self.datas:
+            pos = self.getposition(d).size
+            if not pos and len(d) % 6 == 1:
+                self.buy(data=d, size=2)
+            elif pos and len(d) % 6 == 4:
+                self.close(data=d)
+"""
+    start = datetime.date(2021, 1, 1)
+    portfolio = {
+        symbol: [{"time": (start + datetime.timedelta(days=i)).isoformat(), "open": base + i * step,
+                  "high": base + i * step + 1, "low": base + i * step - 1, "close": base + i * step + 0.5, "volume": 100}
+                 for i in range(30)]
+        for symbol, base, step in (("AAA", 100.0, 1.0), ("BBB", 50.0, -0.5))
+    }
+
+    result = run_backtest({"code": code, "portfolio": portfolio, "capital": 10000})
+
+    assert result["ohlcv"] is None
+    assert len(result["equity_curve"]) == 30
+    for symbol, bars in portfolio.items():
+        alone = run_backtest({"code": code, "bars": bars, "capital": 10000})["trades"]
+        tagged = [t for t in result["trades"] if t["symbol"] == symbol]
+        assert [{k: v for k, v in t.items() if k != "symbol"} for t in tagged] == alone
+    pnl = sum(t["pnlcomm"] for t in result["trades"])
+    assert result["summary"]["final_value"] == pytest.approx(10000 + pnl)
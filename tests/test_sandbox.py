@@ -0,0 +1,127 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import src.main
+from src.main import app
+from src.pool import WARMUP_BARS, WARMUP_CODE
+from src.runner import run_backtest
+from src.sandbox import (
+    MAX_MEMORY_MB, MAX_WALL_SECONDS, RunMemoryExceeded, RunTimeout, effective_limits, run_isolated
+)
+
+client = TestClient(app)
+
+def strategy(body):
+    return f"""
+import backtrader as bt
+class Runaway(bt.Strategy):
+    def next(self):
+        {body}
+"""
+
+def test_isolated_run_matches_inline_and_reports_errors():
+    """Test that an isolated run returns the inline result and ordinary errors stay RuntimeErrors."""
+    payload = {"code": WARMUP_CODE, "bars": WARMUP_BARS}
+    assert run_isolated(payload) == run_backtest(payload)
+    with pytest.raises(RuntimeError, match="boom"):
+        run_isolated({"code": strategy("raise ValueError('boom')"), "bars": WARMUP_BARS})
+
+def test_limits_are_capped_by_server_maximum():
+    """Test that per-request overrides can lower but never raise the server limits."""
+    limits = effective_limits({"memory_mb": 10 ** 6, "wall_seconds": 2})
+    assert limits["memory_mb"] == MAX_MEMORY_MB
+    assert limits["wall_seconds"] == 2
+    assert effective_limits()["wall_seconds"] == MAX_WALL_SECONDS
+
+@pytest.mark.parametrize("limits, limit", [({"wall_seconds": 1}, "wall_seconds"),
+                                           ({"cpu_seconds": 1, "wall_seconds": 30}, "cpu_seconds")])
+def test_runaway_loop_times_out(limits, limit):
+    """Test that an infinite next() is stopped by the wall-clock or CPU limit."""
+    with pytest.raises(RunTimeout) as info:
+        run_isolated({"code": strategy("while True: pass"), "bars": WARMUP_BARS}, limits)
+    assert info.value.limit == limit and info.value.status == 408
+
+def test_huge_allocation_exceeds_memory_limit():
+    """Test that an allocation beyond RLIMIT_AS fails the run with 413 semantics."""
+    with pytest.raises(RunMemoryExceeded) as info:
+        run_isolated({"code": strategy("self.blob = bytearray(8 * 1024 ** 3)"), "bars": WARMUP_BARS}, {"memory_mb": 1024})
+    assert info.value.status == 413
+
+def test_run_endpoint_returns_structured_408(monkeypatch):
+    """Test that /run in isolation mode fails only the runaway request with a structured error."""
+    monkeypatch.setattr(src.main, "ISOLATION", "process")
+    response = client.post("/run", json={"code": strategy("while True: pass"), "bars": WARMUP_BARS,
+                                         "limits": {"wall_seconds": 0.5}})
+    assert response.status_code == 408
+    assert response.json()["detail"]["error"] == "timeout"
+    assert response.json()["detail"]["limit"] == "wall_seconds"
+
+    ok = client.post("/run", json={"code": WARMUP_CODE, "bars": WARMUP_BARS}, headers={"Cache-Control": "no-cache"})
+    assert ok.status_code == 200
+
+@pytest.fixture
+def isolated(monkeypatch):
+    """Process isolation on, with limits low enough for a runaway to hit them quickly."""
+    import src.sandbox
+    monkeypatch.setattr(src.main, "ISOLATION", "process")
+    monkeypatch.setattr(src.sandbox, "MAX_WALL_SECONDS", 1.0)
+    monkeypatch.setattr(src.sandbox, "MAX_MEMORY_MB", 1024)
+
+def _sweep_request(path, code):
+    # Sweeps set `period`, so the strategy must declare it
+    code = code.replace("(bt.Strategy):\n", "(bt.Strategy):\n    params = (('period', 3),)\n", 1)
+    bars = {"time": [f"2020-01-{d:02d}" for d in range(1, 21)], "open": [1.0] * 20, "high": [1.2] * 20,
+            "low": [0.9] * 20, "close": [1.0 + d / 100 for d in range(20)], "volume": [1.0] * 20}
+    if path == "/run/batch":
+        return {"bars": bars, "entries": [{"code": code}]}
+    body = {"code": code, "bars": bars, "param_grid": {"period": [3, 5]}}
+    return {**body, "window": 10, "test": 5} if path == "/walkforward" else body
+
+@pytest.mark.parametrize("path", ["/optimize", "/run/batch", "/walkforward"])
+def test_fan_out_endpoints_are_isolated(isolated, path):
+    """Test that sweeps run strategy code under the isolation limits, so runaways and hogs fail in a child."""
+    runaway = client.post(path, json=_sweep_request(path, strategy("while True: pass")))
+    assert runaway.status_code == 408
+    assert runaway.json()["detail"]["limit"] == "wall_seconds"
+
+    # The allocation fails in the child; per-run errors are reported in the rows as usual
+    hog = client.post(path, json=_sweep_request(path, strategy("self.blob = bytearray(8 * 1024 ** 3)")))
+    assert hog.status_code == 200
+    rows = hog.json().get("results") or hog.json()["windows"]
+    assert rows and all(row["summary"] is None and row["error"] is not None for row in rows)
+
+    ok = client.post(path, json=_sweep_request(path, WARMUP_CODE))
+    assert ok.status_code == 200
+
+def test_fan_out_input_errors_stay_400_under_isolation(isolated):
+    """Test that a ValueError raised in the isolated child still maps to 400."""
+    response = client.post("/walkforward", json={**_sweep_request("/walkforward", WARMUP_CODE), "window": 100})
+    assert response.status_code == 400
+    assert "too few" in response.json()["detail"]
+
+def test_streaming_is_refused_under_isolation(isolated):
+    """Test that an NDJSON /run cannot bypass isolation by streaming from the API process."""
+    response = client.post("/run", json={"code": strategy("while True: pass"), "bars": WARMUP_BARS},
+                           headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 403
+
+def test_jobs_run_under_isolation_limits(isolated):
+    """Test that a runaway job fails at its wall-clock limit instead of holding a job worker."""
+    import time
+    from src.jobs import JOB_MANAGER
+    job = client.post("/jobs", json={"code": strategy("while True: pass"), "bars": WARMUP_BARS}).json()
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        info = client.get(f"/jobs/{job['job_id']}").json()
+        if info["status"] in ("done", "failed", "cancelled"):
+            break
+        time.sleep(0.1)
+    assert info["status"] == "failed"
+    assert "wall-clock limit" in info["error"]
+
+    ok = client.post("/jobs", json={"code": WARMUP_CODE, "bars": WARMUP_BARS}).json()
+    deadline = time.time() + 30
+    while JOB_MANAGER.describe(JOB_MANAGER.get(ok["job_id"]))["status"] not in ("done", "failed"):
+        assert time.time() < deadline
+        time.sleep(0.1)
+    assert JOB_MANAGER.describe(JOB_MANAGER.get(ok["job_id"]))["status"] == "done"
@@ -0,0 +1,133 @@
+import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import src.main
+from src.main import app
+from src.store import BarStore, SymbolNotFound, main as store_main
+
+client = TestClient(app)
+
+CODE = """
+import backtrader as bt
+class BuyOnce(bt.Strategy):
+    def next(self):
+        if not self.position:
+            self.buy()
+"""
+
+def make_bars(n, start=datetime.date(2020, 1, 1)):
+    bars = []
+    for i in range(n):
+        price = 100.0 + i
+        bars.append({
+            "time": (start + datetime.timedelta(days=i)).isoformat(),
+            "open": price, "high": price + 1, "low": price - 1, "close": price, "volume": 1000.0
+        })
+    return bars
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BarStore(str(tmp_path))
+    monkeypatch.setattr(src.main, "STORE", store)
+    return store
+
+def test_load_slices_inclusive_date_range(store):
+    """Test that load binary-searches an inclusive date range and returns views on the mapped files."""
+    store.append("spy", "1d", make_bars(30))
+    cols = store.load("SPY", "1d", "2020-01-05", "2020-01-10")
+
+    assert len(cols["time"]) == 6
+    assert str(cols["time"][0]) == "2020-01-05T00:00:00"
+    assert cols["close"][-1] == 109.0
+    assert isinstance(cols["close"].base, np.memmap)
+    with pytest.raises(SymbolNotFound):
+        store.load("QQQ", "1d")
+
+def test_append_extends_and_rejects_overlap(store):
+    """Test that appends grow the series and bars at or before the last stored bar are rejected."""
+    bars = make_bars(20)
+    store.append("SPY", "1d", bars[:10])
+    store.append("SPY", "1d", bars[10:])
+    assert store.count("SPY", "1d") == 20
+    assert list(store.load("SPY", "1d")["close"]) == [b["close"] for b in bars]
+
+    with pytest.raises(ValueError, match="after the last stored bar"):
+        store.append("SPY", "1d", bars[-1:])
+    with pytest.raises(ValueError, match="invalid store name"):
+        store.append("../etc", "1d", bars)
+
+def test_append_discards_rows_of_an_interrupted_append(store):
+    """Test that bytes written past the stored count (a crash before meta.json) are dropped by the next append."""
+    import os
+    bars = make_bars(20)
+    store.append("SPY", "1d", bars[:10])
+    path = os.path.join(store.root, "SPY", "1d")
+    # Columns of a later append that never reached meta.json, one of them only partly written
+    for name in ("time.i8", "open.f8", "close.f8"):
+        with open(os.path.join(path, name), "ab") as f:
+            f.write(b"\xff" * (8 * 3 if name != "close.f8" else 5))
+    assert store.count("SPY", "1d") == 10
+
+    store.append("SPY", "1d", bars[10:])
+    cols = store.load("SPY", "1d")
+    assert list(cols["close"]) == [b["close"] for b in bars]
+    assert list(cols["open"]) == [b["open"] for b in bars]
+    assert os.path.getsize(os.path.join(path, "time.i8")) == 20 * 8
+
+def test_run_with_symbol_dates_matches_inline_bars(store):
+    """Test that /run over stored bars matches the same bars sent inline."""
+    bars = make_bars(40)
+    response = client.post("/store/SPY", json={"timeframe": "1d", "bars": bars})
+    assert response.status_code == 200
+    assert response.json()["total"] == 40
+
+    stored = client.post("/run", json={"code": CODE, "symbol": "SPY", "start_date": "2020-01-11", "end_date": "2020-01-31"})
+    inline = client.post("/run", json={"code": CODE, "symbol": "SPY", "bars": bars[10:31]})
+    assert stored.status_code == 200
+    for key in ("trades", "equity_curve", "summary"):
+        assert stored.json()[key] == inline.json()[key]
+    assert stored.json()["ohlcv"]["time"] == [b["time"] for b in bars[10:31]]
+
+    empty = client.post("/run", json={"code": CODE, "symbol": "SPY", "start_date": "2021-01-01", "end_date": "2021-01-31"})
+    assert empty.status_code == 404
+
+def test_run_resamples_from_the_finest_stored_series(store):
+    """Test that a timeframe that is not stored is built from a finer stored series."""
+    start = datetime.datetime(2020, 1, 1)
+    minutes = [{"time": (start + datetime.timedelta(minutes=i)).isoformat(), "open": 100.0 + i % 50,
+                "high": 101.0 + i % 50, "low": 99.0 + i % 50, "close": 100.0 + i % 37, "volume": 10.0}
+               for i in range(3 * 24 * 60)]
+    store.append("SPY", "1m", minutes)
+
+    for timeframe in ("1h", None):
+        stored = client.post("/run", json={"code": CODE, "symbol": "SPY", "timeframe": timeframe,
+                                           "start_date": "2020-01-01", "end_date": "2020-01-03"})
+        inline = client.post("/run", json={"code": CODE, "bars": minutes, "timeframe": timeframe or "1d"})
+        assert stored.status_code == 200
+        assert stored.json() == inline.json()
+    assert store.source("SPY", "1d") == store.source("SPY", "1h") == "1m"
+
+    store.append("QQQ", "1d", make_bars(5))
+    coarse = client.post("/run", json={"code": CODE, "symbol": "QQQ", "timeframe": "1h",
+                                       "start_date": "2020-01-01", "end_date": "2020-01-05"})
+    assert coarse.status_code == 400
+    missing = client.post("/run", json={"code": CODE, "symbol": "IWM", "timeframe": "1h",
+                                        "start_date": "2020-01-01", "end_date": "2020-01-05"})
+    assert missing.status_code == 404
+
+def test_store_listing_and_cli_ingest(store, tmp_path, capsys):
+    """Test that the CLI ingests a CSV file and GET /store lists it."""
+    path = tmp_path / "bars.csv"
+    rows = ["time,open,high,low,close,volume"]
+    rows += [f"{b['time']},{b['open']},{b['high']},{b['low']},{b['close']},{b['volume']}" for b in make_bars(5)]
+    path.write_text("\n".join(rows) + "\n")
+
+    store_main(["--root", store.root, "ingest", "msft", str(path)])
+    assert '"total": 5' in capsys.readouterr().out
+
+    listing = client.get("/store").json()
+    assert listing == [{"symbol": "MSFT", "timeframe": "1d", "count": 5,
+                        "start": "2020-01-01T00:00:00", "end": "2020-01-05T00:00:00"}]